@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import functools
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.pooled_provider import PooledProvider
+from pipeline_forge.llm.provider import LLMProvider
+from pipeline_forge.llm.simulated_provider import SimulatedProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FilterStage, FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.stages.pipeline_stage import PipelineStage
+from pipeline_forge.tracing import Tracer
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+ENGINES = ("run", "dataflow")
+
+
+def make_data(rows: int, duplicate_ratio: float = 0.5, seed: int = 0) -> pd.DataFrame:
+    """Generate benchmark input where roughly `duplicate_ratio` of rows repeat earlier ones."""
+    rng = np.random.default_rng(seed)
+    n_unique = max(1, int(rows * (1 - duplicate_ratio)))
+    ids = rng.integers(0, n_unique, size=rows)
+    return pd.DataFrame(
+        {
+            "description": [f"description {i}" for i in ids],
+            "city": [f"city {i % 97}" for i in ids],
+        }
+    )
+
+
+def make_provider(backends: int = 1, seed: int = 0, **kwargs) -> LLMProvider:
+    """Simulated provider used by all scenarios.
+
+    With several `backends`, requests go through a PooledProvider that fails over
+    simulated errors to the other backends, as a production deployment would.
+    """
+    if backends == 1:
+        return SimulatedProvider(default_response="SWE", seed=seed, **kwargs)
+    return PooledProvider(
+        [
+            SimulatedProvider(default_response="SWE", seed=seed + i, **kwargs)
+            for i in range(backends)
+        ],
+        recovery_timeout=0.0,
+        seed=seed,
+    )
+
+
+def _simulated_providers(provider: LLMProvider) -> List[SimulatedProvider]:
+    if isinstance(provider, PooledProvider):
+        return [backend.provider for backend in provider.backends]
+    return [provider]
+
+
+def _filtered_scenario() -> Pipeline:
+    """LLM stage, selective filter, filtered LLM stage, functional stage."""
+    return Pipeline(
+        stages=[
+            LLMStage(
+                input_columns=["description"],
+                conversation_template=[
+                    {"role": "system", "content": "Extract the job category."},
+                    {"role": "user", "content": "{description}"},
+                ],
+                output_columns=["job_category"],
+            ),
+            # Keeps about 20% of rows
+            FilterStage(
+                input_columns=["description"],
+                function=lambda description: int(description.split()[-1]) % 5 == 0,
+                output_columns=["is_selected"],
+            ),
+            LLMStage(
+                input_columns=["description", "city"],
+                conversation_template=[
+                    {"role": "system", "content": "Estimate the income."},
+                    {"role": "user", "content": "{description} in {city}"},
+                ],
+                output_columns=["income"],
+                filter_colname="is_selected",
+            ),
+            FunctionalStage(
+                input_columns=["job_category"],
+                output_columns=["category_length"],
+                function=lambda job_category: len(job_category),
+            ),
+        ]
+    )
+
+
+def _nested_scenario() -> Pipeline:
+    """Two levels of PipelineStage wrapping LLM and functional stages."""
+    inner = Pipeline(
+        stages=[
+            LLMStage(
+                input_columns=["city"],
+                conversation_template=[
+                    {"role": "system", "content": "Categorize the location."},
+                    {"role": "user", "content": "{city}"},
+                ],
+                output_columns=["location_category"],
+            ),
+            FunctionalStage(
+                input_columns=["location_category"],
+                output_columns=["is_hub"],
+                function=lambda location_category: location_category == "SWE",
+            ),
+        ]
+    )
+    middle = Pipeline(
+        stages=[
+            PipelineStage(
+                input_columns=["city"],
+                pipeline=inner,
+                output_columns=["location_category", "is_hub"],
+            )
+        ]
+    )
+    return Pipeline(
+        stages=[
+            PipelineStage(
+                input_columns=["city"],
+                pipeline=middle,
+                output_columns=["location_category", "is_hub"],
+            ),
+        ]
+    )
+
+
+SCENARIOS: Dict[str, Callable[[], Pipeline]] = {
+    "filtered": _filtered_scenario,
+    "nested": _nested_scenario,
+}
+
+
+@dataclass
+class BenchmarkReport:
+    """Results of one benchmark run; serializable to JSON for comparison across commits."""
+
+    scenario: str
+    rows: int
+    seconds: float
+    rows_per_second: float
+    peak_memory_bytes: int | None = None
+    provider_calls: int = 0
+    provider_errors: int = 0
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    stage_overhead_us_per_row: Dict[str, float] = field(default_factory=dict)
+    environment: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _environment() -> Dict[str, Any]:
+    """Describe where the benchmark ran, including the git commit when available."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+async def run_benchmark(
+    scenario: str,
+    rows: int,
+    duplicate_ratio: float = 0.5,
+    profile: bool = True,
+    seed: int = 0,
+    engine: str = "run",
+    batch_size: int | None = None,
+    backends: int | None = None,
+    **provider_kwargs,
+) -> BenchmarkReport:
+    """Run a scenario and measure throughput, and optionally peak memory and per-stage time.
+
+    The throughput pass runs without instrumentation. When `profile` is set, a second
+    pass runs with a tracer and tracemalloc enabled to attribute time to stages.
+    With the default zero-latency provider, stage time is pure orchestration overhead.
+    `engine` selects `Pipeline.run` or `Pipeline.run_dataflow`, with `batch_size`
+    rows per micro-batch (the default if not given). Simulated errors are failed
+    over across `backends` simulated backends (by default 3 when errors are
+    simulated, else 1) and counted in `provider_errors`; a request fails only if
+    every backend it tries fails.
+    """
+    if backends is None:
+        simulates_errors = provider_kwargs.get("error_rate") or provider_kwargs.get(
+            "rate_limit_rate"
+        )
+        backends = 3 if simulates_errors else 1
+    provider_kwargs["backends"] = backends
+    pipeline = SCENARIOS[scenario]()
+    data = make_data(rows, duplicate_ratio=duplicate_ratio, seed=seed)
+    if engine == "dataflow":
+        dataflow_kwargs = {} if batch_size is None else {"batch_size": batch_size}
+        run = functools.partial(pipeline.run_dataflow, **dataflow_kwargs)
+    else:
+        run = pipeline.run
+
+    provider = make_provider(seed=seed, **provider_kwargs)
+    started = time.perf_counter()
+    await run(data, llm_provider=provider, cache=InMemoryCache())
+    seconds = time.perf_counter() - started
+
+    report = BenchmarkReport(
+        scenario=scenario if engine == "run" else f"{scenario}/{engine}",
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds if seconds > 0 else float("inf"),
+        provider_calls=sum(p.calls for p in _simulated_providers(provider)),
+        provider_errors=sum(
+            p.errors + p.rate_limited for p in _simulated_providers(provider)
+        ),
+        environment=_environment(),
+    )
+
+    if profile:
+        tracer = Tracer()
+        tracemalloc.start()
+        try:
+            await run(
+                data,
+                llm_provider=make_provider(seed=seed, **provider_kwargs),
+                cache=InMemoryCache(),
+                tracer=tracer,
+            )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        report.peak_memory_bytes = peak
+
+        summary = tracer.summary()
+        for stats in summary.values():
+            if stats["kind"] != "stage":
+                continue
+            report.stage_seconds[stats["name"]] = stats["total"]
+            report.stage_overhead_us_per_row[stats["name"]] = (
+                stats["total"] / rows * 1e6 if rows else 0.0
+            )
+
+    return report
+
+
+def compare_reports(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1
+) -> List[str]:
+    """Return human-readable regressions of `current` relative to `baseline`.
+
+    A metric regresses when it is worse than the baseline by more than `tolerance`
+    (as a fraction of the baseline value).
+    """
+    regressions = []
+
+    def check(label: str, old: float | None, new: float | None, higher_is_better: bool):
+        if not old or new is None:
+            return
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (
+            not higher_is_better and change > tolerance
+        ):
+            regressions.append(f"{label}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+
+    check(
+        "rows_per_second", baseline["rows_per_second"], current["rows_per_second"], True
+    )
+    check(
+        "peak_memory_bytes",
+        baseline.get("peak_memory_bytes"),
+        current.get("peak_memory_bytes"),
+        False,
+    )
+    for stage, old in baseline.get("stage_overhead_us_per_row", {}).items():
+        new = current.get("stage_overhead_us_per_row", {}).get(stage)
+        check(f"{stage} overhead (us/row)", old, new, False)
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark pipeline orchestration overhead"
+    )
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="filtered")
+    parser.add_argument("--size", choices=sorted(SIZES), default="1k")
+    parser.add_argument("--engine", choices=ENGINES, default="run")
+    parser.add_argument(
+        "--batch-size", type=int, help="Rows per micro-batch with --engine dataflow"
+    )
+    parser.add_argument("--rows", type=int, help="Override the number of rows")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.5)
+    parser.add_argument("--latency-distribution", default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--backends",
+        type=int,
+        help="Simulated backends to fail over between (3 with --error-rate, else 1)",
+    )
+    parser.add_argument("--no-profile", action="store_true")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument("--compare", help="Baseline report JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(
+        run_benchmark(
+            args.scenario,
+            args.rows or SIZES[args.size],
+            duplicate_ratio=args.duplicate_ratio,
+            profile=not args.no_profile,
+            engine=args.engine,
+            batch_size=args.batch_size,
+            backends=args.backends,
+            latency=args.latency_distribution,
+            latency_mean=args.latency_mean,
+            error_rate=args.error_rate,
+        )
+    )
+    result = report.to_dict()
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(json.load(f), result, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
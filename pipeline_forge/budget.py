@@ -0,0 +1,186 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline_forge.llm.provider import Usage, estimate_tokens
+
+
+@dataclass
+class Reservation:
+    """Budget held for one in-flight request until its actual usage is known."""
+
+    tokens: int
+    cost: float
+
+
+class Budget:
+    """Token and cost ceiling shared by every LLMStage of a pipeline run.
+
+    Before each request, LLMStage reserves the request's estimated tokens (prompt
+    tokens estimated from the formatted messages, completion tokens from the running
+    average of completed requests). Once a reservation would push spending past a
+    ceiling, the budget is exhausted: no further requests are dispatched, in-flight
+    requests finish normally, and the skipped rows are left uncached with a `None`
+    output and flagged in `marker_column` so a later run can pick them up.
+
+    Exhaustion latches: after one refused reservation, smaller requests that would
+    still fit are refused too, so that which rows run does not depend on the
+    sizes of the requests that happen to come next. Spending carries over when a
+    budget is reused for several runs, but skipped rows are recorded per run.
+
+    Prices are in dollars per million tokens.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int | None = None,
+        max_cost: float | None = None,
+        prompt_price: float = 0.0,
+        completion_price: float = 0.0,
+        cached_prompt_price: float | None = None,
+        completion_estimate: int = 256,
+        marker_column: str = "budget_exhausted",
+    ):
+        if max_tokens is None and max_cost is None:
+            raise ValueError("A budget needs max_tokens, max_cost, or both")
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.cached_prompt_price = (
+            prompt_price if cached_prompt_price is None else cached_prompt_price
+        )
+        self.completion_estimate = completion_estimate
+        self.marker_column = marker_column
+
+        self.exhausted = False
+        self.spent = Usage()
+        self.spent_cost = 0.0
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self.requests = 0
+        self._skipped: Dict[str, List[Hashable]] = {}
+
+    def cost(self, usage: Usage) -> float:
+        """Return the dollar cost of the given usage."""
+        uncached_prompt = usage.prompt_tokens - usage.cached_tokens
+        return (
+            uncached_prompt * self.prompt_price
+            + usage.cached_tokens * self.cached_prompt_price
+            + usage.completion_tokens * self.completion_price
+        ) / 1e6
+
+    def estimate(self, messages: List[Dict[str, str]]) -> Usage:
+        """Estimate the usage of a request before it is sent."""
+        if self.requests:
+            completion = -(-self.spent.completion_tokens // self.requests)
+        else:
+            completion = self.completion_estimate
+        return Usage(
+            prompt_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+            completion_tokens=completion,
+        )
+
+    def reserve(self, messages: List[Dict[str, str]]) -> Optional[Reservation]:
+        """Reserve budget for a request, or return None if the ceiling would be exceeded."""
+        if self.exhausted:
+            return None
+        estimate = self.estimate(messages)
+        tokens = estimate.total_tokens
+        cost = self.cost(estimate)
+        if (
+            self.max_tokens is not None
+            and self.spent.total_tokens + self.reserved_tokens + tokens
+            > self.max_tokens
+        ) or (
+            self.max_cost is not None
+            and self.spent_cost + self.reserved_cost + cost > self.max_cost
+        ):
+            self.exhausted = True
+            return None
+        self.reserved_tokens += tokens
+        self.reserved_cost += cost
+        return Reservation(tokens, cost)
+
+    def commit(self, reservation: Reservation, usage: Usage | None) -> None:
+        """Replace a reservation with the actual usage (or the estimate if unknown)."""
+        self.release(reservation)
+        self.requests += 1
+        if usage is None:
+            # No usage reported: charge the reservation so the ceiling still holds
+            self.spent += Usage(prompt_tokens=reservation.tokens)
+            self.spent_cost += reservation.cost
+        else:
+            self.spent += usage
+            self.spent_cost += self.cost(usage)
+
+    def release(self, reservation: Reservation) -> None:
+        """Return a reservation without charging it (e.g. the request failed)."""
+        self.reserved_tokens -= reservation.tokens
+        self.reserved_cost -= reservation.cost
+
+    def start_run(self) -> None:
+        """Forget the rows skipped by earlier runs (row labels are per run)."""
+        self._skipped = {}
+
+    def mark_skipped(self, stage_name: str, index: List[Hashable]) -> None:
+        """Record rows a stage did not dispatch because the budget was exhausted."""
+        self._skipped.setdefault(stage_name, []).extend(index)
+
+    def get_skipped(self) -> Dict[str, List[Hashable]]:
+        """Return the row indices skipped in the current (or last) run, per stage."""
+        return self._skipped
+
+    def skipped_mask(self, index: pd.Index) -> np.ndarray:
+        """Return a boolean mask of the rows in `index` that any stage skipped."""
+        skipped = {idx for rows in self._skipped.values() for idx in rows}
+        return index.isin(list(skipped))
+
+    def mark(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Add the marker column, True for rows that any stage skipped."""
+        data[self.marker_column] = self.skipped_mask(data.index)
+        return data
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return spending and skip statistics."""
+        return {
+            "requests": self.requests,
+            "spent_tokens": self.spent.total_tokens,
+            "spent_cost": self.spent_cost,
+            "reserved_tokens": self.reserved_tokens,
+            "reserved_cost": self.reserved_cost,
+            "exhausted": self.exhausted,
+            "skipped_rows": sum(len(index) for index in self._skipped.values()),
+        }
+
+
+_active_budget: ContextVar[Optional[Budget]] = ContextVar(
+    "pipeline_forge_budget", default=None
+)
+
+
+def get_budget() -> Optional[Budget]:
+    """Return the budget active in the current context, if any."""
+    return _active_budget.get()
+
+
+@contextmanager
+def use_budget(budget: Optional[Budget]) -> Iterator[Optional[Budget]]:
+    """Make `budget` the active budget for the enclosed block (and tasks it spawns).
+
+    The block is a new run of the budget: rows skipped by earlier runs are no
+    longer marked or held back.
+    """
+    if budget is None:
+        yield get_budget()
+        return
+    budget.start_run()
+    token = _active_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _active_budget.reset(token)
@@ -1,13 +1,75 @@
+import hashlib
+import pickle
+import time
+import zlib
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Tuple, Optional, Hashable
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    Optional,
+    Hashable,
+)
+
+
+class _Missing:
+    """Type of `MISSING`."""
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+# Returned by `Cache.lookup` for absent keys, to tell them from stored None values
+MISSING = _Missing()
+
+
+@dataclass
+class CachedFailure:
+    """A deterministic failure cached in place of a value (negative caching).
+
+    Caches report it as absent once `expires_at` (a Unix timestamp) has passed,
+    so failures can be retried on their own schedule.
+    """
+
+    error: str
+    message: str = ""
+    expires_at: Optional[float] = None
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+
+@dataclass
+class CacheEntry:
+    """A cached value with the fingerprint of the stage that stored it."""
+
+    key: Hashable
+    value: Any
+    stage: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
 
 
 class Cache(ABC):
-    """Abstract base class for different cache implementations."""
+    """Abstract base class for different cache implementations.
+
+    Backends implement `get`, `set`, `contains`, `clear` and `get_stats`. To keep
+    stage tags they also override `set_entry`, `entries` and `delete_stages` and
+    set `supports_stages`; untagged backends are used by stages directly, and
+    per-stage invalidation leaves them untouched.
+    """
+
+    # Whether entries keep the fingerprint of the stage that stored them
+    supports_stages = False
 
     @abstractmethod
     def get(self, key: Hashable) -> Optional[Any]:
-        """Retrieve a value from the cache."""
+        """Retrieve a value from the cache, or None if the key is absent (see
+        `lookup` to tell stored None values apart)."""
         pass
 
     @abstractmethod
@@ -30,27 +92,435 @@ class Cache(ABC):
         """Get cache statistics."""
         pass
 
+    def entries(
+        self,
+        stages: Iterable[str] | None = None,
+        since: float | None = None,
+    ) -> Iterator[CacheEntry]:
+        """Iterate over the entries, optionally only those stored by the given
+        stages (fingerprints) or at or after `since` (a Unix timestamp)."""
+        raise NotImplementedError(
+            f"{self.__class__.__name__} cannot enumerate its entries"
+        )
+
+    def lookup(self, key: Hashable) -> Any:
+        """Retrieve a value, or `MISSING` if the key is absent (or holds an
+        expired CachedFailure), so that a stored None is a hit."""
+        value = self.get(key)
+        if value is None and not self.contains(key):
+            return MISSING
+        return value
+
+    def set_entry(self, entry: CacheEntry) -> None:
+        """Store an entry, keeping its stage fingerprint and creation time.
+
+        The default stores only the key and value; backends that can tag their
+        entries should override it.
+        """
+        self.set(entry.key, entry.value)
+
+    def set_many(self, entries: Iterable[CacheEntry]) -> int:
+        """Store many entries at once and return how many were stored.
+
+        Backends should override this with a batched insert.
+        """
+        count = 0
+        for entry in entries:
+            self.set_entry(entry)
+            count += 1
+        return count
+
+    def delete_stages(self, stages: Iterable[str]) -> int:
+        """Delete every entry stored by the given stages (fingerprints) and return
+        how many were deleted.
+
+        Backends should delete in bulk, e.g. with one query on an index of the
+        stage tag rather than one request per key.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} cannot delete entries by stage"
+        )
+
+    def stage_counts(self) -> Dict[Optional[str], int]:
+        """Return the number of entries per stage fingerprint (None if untagged)."""
+        counts: Dict[Optional[str], int] = {}
+        for entry in self.entries():
+            counts[entry.stage] = counts.get(entry.stage, 0) + 1
+        return counts
+
+    def namespace(self, stage: str) -> "CacheNamespace":
+        """Return the view of this cache scoped to one stage fingerprint.
+
+        Views are kept, so their statistics accumulate across runs.
+        """
+        # Created lazily, so that backends need not call an `__init__` of ours
+        namespaces = self.__dict__.setdefault("_namespaces", {})
+        if stage not in namespaces:
+            namespaces[stage] = CacheNamespace(self, stage)
+        return namespaces[stage]
+
+    def get_namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the statistics of every namespace used so far, by fingerprint."""
+        namespaces = self.__dict__.get("_namespaces", {})
+        return {stage: view.get_stats() for stage, view in namespaces.items()}
+
+
+class CacheNamespace(Cache):
+    """View of a cache scoped to the entries of one stage fingerprint.
+
+    Values set through the view are tagged with the fingerprint, lookups are
+    counted per namespace, and `clear` deletes only this namespace's entries.
+    Keys are shared with the underlying cache.
+    """
+
+    def __init__(self, cache: Cache, stage: str):
+        self.cache = cache
+        self.stage = stage
+        self._hits = 0
+        self._misses = 0
+        self._negative_hits = 0
+
+    @property
+    def supports_stages(self) -> bool:
+        return self.cache.supports_stages
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retrieve a value from the underlying cache."""
+        value = self.lookup(key)
+        return None if value is MISSING else value
+
+    def lookup(self, key: Hashable) -> Any:
+        """Retrieve a value from the underlying cache, or `MISSING`."""
+        value = self.cache.lookup(key)
+        if value is MISSING:
+            self._misses += 1
+            return value
+        self._hits += 1
+        if isinstance(value, CachedFailure):
+            self._negative_hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, tagged with this namespace's fingerprint."""
+        self.cache.set_entry(CacheEntry(key, value, self.stage))
+
+    def set_entry(self, entry: CacheEntry) -> None:
+        """Store an entry, tagged with this namespace's fingerprint."""
+        self.cache.set_entry(
+            CacheEntry(entry.key, entry.value, self.stage, entry.created_at)
+        )
+
+    def set_many(self, entries: Iterable[CacheEntry]) -> int:
+        """Store many entries, tagged with this namespace's fingerprint."""
+        return self.cache.set_many(
+            CacheEntry(entry.key, entry.value, self.stage, entry.created_at)
+            for entry in entries
+        )
+
+    def contains(self, key: Hashable) -> bool:
+        """Check if a key exists in the underlying cache."""
+        return self.cache.contains(key)
+
+    def entries(
+        self,
+        stages: Iterable[str] | None = None,
+        since: float | None = None,
+    ) -> Iterator[CacheEntry]:
+        """Iterate over this namespace's entries."""
+        if stages is None or self.stage in stages:
+            yield from self.cache.entries(stages=[self.stage], since=since)
+
+    def delete_stages(self, stages: Iterable[str]) -> int:
+        """Delete this namespace's entries if its fingerprint is among `stages`."""
+        if self.stage not in stages:
+            return 0
+        return self.cache.delete_stages([self.stage])
+
+    def stage_counts(self) -> Dict[Optional[str], int]:
+        """Return the number of entries in this namespace."""
+        return {self.stage: self.cache.stage_counts().get(self.stage, 0)}
+
+    def namespace(self, stage: str) -> "CacheNamespace":
+        """Return a namespace of the underlying cache."""
+        return self.cache.namespace(stage)
+
+    def clear(self) -> None:
+        """Delete this namespace's entries, leaving other stages' entries."""
+        self.cache.delete_stages([self.stage])
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the lookups made through this view and the namespace's size.
+
+        `negative_hits` counts the hits on cached failures. The size is left out
+        for backends that cannot enumerate their entries.
+        """
+        stats = {
+            "hits": self._hits,
+            "misses": self._misses,
+            "negative_hits": self._negative_hits,
+        }
+        try:
+            stats["size"] = self.cache.stage_counts().get(self.stage, 0)
+        except NotImplementedError:
+            pass
+        return stats
+
+
+class _Interned:
+    """Reference to a value held by a ValueStore (one digest, or one per dict field)."""
+
+    __slots__ = ("digests", "fields")
+
+    def __init__(self, digests: List[bytes], fields: Tuple[Hashable, ...] | None):
+        self.digests = digests
+        self.fields = fields
+
+
+class ValueStore:
+    """Content-addressed storage for cache values.
+
+    Values are serialized and stored once per distinct content, however many keys
+    refer to them; dict values are stored field by field, so e.g. the outputs of
+    a classification stage are shared even when each row's usage differs. Blobs of
+    at least `compress_threshold` bytes are compressed with zlib or zstd, optionally
+    with a shared dictionary of content common to many values.
+    """
+
+    DIGEST_SIZE = 16
+
+    def __init__(
+        self,
+        compression: str | None = "zlib",
+        compress_threshold: int = 256,
+        dictionary: bytes | None = None,
+        level: int = 6,
+    ):
+        """
+        Args:
+            compression: "zlib", "zstd" (requires the zstandard package) or None
+            compress_threshold: Smallest serialized size worth compressing
+            dictionary: Shared compression dictionary (e.g. a response prefix)
+            level: Compression level
+        """
+        if compression not in ("zlib", "zstd", None):
+            raise ValueError(f"Unknown compression {compression!r}")
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.dictionary = dictionary
+        self.level = level
+        if compression == "zstd":
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError(
+                    "zstd compression requires the zstandard package "
+                    "(pip install zstandard)"
+                ) from e
+            zstd_dict = (
+                zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            )
+            self._zstd_compressor = zstandard.ZstdCompressor(
+                level=level, dict_data=zstd_dict
+            )
+            self._zstd_decompressor = zstandard.ZstdDecompressor(dict_data=zstd_dict)
+        # digest -> [payload, compressed, references, serialized size]
+        self._blobs: Dict[bytes, list] = {}
+        self._logical_bytes = 0
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._zstd_compressor.compress(raw)
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level)
+        return compressor.compress(raw) + compressor.flush()
+
+    def _decompress(self, payload: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._zstd_decompressor.decompress(payload)
+        if self.dictionary:
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        return decompressor.decompress(payload) + decompressor.flush()
+
+    def _put_blob(self, value: Any) -> bytes:
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.blake2b(raw, digest_size=self.DIGEST_SIZE).digest()
+        self._logical_bytes += len(raw)
+        blob = self._blobs.get(digest)
+        if blob is not None:
+            blob[2] += 1
+            return digest
+        compressed = False
+        payload = raw
+        if self.compression is not None and len(raw) >= self.compress_threshold:
+            candidate = self._compress(raw)
+            if len(candidate) < len(raw):
+                payload, compressed = candidate, True
+        self._blobs[digest] = [payload, compressed, 1, len(raw)]
+        return digest
+
+    def _get_blob(self, digest: bytes) -> Any:
+        payload, compressed, _, _ = self._blobs[digest]
+        return pickle.loads(self._decompress(payload) if compressed else payload)
+
+    def put(self, value: Any) -> _Interned:
+        """Store a value and return the reference to keep in the cache."""
+        if isinstance(value, dict):
+            fields = tuple(value)
+            return _Interned([self._put_blob(value[f]) for f in fields], fields)
+        return _Interned([self._put_blob(value)], None)
+
+    def get(self, ref: _Interned) -> Any:
+        """Return a fresh copy of a stored value."""
+        if ref.fields is None:
+            return self._get_blob(ref.digests[0])
+        return {f: self._get_blob(d) for f, d in zip(ref.fields, ref.digests)}
+
+    def release(self, ref: _Interned) -> None:
+        """Drop one reference to a value, freeing blobs no longer referenced."""
+        for digest in ref.digests:
+            blob = self._blobs[digest]
+            blob[2] -= 1
+            self._logical_bytes -= blob[3]
+            if blob[2] == 0:
+                del self._blobs[digest]
+
+    def clear(self) -> None:
+        self._blobs = {}
+        self._logical_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the serialized size of all stored values (`bytes_logical`), the
+        size actually held (`bytes_stored`, blobs plus references) and the
+        difference (`bytes_saved`)."""
+        references = sum(blob[2] for blob in self._blobs.values())
+        stored = (
+            sum(len(blob[0]) for blob in self._blobs.values())
+            + references * self.DIGEST_SIZE
+        )
+        return {
+            "blobs": len(self._blobs),
+            "bytes_logical": self._logical_bytes,
+            "bytes_stored": stored,
+            "bytes_saved": self._logical_bytes - stored,
+        }
+
 
 class InMemoryCache(Cache):
     """Simple in-memory cache implementation."""
 
-    def __init__(self):
+    supports_stages = True
+
+    def __init__(self, value_store: ValueStore | None = None):
+        """
+        Args:
+            value_store: Intern (and optionally compress) values in this store
+                instead of keeping each value object separately
+        """
         self._cache = {}
+        # key -> (stage, created_at)
+        self._meta: Dict[Hashable, Tuple[Optional[str], float]] = {}
+        # stage -> keys, for bulk deletes and per-stage iteration
+        self._by_stage: Dict[Optional[str], Set[Hashable]] = {}
         self._hits = 0
         self._misses = 0
+        self._negative_hits = 0
+        self.value_store = value_store
 
-    def get(self, key: Hashable) -> Optional[Any]:
-        """Retrieve a value from the cache."""
-        value = self._cache.get(key)
-        if value is not None:
-            self._hits += 1
-        else:
+    def get(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        """Retrieve a value from the cache, or `default` if the key is absent;
+        expired failures are dropped."""
+        if key not in self._cache:
             self._misses += 1
+            return default
+        value = self._cache[key]
+        if self.value_store is not None:
+            value = self.value_store.get(value)
+        if isinstance(value, CachedFailure):
+            if value.expired():
+                self._delete(key)
+                self._misses += 1
+                return default
+            self._negative_hits += 1
+        self._hits += 1
         return value
 
     def set(self, key: Hashable, value: Any) -> None:
         """Store a value in the cache."""
+        self._store(key, value, None, time.time())
+
+    def set_entry(self, entry: CacheEntry) -> None:
+        """Store an entry, keeping its stage fingerprint and creation time."""
+        self._store(entry.key, entry.value, entry.stage, entry.created_at)
+
+    def lookup(self, key: Hashable) -> Any:
+        """Retrieve a value, or `MISSING` if the key is absent, in one lookup."""
+        return self.get(key, MISSING)
+
+    def _store(
+        self, key: Hashable, value: Any, stage: Optional[str], created_at: float
+    ) -> None:
+        if self.value_store is not None:
+            if key in self._cache:
+                self.value_store.release(self._cache[key])
+            value = self.value_store.put(value)
+        if key in self._meta and self._meta[key][0] != stage:
+            self._by_stage[self._meta[key][0]].discard(key)
         self._cache[key] = value
+        self._meta[key] = (stage, created_at)
+        self._by_stage.setdefault(stage, set()).add(key)
+
+    def set_many(self, entries: Iterable[CacheEntry]) -> int:
+        """Store many entries at once, keeping their creation times."""
+        count = 0
+        for entry in entries:
+            self._store(entry.key, entry.value, entry.stage, entry.created_at)
+            count += 1
+        return count
+
+    def entries(
+        self,
+        stages: Iterable[str] | None = None,
+        since: float | None = None,
+    ) -> Iterator[CacheEntry]:
+        """Iterate over the entries (a snapshot of the keys taken at the start)."""
+        if stages is None:
+            keys = list(self._cache)
+        else:
+            keys = [key for stage in stages for key in self._by_stage.get(stage, ())]
+        for key in keys:
+            if key not in self._meta:
+                continue
+            stage, created_at = self._meta[key]
+            if since is not None and created_at < since:
+                continue
+            value = self._cache[key]
+            if self.value_store is not None:
+                value = self.value_store.get(value)
+            yield CacheEntry(key, value, stage, created_at)
+
+    def delete_stages(self, stages: Iterable[str]) -> int:
+        """Delete every entry stored by the given stages."""
+        count = 0
+        for stage in set(stages):
+            for key in list(self._by_stage.pop(stage, ())):
+                self._delete(key)
+                count += 1
+        return count
+
+    def _delete(self, key: Hashable) -> None:
+        value = self._cache.pop(key)
+        if self.value_store is not None:
+            self.value_store.release(value)
+        stage, _ = self._meta.pop(key)
+        self._by_stage.get(stage, set()).discard(key)
+
+    def stage_counts(self) -> Dict[Optional[str], int]:
+        """Return the number of entries per stage fingerprint."""
+        return {stage: len(keys) for stage, keys in self._by_stage.items() if keys}
 
     def contains(self, key: Hashable) -> bool:
         """Check if a key exists in the cache."""
@@ -59,7 +529,22 @@ class InMemoryCache(Cache):
     def clear(self) -> None:
         """Clear all cached values."""
         self._cache = {}
+        self._meta = {}
+        self._by_stage = {}
+        if self.value_store is not None:
+            self.value_store.clear()
 
     def get_stats(self) -> Dict[str, int]:
-        """Get cache statistics."""
-        return {"hits": self._hits, "misses": self._misses, "size": len(self._cache)}
+        """Get cache statistics (and the value store's byte counts, if any).
+
+        `hits` includes the `negative_hits` served by cached failures.
+        """
+        stats = {
+            "hits": self._hits,
+            "misses": self._misses,
+            "negative_hits": self._negative_hits,
+            "size": len(self._cache),
+        }
+        if self.value_store is not None:
+            stats.update(self.value_store.get_stats())
+        return stats
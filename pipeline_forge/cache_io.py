@@ -0,0 +1,199 @@
+import base64
+import json
+import os
+import pickle
+import time
+from dataclasses import asdict
+from typing import Any, Iterable, Iterator, List
+
+from pipeline_forge.cache import Cache, CacheEntry, CachedFailure
+from pipeline_forge.stage import Stage
+
+CACHE_EXPORT_FORMAT = "pipeline_forge.cache"
+CACHE_EXPORT_VERSION = 1
+
+
+def _encode(value: Any) -> Any:
+    """Make a key or value JSON-serializable, tagging tuples and other objects.
+
+    Objects with no JSON form are pickled, and only load with `allow_pickle`.
+    """
+    if isinstance(value, tuple):
+        return {"$tuple": [_encode(item) for item in value]}
+    if isinstance(value, CachedFailure):
+        return {"$failure": asdict(value)}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) and not k.startswith("$") for k in value):
+            return {k: _encode(item) for k, item in value.items()}
+    elif value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return {"$pickle": base64.b64encode(pickle.dumps(value)).decode()}
+
+
+def _decode(value: Any, allow_pickle: bool = False) -> Any:
+    if isinstance(value, list):
+        return [_decode(item, allow_pickle) for item in value]
+    if isinstance(value, dict):
+        if "$tuple" in value:
+            return tuple(_decode(item, allow_pickle) for item in value["$tuple"])
+        if "$failure" in value:
+            return CachedFailure(**value["$failure"])
+        if "$pickle" in value:
+            if not allow_pickle:
+                raise ValueError(
+                    "Cache export contains pickled objects, which can run arbitrary "
+                    "code when loaded; pass allow_pickle=True only for trusted files"
+                )
+            return pickle.loads(base64.b64decode(value["$pickle"]))
+        return {k: _decode(item, allow_pickle) for k, item in value.items()}
+    return value
+
+
+def _fingerprints(stages: Iterable[Stage | str] | None) -> List[str] | None:
+    if stages is None:
+        return None
+    return [s.get_fingerprint() if isinstance(s, Stage) else s for s in stages]
+
+
+def _record(entry: CacheEntry) -> dict:
+    return {
+        "key": json.dumps(_encode(entry.key)),
+        "value": json.dumps(_encode(entry.value)),
+        "stage": entry.stage,
+        "created_at": entry.created_at,
+    }
+
+
+def _entry(record: dict, allow_pickle: bool) -> CacheEntry:
+    return CacheEntry(
+        key=_decode(json.loads(record["key"]), allow_pickle),
+        value=_decode(json.loads(record["value"]), allow_pickle),
+        stage=record["stage"],
+        created_at=record["created_at"],
+    )
+
+
+def _is_parquet(path: str | os.PathLike) -> bool:
+    return str(path).endswith((".parquet", ".pq"))
+
+
+def export_cache(
+    cache: Cache,
+    path: str | os.PathLike,
+    stages: Iterable[Stage | str] | None = None,
+    max_age: float | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    """Stream a cache's entries to a JSONL or Parquet (.parquet) file.
+
+    Each entry keeps the fingerprint of the stage that stored it and its creation
+    time. `stages` (Stage objects or fingerprints) and `max_age` (seconds) select
+    a subset. Keys and values with no JSON form are pickled. Parquet requires
+    pyarrow. Returns the number of entries written.
+    """
+    since = None if max_age is None else time.time() - max_age
+    entries = cache.entries(stages=_fingerprints(stages), since=since)
+    count = 0
+    if _is_parquet(path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Parquet export requires the pyarrow package (pip install pyarrow)"
+            ) from e
+        schema = pa.schema(
+            [
+                ("key", pa.string()),
+                ("value", pa.string()),
+                ("stage", pa.string()),
+                ("created_at", pa.float64()),
+            ]
+        )
+        with pq.ParquetWriter(path, schema) as writer:
+            batch: List[dict] = []
+            for entry in entries:
+                batch.append(_record(entry))
+                if len(batch) == batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+        return count
+
+    with open(path, "w") as f:
+        header = {"format": CACHE_EXPORT_FORMAT, "version": CACHE_EXPORT_VERSION}
+        f.write(json.dumps(header) + "\n")
+        for entry in entries:
+            f.write(json.dumps(_record(entry)) + "\n")
+            count += 1
+    return count
+
+
+def read_cache_export(
+    path: str | os.PathLike, batch_size: int = 10_000, allow_pickle: bool = False
+) -> Iterator[CacheEntry]:
+    """Stream the entries of a file written by `export_cache`.
+
+    Pickled keys or values raise a ValueError unless `allow_pickle` is set:
+    unpickling runs code, so only allow it for files you trust.
+    """
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            for record in batch.to_pylist():
+                yield _entry(record, allow_pickle)
+        return
+
+    with open(path) as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != CACHE_EXPORT_FORMAT:
+            raise ValueError(f"Not a cache export: {path}")
+        if header.get("version") != CACHE_EXPORT_VERSION:
+            raise ValueError(
+                f"Unsupported cache export version {header.get('version')}, "
+                f"expected {CACHE_EXPORT_VERSION}"
+            )
+        for line in f:
+            if line.strip():
+                yield _entry(json.loads(line), allow_pickle)
+
+
+def import_cache(
+    cache: Cache,
+    path: str | os.PathLike,
+    stages: Iterable[Stage | str] | None = None,
+    max_age: float | None = None,
+    batch_size: int = 10_000,
+    allow_pickle: bool = False,
+) -> int:
+    """Bulk-load a file written by `export_cache` into any cache backend.
+
+    Entries are inserted `batch_size` at a time with `Cache.set_many`, keeping
+    their stage fingerprints and creation times. `stages` and `max_age` select a
+    subset as in `export_cache`. Files with pickled entries are rejected unless
+    `allow_pickle` is set (see `read_cache_export`); batches read before the
+    first pickled entry stay imported. Returns the number of entries imported.
+    """
+    fingerprints = _fingerprints(stages)
+    fingerprints = None if fingerprints is None else set(fingerprints)
+    since = None if max_age is None else time.time() - max_age
+    count = 0
+    batch: List[CacheEntry] = []
+    for entry in read_cache_export(path, batch_size, allow_pickle):
+        if fingerprints is not None and entry.stage not in fingerprints:
+            continue
+        if since is not None and entry.created_at < since:
+            continue
+        batch.append(entry)
+        if len(batch) == batch_size:
+            count += cache.set_many(batch)
+            batch = []
+    if batch:
+        count += cache.set_many(batch)
+    return count
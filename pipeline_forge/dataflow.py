@@ -0,0 +1,175 @@
+import asyncio
+from typing import Dict, List, Set
+
+import pandas as pd
+
+from pipeline_forge.budget import Budget, use_budget
+from pipeline_forge.cache import Cache
+from pipeline_forge.llm.provider import LLMProvider, limit_requests
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.progress import ProgressReporter, use_progress
+from pipeline_forge.tracing import Tracer, trace, use_tracer
+
+
+def _output_columns(pipeline: Pipeline, data: pd.DataFrame) -> List[str]:
+    """Columns of `Pipeline.run`'s output, in the order it creates them."""
+    columns = list(data.columns)
+    stage_by_output = pipeline._stage_by_output
+
+    def add(stage) -> None:
+        # Dependencies are computed first, as in `Pipeline._run_stage`
+        for col in set(stage.get_dependencies()) - set(columns):
+            if col in stage_by_output:
+                add(stage_by_output[col])
+        columns.extend(c for c in stage.get_output_columns() if c not in columns)
+
+    for stage in pipeline.stages:
+        add(stage)
+    return columns
+
+
+def _check_inputs(pipeline: Pipeline, data: pd.DataFrame) -> None:
+    available: Set[str] = set(data.columns)
+    for stage in pipeline.stages:
+        available |= stage.get_outputs()
+    for stage in pipeline.stages:
+        missing = stage.get_dependencies() - available
+        if missing:
+            raise ValueError(f"Unable to compute required dependencies: {missing}")
+
+
+async def run_dataflow(
+    pipeline: Pipeline,
+    data: pd.DataFrame,
+    llm_provider: LLMProvider | None = None,
+    cache: Cache | None = None,
+    tracer: Tracer | None = None,
+    budget: Budget | None = None,
+    progress: ProgressReporter | None = None,
+    batch_size: int = 128,
+    max_concurrency: int = 16,
+    queue_size: int = 64,
+    **kwargs,
+) -> pd.DataFrame:
+    """Run a pipeline with no barrier between stages.
+
+    The data is cut into micro-batches of `batch_size` rows; smaller batches let
+    rows overtake slow ones sooner but add per-call overhead. Each stage has a
+    queue of batches, and a batch is queued for a stage as soon as every stage
+    it depends on has processed that batch. At most `max_concurrency` provider
+    requests (and stage calls) are in flight at once across all stages, however
+    many rows each call holds, and at most `queue_size` batches are in the
+    pipeline at once, which bounds each stage's queue. The result has the input's
+    row order and the same columns as `Pipeline.run`.
+
+    Tracing, budgets and progress reporting work as in `Pipeline.run`. Stages
+    count rows once per batch, but callbacks are only forced when a stage has
+    processed its last batch.
+    """
+    _check_inputs(pipeline, data)
+    if data.empty or not pipeline.stages:
+        return await pipeline.run(
+            data,
+            llm_provider=llm_provider,
+            cache=cache,
+            tracer=tracer,
+            budget=budget,
+            progress=progress,
+            **kwargs,
+        )
+
+    stages = pipeline.stages
+    dependencies = pipeline.get_plan()["dependencies"]
+    consumers: List[List[int]] = [[] for _ in stages]
+    for i, deps in enumerate(dependencies):
+        for dep in deps:
+            consumers[dep].append(i)
+
+    starts = range(0, len(data), batch_size)
+    queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+    window = asyncio.Semaphore(queue_size)
+    slots = asyncio.Semaphore(max_concurrency)
+    batches: Dict[int, pd.DataFrame] = {}
+    # Per batch, the number of upstream stages each stage still waits for
+    waiting: Dict[int, List[int]] = {}
+    # Per batch, the number of stages that have not processed it yet
+    remaining: Dict[int, int] = {}
+    finished: Dict[int, pd.DataFrame] = {}
+    done: asyncio.Future = asyncio.get_running_loop().create_future()
+    tasks: Set[asyncio.Task] = set()
+
+    def fail(error: BaseException) -> None:
+        if not done.done():
+            done.set_exception(error)
+
+    async def feed() -> None:
+        for batch, start in enumerate(starts):
+            await window.acquire()
+            batches[batch] = data.iloc[start : start + batch_size].copy()
+            waiting[batch] = [len(deps) for deps in dependencies]
+            remaining[batch] = len(stages)
+            for i, deps in enumerate(dependencies):
+                if not deps:
+                    queues[i].put_nowait(batch)
+
+    async def process(i: int, batch: int) -> None:
+        stage = stages[i]
+        frame = batches[batch]
+        try:
+            try:
+                processed = await pipeline._process_stage(
+                    stage, frame, llm_provider=llm_provider, cache=cache, **kwargs
+                )
+            finally:
+                slots.release()
+        except Exception as e:
+            fail(e)
+            return
+
+        for col in stage.get_output_columns():
+            frame[col] = processed[col]
+        # Admission through `window` keeps each queue below `queue_size`
+        for consumer in consumers[i]:
+            waiting[batch][consumer] -= 1
+            if waiting[batch][consumer] == 0:
+                queues[consumer].put_nowait(batch)
+        remaining[batch] -= 1
+        if remaining[batch] == 0:
+            finished[batch] = batches.pop(batch)
+            del waiting[batch], remaining[batch]
+            window.release()
+            if len(finished) == len(starts) and not done.done():
+                done.set_result(None)
+
+    async def dispatch(i: int) -> None:
+        while True:
+            batch = await queues[i].get()
+            await slots.acquire()
+            task = asyncio.create_task(process(i, batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    if progress is not None:
+        # Stages start once per batch; register their totals once
+        for stage in stages:
+            progress.plan_stage(stage.get_name(), len(data))
+
+    with use_tracer(tracer), use_budget(budget), use_progress(progress), limit_requests(
+        max_concurrency
+    ), trace("pipeline", "run_dataflow", rows=len(data)):
+        workers = [asyncio.create_task(dispatch(i)) for i in range(len(stages))]
+        feeder = asyncio.create_task(feed())
+        try:
+            await done
+        finally:
+            for task in [feeder, *workers, *tasks]:
+                task.cancel()
+            await asyncio.gather(feeder, *workers, *tasks, return_exceptions=True)
+
+        result = pd.concat([finished[batch] for batch in range(len(starts))])
+        result = result[_output_columns(pipeline, data)]
+        if budget is not None:
+            result = budget.mark(result)
+        if progress is not None:
+            progress.close()
+        return result
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import importlib
+import multiprocessing
+import os
+import queue
+import secrets
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline_forge import manifest
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.provider import LLMProvider
+from pipeline_forge.pipeline import Pipeline
+
+AUTHKEY_ENV = "PIPELINE_FORGE_AUTHKEY"
+
+
+class PartitionFailedError(Exception):
+    """Raised when a partition still fails after all its retries."""
+
+    pass
+
+
+def resolve(ref: str) -> Any:
+    """Import an object from a "package.module:attribute" reference.
+
+    If the attribute is callable (e.g. a factory function) it is called with no
+    arguments and its return value is used.
+    """
+    module_name, _, attr = ref.partition(":")
+    obj = importlib.import_module(module_name)
+    for name in attr.split("."):
+        obj = getattr(obj, name)
+    return obj() if callable(obj) else obj
+
+
+def _serialize_pipeline(pipeline: Pipeline | str) -> Dict[str, Any] | str:
+    """Return a pipeline's manifest (references are passed through)."""
+    if isinstance(pipeline, str):
+        return pipeline
+    try:
+        return manifest.bake(pipeline)
+    except manifest.ManifestError as e:
+        raise manifest.ManifestError(
+            f"{e}; pass a 'module:attribute' reference to the pipeline instead"
+        ) from e
+
+
+def _serialize_provider(
+    llm_provider: LLMProvider | str | None,
+) -> Dict[str, Any] | str | None:
+    """Return a provider's type and configuration (references are passed through)."""
+    if llm_provider is None or isinstance(llm_provider, str):
+        return llm_provider
+    return manifest.bake_provider(llm_provider)
+
+
+def partition(
+    data: pd.DataFrame, n_partitions: int, key_columns: List[str] | None = None
+) -> List[pd.DataFrame]:
+    """Split data into partitions, by position or by a hash of the key columns.
+
+    Hash partitioning sends rows with equal keys to the same partition, so each
+    worker's cache sees all duplicates of a key. Empty partitions are dropped.
+    """
+    if key_columns is None:
+        bounds = np.linspace(0, len(data), n_partitions + 1).astype(int)
+        parts = [data.iloc[start:end] for start, end in zip(bounds, bounds[1:])]
+    else:
+        hashes = pd.util.hash_pandas_object(data[key_columns], index=False)
+        buckets = hashes.to_numpy() % n_partitions
+        parts = [data[buckets == i] for i in range(n_partitions)]
+    return [part for part in parts if len(part)]
+
+
+@dataclass
+class _PartitionState:
+    data: pd.DataFrame
+    attempts: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class Coordinator:
+    """Serves partitions to workers over sockets and collects their results.
+
+    Workers connect with `run_worker`, receive the baked pipeline (or its
+    reference) and then process one partition at a time. A partition that raises,
+    or whose worker disconnects mid-partition, is put back in the queue for any
+    worker, up to `max_retries` times.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline | str,
+        llm_provider: LLMProvider | str | None = None,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        authkey: bytes | None = None,
+        max_retries: int = 2,
+    ):
+        """
+        Args:
+            pipeline: The Pipeline, sent to workers as its manifest (see `bake`), or
+                the "module:attribute" of a Pipeline (or a factory for it) that
+                workers import, e.g. for stages that cannot be baked
+            llm_provider: The LLMProvider, sent as its configuration without
+                credentials, or the "module:attribute" of one (or a factory for it)
+            address: Host and port to listen on (port 0 picks a free one)
+            authkey: Shared secret workers must present (random if not given)
+            max_retries: Times a failed partition is re-dispatched
+        """
+        self.pipeline_spec = _serialize_pipeline(pipeline)
+        self.provider_spec = _serialize_provider(llm_provider)
+        self.authkey = authkey or secrets.token_bytes(16)
+        self.max_retries = max_retries
+        self._listener = Listener(address, authkey=self.authkey)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._listener.address
+
+    def run(
+        self,
+        partitions: List[pd.DataFrame],
+        timeout: float | None = None,
+        poll: Callable[[], None] | None = None,
+    ) -> List[pd.DataFrame]:
+        """Process the partitions on connected workers and return their results in order.
+
+        `poll` is called periodically while waiting (e.g. to restart dead workers).
+        Raises PartitionFailedError if a partition exhausted its retries, and
+        TimeoutError if the partitions were not all done within `timeout` seconds.
+        """
+        self._states = [_PartitionState(part) for part in partitions]
+        self._results: Dict[int, pd.DataFrame] = {}
+        self._failed: Dict[int, List[str]] = {}
+        self._pending: queue.Queue[int] = queue.Queue()
+        for i in range(len(partitions)):
+            self._pending.put(i)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not partitions:
+            self._done.set()
+
+        accept_thread = threading.Thread(target=self._accept, daemon=True)
+        accept_thread.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        finished = False
+        while not finished:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            finished = self._done.wait(
+                0.2 if remaining is None else min(0.2, remaining)
+            )
+            if poll is not None and not finished:
+                poll()
+        self._listener.close()
+        if not finished:
+            raise TimeoutError(
+                f"{len(self._results)}/{len(partitions)} partitions done after {timeout}s"
+            )
+        if self._failed:
+            details = "\n".join(
+                f"partition {i}: {errors[-1]}" for i, errors in self._failed.items()
+            )
+            raise PartitionFailedError(
+                f"{len(self._failed)} partition(s) failed\n{details}"
+            )
+        return [self._results[i] for i in range(len(partitions))]
+
+    def _accept(self) -> None:
+        """Accept worker connections until the run is over."""
+        while not self._done.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                # Closed listener or a client that failed authentication
+                if self._done.is_set():
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        """Feed partitions to one worker until none are left or it disconnects."""
+        with conn:
+            try:
+                conn.send(("setup", self.pipeline_spec, self.provider_spec))
+            except OSError:
+                return
+            while not self._done.is_set():
+                try:
+                    i = self._pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    conn.send(("run", i, self._states[i].data))
+                    reply = conn.recv()
+                except (OSError, EOFError):
+                    self._fail(i, "worker disconnected")
+                    return
+                if reply[0] == "result":
+                    self._succeed(i, reply[2])
+                else:
+                    self._fail(i, reply[2])
+            try:
+                conn.send(("stop",))
+            except OSError:
+                pass
+
+    def _succeed(self, i: int, result: pd.DataFrame) -> None:
+        with self._lock:
+            self._results[i] = result
+            self._check_done()
+
+    def _fail(self, i: int, error: str) -> None:
+        with self._lock:
+            state = self._states[i]
+            state.attempts += 1
+            state.errors.append(error)
+            if state.attempts > self.max_retries:
+                self._failed[i] = state.errors
+                self._check_done()
+            else:
+                self._pending.put(i)
+
+    def _check_done(self) -> None:
+        if len(self._results) + len(self._failed) == len(self._states):
+            self._done.set()
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes) -> None:
+    """Connect to a coordinator and process partitions until told to stop.
+
+    The worker keeps one event loop and one in-memory cache across its partitions.
+    """
+    loop = asyncio.new_event_loop()
+    with Client(address, authkey=authkey) as conn:
+        _, pipeline_spec, provider_spec = conn.recv()
+        if isinstance(pipeline_spec, str):
+            pipeline = resolve(pipeline_spec)
+        else:
+            pipeline = manifest.load(pipeline_spec)
+        if isinstance(provider_spec, str):
+            llm_provider = resolve(provider_spec)
+        elif provider_spec is not None:
+            llm_provider = manifest.decode_provider(provider_spec)
+        else:
+            llm_provider = None
+        cache = InMemoryCache()
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == "stop":
+                break
+            _, i, data = message
+            try:
+                result = loop.run_until_complete(
+                    pipeline.run(data, llm_provider=llm_provider, cache=cache)
+                )
+            except Exception:
+                conn.send(("error", i, traceback.format_exc()))
+            else:
+                conn.send(("result", i, result))
+    loop.close()
+
+
+def run_distributed(
+    data: pd.DataFrame,
+    pipeline: Pipeline | str,
+    llm_provider: LLMProvider | str | None = None,
+    n_workers: int = 2,
+    n_partitions: int | None = None,
+    key_columns: List[str] | None = None,
+    max_retries: int = 2,
+    timeout: float | None = None,
+) -> pd.DataFrame:
+    """Run a pipeline on `n_workers` local worker processes and merge the results.
+
+    The pipeline and provider are sent to the workers as in `Coordinator`. The
+    data is split into `n_partitions` partitions (default: 4 per worker), by
+    position or by hash of `key_columns`. Workers that die are replaced. The output
+    has the input's row order and index (which may have duplicate labels).
+    """
+    coordinator = Coordinator(pipeline, llm_provider, max_retries=max_retries)
+    # Partitions carry row positions, so results are put back in order by position
+    positional = data.reset_index(drop=True)
+    parts = partition(positional, n_partitions or 4 * n_workers, key_columns)
+
+    context = multiprocessing.get_context("spawn")
+
+    def start_worker() -> multiprocessing.Process:
+        worker = context.Process(
+            target=run_worker,
+            args=(coordinator.address, coordinator.authkey),
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    workers = [start_worker() for _ in range(n_workers)]
+
+    def replace_dead_workers() -> None:
+        for i, worker in enumerate(workers):
+            if worker.exitcode not in (None, 0):
+                workers[i] = start_worker()
+
+    try:
+        results = coordinator.run(parts, timeout=timeout, poll=replace_dead_workers)
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    if not results:
+        return data.copy()
+    result = pd.concat(results).sort_index(kind="stable")
+    result.index = data.index
+    return result
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run a pipeline_forge worker that connects to a coordinator"
+    )
+    parser.add_argument("address", help="Coordinator address as host:port")
+    args = parser.parse_args(argv)
+
+    host, _, port = args.address.rpartition(":")
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if authkey is None:
+        parser.error(f"Set {AUTHKEY_ENV} to the coordinator's authkey")
+    run_worker((host, int(port)), authkey.encode())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+class EmbeddingProvider(ABC):
+    """Abstract interface for embedding providers."""
+
+    # Largest number of texts sent in one request
+    max_batch_size: int = 2048
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed the texts and return a float32 array of shape (len(texts), dimensions)."""
+        pass
+
+    def get_provider_id(self) -> str:
+        """Return a unique identifier for this provider configuration."""
+        return self.__class__.__name__
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this provider, minus
+        secrets (which are read from the environment when it is recreated)."""
+        raise NotImplementedError(f"{self.__class__.__name__} cannot be serialized")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "EmbeddingProvider":
+        """Recreate a provider from the output of `get_config`."""
+        return cls(**config)
+
+
+class MockEmbeddingProvider(EmbeddingProvider):
+    """Deterministic embedder for testing: each text maps to a fixed unit vector
+    derived from its hash, so equal texts always get equal embeddings."""
+
+    def __init__(self, dimensions: int = 8):
+        self.dimensions = dimensions
+        self.requests = 0
+        self.texts_embedded = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Mock implementation of embed."""
+        self.requests += 1
+        self.texts_embedded += len(texts)
+        matrix = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self._vector(text)
+        return matrix
+
+    def get_provider_id(self) -> str:
+        """Return a unique identifier for this provider configuration."""
+        return f"MockEmbeddingProvider({self.dimensions})"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments of this provider."""
+        return {"dimensions": self.dimensions}
+
+
+def embedding_matrix(column: pd.Series) -> np.ndarray:
+    """Return a column of embeddings as one float32 2-D array.
+
+    Rows without an embedding (e.g. skipped by a filter) are NaN.
+    """
+    values = column.tolist()
+    if values and all(isinstance(v, np.ndarray) for v in values):
+        return np.stack(values).astype(np.float32, copy=False)
+    dimensions = next((len(v) for v in values if isinstance(v, np.ndarray)), 0)
+    matrix = np.full((len(values), dimensions), np.nan, dtype=np.float32)
+    for i, value in enumerate(values):
+        if isinstance(value, np.ndarray):
+            matrix[i] = value
+    return matrix
@@ -1,11 +1,167 @@
+import asyncio
 import hashlib
 import json
-from typing import List, Dict, Any, Optional
-from .provider import LLMProvider
-from openai import AsyncOpenAI
+import os
+import time
+import weakref
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from .embedding import EmbeddingProvider
+from .provider import LLMProvider, LLMResponse, StreamChunk, Usage
+import httpx
+import numpy as np
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 
-class OpenAIProvider(LLMProvider):
+@dataclass(frozen=True)
+class HTTPPoolConfig:
+    """Transport settings for the HTTP connection pool behind an OpenAIProvider.
+
+    `http2` requires the optional `h2` package (`pip install httpx[http2]`).
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    timeout: float = 600.0
+    connect_timeout: float = 5.0
+    max_retries: int = 2
+
+    def create_client(self, **client_kwargs) -> AsyncOpenAI:
+        """Create an AsyncOpenAI client whose httpx pool uses these settings."""
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            http2=self.http2,
+        )
+        return AsyncOpenAI(
+            http_client=http_client, max_retries=self.max_retries, **client_kwargs
+        )
+
+
+class _SharedClient:
+    """An AsyncOpenAI client shared, within one event loop, by every provider with
+    the same endpoint and credentials."""
+
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+        self.refcount = 0
+
+    def release(self) -> None:
+        self.refcount -= 1
+
+
+class _NoLoop:
+    """Stands for "no running event loop" where an event loop is expected."""
+
+    pass
+
+
+_NO_LOOP = _NoLoop()
+
+# Shared clients keyed by (event loop id, hashed api key, organization, base_url,
+# pool config). Providers hold the clients they use, so an entry goes away with
+# the last provider (or event loop) using it, even if no provider was closed.
+_shared_clients: "weakref.WeakValueDictionary[Tuple, _SharedClient]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _shared_client_key(
+    client_kwargs: Dict[str, Any], pool_config: HTTPPoolConfig
+) -> Tuple:
+    """Build the registry key, resolving the same environment defaults as AsyncOpenAI."""
+    api_key = client_kwargs.get("api_key", os.environ.get("OPENAI_API_KEY"))
+    return (
+        hashlib.sha256((api_key or "").encode()).hexdigest(),
+        client_kwargs.get("organization", os.environ.get("OPENAI_ORG_ID")),
+        client_kwargs.get("base_url", os.environ.get("OPENAI_BASE_URL")),
+        pool_config,
+    )
+
+
+class _ClientOwner:
+    """Gives a provider an AsyncOpenAI client, shared or its own.
+
+    Connection pools belong to the event loop that opened their connections, so
+    shared clients are per event loop: a provider used by several `asyncio.run`
+    calls gets a client for each.
+    """
+
+    def _init_client(
+        self,
+        client_kwargs: Dict[str, Any],
+        pool_config: HTTPPoolConfig,
+        share_client: bool,
+    ) -> None:
+        self.pool_config = pool_config
+        self.share_client = share_client
+        self._client_kwargs = client_kwargs
+        self._shared_key = None
+        self._own_client = None
+        if share_client:
+            self._shared_key = _shared_client_key(client_kwargs, pool_config)
+        else:
+            self._own_client = pool_config.create_client(**client_kwargs)
+        # Shared clients in use by event loop, with the finalizer releasing each
+        self._shared: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._closed = False
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The client for the running event loop."""
+        if self._shared_key is None:
+            return self._own_client
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = _NO_LOOP
+        entry = self._shared.get(loop)
+        if entry is None:
+            key = (id(loop), *self._shared_key)
+            shared = _shared_clients.get(key)
+            if shared is None:
+                shared = _SharedClient(
+                    self.pool_config.create_client(**self._client_kwargs)
+                )
+                _shared_clients[key] = shared
+            shared.refcount += 1
+            entry = (shared, weakref.finalize(self, shared.release))
+            self._shared[loop] = entry
+        return entry[0].client
+
+    async def aclose(self) -> None:
+        """Release the client; a shared client is closed once its last provider
+        releases it."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._shared_key is None:
+            await self._own_client.close()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = _NO_LOOP
+        for loop, (shared, release) in list(self._shared.items()):
+            release()
+            if shared.refcount > 0:
+                continue
+            key = (id(loop), *self._shared_key)
+            if _shared_clients.get(key) is shared:
+                del _shared_clients[key]
+            if loop is running:
+                # Clients of other (finished) loops cannot be closed from here
+                await shared.client.close()
+        self._shared.clear()
+
+
+class OpenAIProvider(_ClientOwner, LLMProvider):
     """Provider for OpenAI API."""
 
     def __init__(
@@ -13,7 +169,9 @@ class OpenAIProvider(LLMProvider):
         api_key: Optional[str] = None,
         organization: Optional[str] = None,
         base_url: Optional[str] = None,
-        **kwargs
+        pool_config: Optional[HTTPPoolConfig] = None,
+        share_client: bool = True,
+        **kwargs,
     ):
         """
         Initialize the OpenAI provider with all configuration parameters.
@@ -21,6 +179,11 @@ class OpenAIProvider(LLMProvider):
         Args:
             api_key: OpenAI API key (defaults to environment variable)
             organization: OpenAI organization ID (defaults to environment variable)
+            base_url: API endpoint (defaults to environment variable or OpenAI)
+            pool_config: HTTP connection pool settings (defaults to HTTPPoolConfig())
+            share_client: Reuse one client and connection pool across all providers
+                (including embedding providers) with the same endpoint,
+                credentials and pool config, per event loop
             **kwargs: All parameters for the OpenAI API (model, temperature, etc.)
         """
         # Client initialization params
@@ -32,8 +195,9 @@ class OpenAIProvider(LLMProvider):
         # Filter out None values
         client_kwargs = {k: v for k, v in client_kwargs.items() if v is not None}
 
-        # Initialize the client
-        self.client = AsyncOpenAI(**client_kwargs)
+        # Initialize the client, reusing a shared one when possible
+        self.base_url = base_url
+        self._init_client(client_kwargs, pool_config or HTTPPoolConfig(), share_client)
 
         # Store model parameters provided by the user
         self.params = kwargs
@@ -47,11 +211,83 @@ class OpenAIProvider(LLMProvider):
         Generate response using the provider's configuration.
         All configuration is set during initialization.
         """
+        response = await self.generate_response(messages)
+        return response.text
+
+    async def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> LLMResponse:
+        """Generate a response and keep the usage and metadata returned by the API."""
+        started = time.perf_counter()
         response = await self.client.chat.completions.create(
-            messages=messages, **self.params
+            messages=messages, **self._request_params(response_format)
+        )
+        latency = time.perf_counter() - started
+
+        choice = response.choices[0]
+        return LLMResponse(
+            text=choice.message.content,
+            usage=self._parse_usage(response.usage),
+            latency=latency,
+            model=response.model,
+            finish_reason=choice.finish_reason,
         )
 
-        return response.choices[0].message.content
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream the response; closing the iterator early closes the HTTP response,
+        which stops generation on the server."""
+        stream = await self.client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._request_params(response_format),
+        )
+        try:
+            async for chunk in stream:
+                text, finish_reason = "", None
+                if chunk.choices:
+                    text = chunk.choices[0].delta.content or ""
+                    finish_reason = chunk.choices[0].finish_reason
+                yield StreamChunk(
+                    text,
+                    usage=self._parse_usage(getattr(chunk, "usage", None)),
+                    finish_reason=finish_reason,
+                )
+        finally:
+            await stream.close()
+
+    def _request_params(
+        self, response_format: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Return the request parameters, with a per-request response format if given."""
+        if response_format is None:
+            return self.params
+        return {**self.params, "response_format": response_format}
+
+    @staticmethod
+    def _parse_usage(usage: Any) -> Optional[Usage]:
+        """Convert the API's usage object, including cached prompt tokens if reported."""
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        return Usage(
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+            cached_tokens=cached_tokens,
+        )
+
+    async def __aenter__(self) -> "OpenAIProvider":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
     def get_provider_id(self) -> str:
         """Return a unique identifier that includes complete configuration."""
@@ -69,3 +305,93 @@ class OpenAIProvider(LLMProvider):
 
         config_str = json.dumps(config_for_id, sort_keys=True)
         return hashlib.md5(config_str.encode()).hexdigest()
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments of this provider, without credentials.
+
+        The API key and organization are read from the environment when the
+        provider is recreated.
+        """
+        return {
+            "base_url": self.base_url,
+            "pool_config": asdict(self.pool_config),
+            "share_client": self.share_client,
+            **{
+                k: v
+                for k, v in self.params.items()
+                if k not in ["api_key", "organization"]
+            },
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "OpenAIProvider":
+        """Recreate a provider from the output of `get_config`."""
+        config = dict(config)
+        config["pool_config"] = HTTPPoolConfig(**config["pool_config"])
+        return cls(**config)
+
+
+class OpenAIEmbeddingProvider(_ClientOwner, EmbeddingProvider):
+    """Embedding provider for the OpenAI embeddings API."""
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        dimensions: Optional[int] = None,
+        api_key: Optional[str] = None,
+        organization: Optional[str] = None,
+        base_url: Optional[str] = None,
+        pool_config: Optional[HTTPPoolConfig] = None,
+        share_client: bool = True,
+    ):
+        """
+        Args:
+            model: Embedding model
+            dimensions: Output dimensions, for models that can shorten embeddings
+            api_key: OpenAI API key (defaults to environment variable)
+            organization: OpenAI organization ID (defaults to environment variable)
+            base_url: API endpoint (defaults to environment variable or OpenAI)
+            pool_config: HTTP connection pool settings (defaults to HTTPPoolConfig())
+            share_client: Reuse the client of other providers with the same
+                endpoint, credentials and pool config (see OpenAIProvider)
+        """
+        client_kwargs = {
+            "api_key": api_key,
+            "organization": organization,
+            "base_url": base_url,
+        }
+        client_kwargs = {k: v for k, v in client_kwargs.items() if v is not None}
+        self.model = model
+        self.dimensions = dimensions
+        self.base_url = base_url
+        self._init_client(client_kwargs, pool_config or HTTPPoolConfig(), share_client)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed the texts in one request."""
+        params: Dict[str, Any] = {"model": self.model, "input": texts}
+        if self.dimensions is not None:
+            params["dimensions"] = self.dimensions
+        response = await self.client.embeddings.create(**params)
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.array([item.embedding for item in data], dtype=np.float32)
+
+    def get_provider_id(self) -> str:
+        """Return a unique identifier of the model and output size."""
+        return f"OpenAIEmbeddingProvider({self.model}, {self.dimensions})"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments of this provider, without credentials."""
+        return {
+            "model": self.model,
+            "dimensions": self.dimensions,
+            "base_url": self.base_url,
+            "pool_config": asdict(self.pool_config),
+            "share_client": self.share_client,
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "OpenAIEmbeddingProvider":
+        """Recreate a provider from the output of `get_config`."""
+        config = dict(config)
+        config["pool_config"] = HTTPPoolConfig(**config["pool_config"])
+        return cls(**config)
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import openai
+
+from .provider import LLMProvider, LLMResponse, StreamChunk
+
+ROUTING_STRATEGIES = ("weighted", "least_in_flight", "latency")
+
+# HTTP statuses worth retrying elsewhere (besides 5xx)
+TRANSIENT_STATUS_CODES = {408, 409, 429}
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Return whether an error is worth retrying on another backend: timeouts,
+    connection errors, rate limits and server errors. Other errors (bad requests,
+    authentication failures, ...) would fail the same way anywhere."""
+    if isinstance(
+        error,
+        (
+            TimeoutError,
+            ConnectionError,
+            httpx.TransportError,
+            openai.APIConnectionError,
+        ),
+    ):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and (
+        status in TRANSIENT_STATUS_CODES or status >= 500
+    )
+
+
+class NoHealthyBackendError(Exception):
+    """Raised when every backend of a PooledProvider failed or has an open circuit."""
+
+    pass
+
+
+class _Backend:
+    """Routing and circuit-breaker state for one provider in a pool."""
+
+    def __init__(self, provider: LLMProvider, weight: float):
+        self.provider = provider
+        self.weight = weight
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_trial = False
+
+    def state(self, now: float, recovery_timeout: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= recovery_timeout:
+            return "half_open"
+        return "open"
+
+
+class PooledProvider(LLMProvider):
+    """Fans requests out across several providers with routing, failover and circuit breaking.
+
+    Backends may differ by API key, `base_url` or model. On a transient error (see
+    `is_transient_error`) the request is retried on another backend (up to
+    `max_attempts` backends); other errors are raised as they are. A backend that
+    fails transiently `failure_threshold` times in a row has its circuit opened and
+    receives no traffic for `recovery_timeout` seconds; after that a single trial
+    request is let through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        weights: List[float] | None = None,
+        routing: str = "least_in_flight",
+        max_attempts: int | None = None,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        latency_alpha: float = 0.2,
+        seed: int | None = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            providers: Backend providers to route between
+            weights: Relative capacity of each backend (defaults to equal weights)
+            routing: "weighted" (random by weight), "least_in_flight" (fewest
+                outstanding requests per unit of weight) or "latency" (lowest
+                smoothed latency, scaled by outstanding requests)
+            max_attempts: Number of backends to try per request (defaults to all)
+            failure_threshold: Consecutive failures that open a backend's circuit
+            recovery_timeout: Seconds before an open circuit allows a trial request
+            latency_alpha: Smoothing factor of the latency moving average
+            seed: Seed for weighted routing
+        """
+        if not providers:
+            raise ValueError("PooledProvider needs at least one provider")
+        if routing not in ROUTING_STRATEGIES:
+            raise ValueError(
+                f"Unknown routing {routing!r}, expected one of {ROUTING_STRATEGIES}"
+            )
+        if weights is not None and len(weights) != len(providers):
+            raise ValueError("weights must have one entry per provider")
+
+        weights = weights or [1.0] * len(providers)
+        self.backends = [_Backend(p, w) for p, w in zip(providers, weights)]
+        self.routing = routing
+        self.max_attempts = max_attempts or len(providers)
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.latency_alpha = latency_alpha
+        self._random = random.Random(seed)
+
+    def _available(self, exclude: List[_Backend]) -> List[_Backend]:
+        """Return the backends that may receive a request right now."""
+        now = time.monotonic()
+        available = []
+        for backend in self.backends:
+            if backend in exclude:
+                continue
+            state = backend.state(now, self.recovery_timeout)
+            if state == "closed" or (
+                state == "half_open" and not backend.half_open_trial
+            ):
+                available.append(backend)
+        return available
+
+    def _select(self, exclude: List[_Backend]) -> Optional[_Backend]:
+        """Pick a backend according to the routing strategy."""
+        candidates = self._available(exclude)
+        if not candidates:
+            return None
+        if self.routing == "weighted":
+            return self._random.choices(
+                candidates, weights=[b.weight for b in candidates]
+            )[0]
+        if self.routing == "least_in_flight":
+            return min(candidates, key=lambda b: b.in_flight / b.weight)
+        # Untried backends have no latency yet and are explored first
+        return min(
+            candidates,
+            key=lambda b: (b.latency or 0.0) * (b.in_flight + 1) / b.weight,
+        )
+
+    def _acquire(self, backend: _Backend) -> bool:
+        """Count a request on a backend; return whether it is a half-open trial."""
+        is_trial = backend.opened_at is not None
+        if is_trial:
+            backend.half_open_trial = True
+        backend.in_flight += 1
+        backend.calls += 1
+        return is_trial
+
+    def _release(self, backend: _Backend, is_trial: bool) -> None:
+        backend.in_flight -= 1
+        if is_trial:
+            backend.half_open_trial = False
+
+    def _record_success(self, backend: _Backend, latency: float | None) -> None:
+        """Close the backend's circuit; `latency` is None for error responses."""
+        backend.consecutive_failures = 0
+        backend.opened_at = None
+        if latency is None:
+            return
+        if backend.latency is None:
+            backend.latency = latency
+        else:
+            backend.latency += self.latency_alpha * (latency - backend.latency)
+
+    def _record_failure(self, backend: _Backend) -> None:
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if (
+            backend.opened_at is not None
+            or backend.consecutive_failures >= self.failure_threshold
+        ):
+            backend.opened_at = time.monotonic()
+
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        """Generate a response on one of the backends."""
+        response = await self.generate_response(messages)
+        return response.text
+
+    async def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> LLMResponse:
+        """Route the request to a backend, failing over to others on errors."""
+        tried: List[_Backend] = []
+        last_error: Optional[Exception] = None
+
+        while len(tried) < self.max_attempts:
+            backend = self._select(exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            is_trial = self._acquire(backend)
+            started = time.perf_counter()
+            try:
+                response = await backend.provider.generate_response(
+                    messages, response_format
+                )
+            except Exception as e:
+                if not is_transient_error(e):
+                    # The backend is up; the request itself is at fault
+                    self._record_success(backend, None)
+                    raise
+                last_error = e
+                self._record_failure(backend)
+                continue
+            else:
+                self._record_success(backend, time.perf_counter() - started)
+                return response
+            finally:
+                self._release(backend, is_trial)
+
+        raise NoHealthyBackendError(
+            f"No backend could serve the request ({len(tried)} tried)"
+        ) from last_error
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream the response from one backend, failing over to another while no
+        chunk has been received. Closing the iterator early closes the backend's
+        stream. The time to the first chunk counts as the backend's latency."""
+        tried: List[_Backend] = []
+        last_error: Optional[Exception] = None
+
+        while len(tried) < self.max_attempts:
+            backend = self._select(exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            is_trial = self._acquire(backend)
+            started = time.perf_counter()
+            received = False
+            chunks = backend.provider.stream(messages, response_format)
+            try:
+                async for chunk in chunks:
+                    if not received:
+                        received = True
+                        self._record_success(backend, time.perf_counter() - started)
+                    yield chunk
+                return
+            except Exception as e:
+                if not is_transient_error(e):
+                    self._record_success(backend, None)
+                    raise
+                self._record_failure(backend)
+                if received:
+                    # Part of the response was already yielded
+                    raise
+                last_error = e
+            finally:
+                await chunks.aclose()
+                self._release(backend, is_trial)
+
+        raise NoHealthyBackendError(
+            f"No backend could serve the request ({len(tried)} tried)"
+        ) from last_error
+
+    def get_provider_id(self) -> str:
+        """Return the backends' shared id if they are equivalent, else an id for the mix.
+
+        Backends that differ only by credentials or endpoint report the same id, so
+        the pool caches exactly like a single one of them would.
+        """
+        ids = sorted({backend.provider.get_provider_id() for backend in self.backends})
+        if len(ids) == 1:
+            return ids[0]
+        config_str = json.dumps({"type": self.__class__.__name__, "backends": ids})
+        return hashlib.md5(config_str.encode()).hexdigest()
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Return routing and health statistics for each backend."""
+        now = time.monotonic()
+        return [
+            {
+                "provider": backend.provider.__class__.__name__,
+                "weight": backend.weight,
+                "calls": backend.calls,
+                "failures": backend.failures,
+                "in_flight": backend.in_flight,
+                "latency": backend.latency,
+                "state": backend.state(now, self.recovery_timeout),
+            }
+            for backend in self.backends
+        ]
@@ -1,5 +1,102 @@
+import asyncio
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class Usage:
+    """Token usage reported by a provider for one or more requests."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def __add__(self, other: "Usage") -> "Usage":
+        return Usage(
+            self.prompt_tokens + other.prompt_tokens,
+            self.completion_tokens + other.completion_tokens,
+            self.cached_tokens + other.cached_tokens,
+        )
+
+    def __sub__(self, other: "Usage") -> "Usage":
+        return Usage(
+            self.prompt_tokens - other.prompt_tokens,
+            self.completion_tokens - other.completion_tokens,
+            self.cached_tokens - other.cached_tokens,
+        )
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, int]) -> "Usage":
+        return cls(**data)
+
+
+@dataclass
+class LLMResponse:
+    """Structured result of a single generation request."""
+
+    text: str
+    usage: Optional[Usage] = None
+    latency: Optional[float] = None
+    model: Optional[str] = None
+    finish_reason: Optional[str] = None
+    time_to_first_token: Optional[float] = None
+
+
+@dataclass
+class StreamChunk:
+    """Incremental piece of a streamed response; usage usually arrives on the last chunk."""
+
+    text: str
+    usage: Optional[Usage] = None
+    finish_reason: Optional[str] = None
+
+
+_request_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar(
+    "pipeline_forge_request_slots", default=None
+)
+
+
+@contextmanager
+def limit_requests(max_requests: int | None) -> Iterator[None]:
+    """Allow at most `max_requests` provider requests in flight at once, across all
+    stages running in the enclosed block (and tasks it spawns)."""
+    if max_requests is None:
+        yield
+        return
+    token = _request_slots.set(asyncio.Semaphore(max_requests))
+    try:
+        yield
+    finally:
+        _request_slots.reset(token)
+
+
+@asynccontextmanager
+async def request_slot() -> AsyncIterator[None]:
+    """Hold one of the slots of the active `limit_requests` block, if any, while
+    sending a request."""
+    slots = _request_slots.get()
+    if slots is None:
+        yield
+        return
+    async with slots:
+        yield
 
 
 class LLMProvider(ABC):
@@ -13,11 +110,51 @@ class LLMProvider(ABC):
         """
         pass
 
+    async def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> LLMResponse:
+        """
+        Generate a response along with its metadata (usage, latency, model, ...).
+        The default implementation wraps `generate` and only measures latency;
+        providers that receive usage information should override it.
+
+        `response_format` requests structured output, in the OpenAI format (e.g.
+        `{"type": "json_schema", "json_schema": {...}}`). Providers without native
+        support may ignore it; callers still validate what they receive.
+        """
+        started = time.perf_counter()
+        text = await self.generate(messages)
+        return LLMResponse(text=text, latency=time.perf_counter() - started)
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Stream the response as it is generated. Closing the iterator early cancels
+        the request. The default implementation yields the full response as one chunk.
+        """
+        response = await self.generate_response(messages, response_format)
+        yield StreamChunk(response.text, response.usage, response.finish_reason)
+
     def get_provider_id(self) -> str:
         """Return a unique identifier for this provider configuration."""
         # Default implementation - subclasses should override with config details
         return self.__class__.__name__
 
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this provider, minus
+        secrets (which are read from the environment when it is recreated)."""
+        raise NotImplementedError(f"{self.__class__.__name__} cannot be serialized")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "LLMProvider":
+        """Recreate a provider from the output of `get_config`."""
+        return cls(**config)
+
 
 class MockProvider(LLMProvider):
     """Mock provider for testing."""
@@ -30,14 +167,63 @@ class MockProvider(LLMProvider):
         self.default_response = default_response
         self.map_responses = map_responses
 
-    async def generate(self, messages: List[Dict[str, str]]) -> str:
-        """Mock implementation of generate."""
+    def _respond(self, messages: List[Dict[str, str]]) -> str:
+        """Pick the mocked response for the given messages."""
         if self.map_responses and len(messages) > 0:
             key = str(messages[-1]["content"])
             if key in self.map_responses:
                 return self.map_responses[key]
         return self.default_response
 
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        """Mock implementation of generate."""
+        return self._respond(messages)
+
+    async def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> LLMResponse:
+        """Mock implementation of generate_response with estimated token usage."""
+        started = time.perf_counter()
+        text = await self.generate(messages)
+        return LLMResponse(
+            text=text,
+            usage=Usage(
+                prompt_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+                completion_tokens=estimate_tokens(text),
+            ),
+            latency=time.perf_counter() - started,
+            model="mock",
+            finish_reason="stop",
+        )
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """Mock implementation of stream, yielding the response word by word."""
+        text = self._respond(messages)
+        words = re.findall(r"\S+\s*", text) or [text]
+        for word in words[:-1]:
+            yield StreamChunk(word)
+        yield StreamChunk(
+            words[-1],
+            usage=Usage(
+                prompt_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+                completion_tokens=estimate_tokens(text),
+            ),
+            finish_reason="stop",
+        )
+
     def get_provider_id(self) -> str:
         """Return a unique identifier for this provider configuration."""
         return f"MockProvider({self.default_response}, {self.map_responses})"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments of this provider."""
+        return {
+            "default_response": self.default_response,
+            "map_responses": self.map_responses,
+        }
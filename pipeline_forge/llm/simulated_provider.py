@@ -0,0 +1,171 @@
+import asyncio
+import math
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .provider import MockProvider, StreamChunk, estimate_tokens
+
+
+class SimulatedProviderError(Exception):
+    """Simulated HTTP 500 raised by SimulatedProvider.
+
+    Like real API errors it carries a `status_code`, so it is classified (e.g. as
+    transient) the same way.
+    """
+
+    status_code = 500
+
+
+class SimulatedRateLimitError(SimulatedProviderError):
+    """Simulated HTTP 429 raised by SimulatedProvider."""
+
+    status_code = 429
+
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+class SimulatedProvider(MockProvider):
+    """Mock provider that behaves like a remote API: it sleeps, fails and rate limits.
+
+    Responses are chosen exactly like MockProvider. Every call waits for a latency
+    drawn from the configured distribution plus the time needed to "stream" the
+    response at `tokens_per_second`, so concurrency in the calling code is exercised
+    the same way a real provider would exercise it. All randomness comes from a
+    seeded generator, so a run is reproducible for a fixed call order.
+    """
+
+    def __init__(
+        self,
+        default_response: str = "Mock response",
+        map_responses: Dict[str, str] | None = None,
+        latency: str = "lognormal",
+        latency_mean: float = 0.0,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float | None = None,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        Initialize the simulated provider.
+
+        Args:
+            default_response: Response returned when no mapping matches
+            map_responses: Mapping from the last message's content to a response
+            latency: One of "constant", "uniform", "exponential", "lognormal"
+            latency_mean: Mean request latency in seconds
+            latency_sigma: Shape parameter (log-space std. dev.) for "lognormal"
+            tokens_per_second: Simulated completion throughput; None means instant
+            error_rate: Probability that a call raises SimulatedProviderError
+            rate_limit_rate: Probability that a call raises SimulatedRateLimitError
+            seed: Seed for all random draws
+        """
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution {latency!r}, expected one of {LATENCY_DISTRIBUTIONS}"
+            )
+        super().__init__(default_response=default_response, map_responses=map_responses)
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+
+        self.calls = 0
+        self.chunks_sent = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _sample_latency(self) -> float:
+        """Draw a request latency in seconds."""
+        if self.latency_mean <= 0:
+            return 0.0
+        if self.latency == "constant":
+            return self.latency_mean
+        if self.latency == "uniform":
+            return self._random.uniform(0, 2 * self.latency_mean)
+        if self.latency == "exponential":
+            return self._random.expovariate(1 / self.latency_mean)
+        # lognormal parameterized so that its mean equals latency_mean
+        mu = math.log(self.latency_mean) - self.latency_sigma**2 / 2
+        return self._random.lognormvariate(mu, self.latency_sigma)
+
+    def _raise_simulated_error(self, draw: float) -> None:
+        """Raise the simulated error selected by a uniform draw, if any."""
+        if draw < self.rate_limit_rate:
+            self.rate_limited += 1
+            raise SimulatedRateLimitError("429: simulated rate limit")
+        if draw < self.rate_limit_rate + self.error_rate:
+            self.errors += 1
+            raise SimulatedProviderError("500: simulated provider error")
+
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        """Return the mocked response after a simulated delay, or raise a simulated error."""
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self._sample_latency()
+            draw = self._random.random()
+            response = await super().generate(messages)
+            if self.tokens_per_second:
+                delay += estimate_tokens(response) / self.tokens_per_second
+
+            # Always yield to the event loop, like a network call would
+            await asyncio.sleep(delay)
+
+            self._raise_simulated_error(draw)
+            return response
+        finally:
+            self.in_flight -= 1
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream the mocked response; the latency applies to the first chunk and
+        `tokens_per_second` paces the following ones."""
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self._sample_latency()
+            draw = self._random.random()
+            await asyncio.sleep(delay)
+            self._raise_simulated_error(draw)
+
+            first = True
+            async for chunk in super().stream(messages, response_format):
+                if self.tokens_per_second and not first:
+                    await asyncio.sleep(
+                        estimate_tokens(chunk.text) / self.tokens_per_second
+                    )
+                first = False
+                self.chunks_sent += 1
+                yield chunk
+        finally:
+            self.in_flight -= 1
+
+    def get_provider_id(self) -> str:
+        """Return a unique identifier for this provider configuration."""
+        return f"SimulatedProvider({self.default_response}, {self.map_responses})"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments of this provider."""
+        return {
+            **super().get_config(),
+            "latency": self.latency,
+            "latency_mean": self.latency_mean,
+            "latency_sigma": self.latency_sigma,
+            "tokens_per_second": self.tokens_per_second,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "seed": self.seed,
+        }
@@ -0,0 +1,376 @@
+import ast
+import dis
+import hashlib
+import importlib
+import inspect
+import json
+import linecache
+import os
+import textwrap
+import types
+from typing import Any, Callable, Dict, Optional
+
+import yaml
+
+from pipeline_forge.llm.openai_provider import OpenAIProvider
+from pipeline_forge.llm.provider import LLMProvider, MockProvider
+from pipeline_forge.llm.simulated_provider import SimulatedProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.embedding_stage import EmbeddingStage
+from pipeline_forge.stages.functional_stage import FilterStage, FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.stages.pipeline_stage import PipelineStage
+
+MANIFEST_FORMAT = "pipeline_forge.manifest"
+MANIFEST_VERSION = 1
+
+STAGE_TYPES: Dict[str, type] = {
+    cls.__name__: cls
+    for cls in (LLMStage, FunctionalStage, FilterStage, PipelineStage, EmbeddingStage)
+}
+PROVIDER_TYPES: Dict[str, type] = {
+    cls.__name__: cls for cls in (MockProvider, SimulatedProvider, OpenAIProvider)
+}
+
+
+class ManifestError(ValueError):
+    """Raised when a pipeline cannot be baked, or a manifest cannot be loaded."""
+
+    pass
+
+
+def _instructions(code: types.CodeType) -> tuple:
+    """Return a code object's instructions, comparable across compilations.
+
+    The compiler emits LOAD_ATTR instead of LOAD_METHOD for calls on names the
+    module imports, so both are treated alike, as are jump offsets.
+    """
+    jumps = set(dis.hasjrel) | set(dis.hasjabs)
+    instructions = []
+    for instruction in dis.get_instructions(code):
+        opname = instruction.opname
+        argval = instruction.argval
+        if opname == "LOAD_METHOD":
+            opname = "LOAD_ATTR"
+        if isinstance(argval, types.CodeType):
+            argval = _instructions(argval)
+        elif instruction.opcode in jumps:
+            argval = None
+        instructions.append((opname, argval))
+    return tuple(instructions)
+
+
+def _stable_repr(value: Any) -> str:
+    """Repr a value the same way in every process, e.g. with sets sorted.
+
+    Only immutable values are described by content; other objects (such as a
+    list a function appends to) are described by their type, so that mutating
+    them does not change the description.
+    """
+    if isinstance(value, types.FunctionType):
+        return json.dumps(encode_function(value, lenient=True), sort_keys=True)
+    if isinstance(value, Pipeline):
+        return fingerprint(value)
+    if isinstance(value, frozenset):
+        return "{" + ", ".join(sorted(_stable_repr(item) for item in value)) + "}"
+    if isinstance(value, tuple):
+        return "(" + ", ".join(_stable_repr(item) for item in value) + ")"
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if isinstance(value, type):
+        return f"{value.__module__}:{value.__qualname__}"
+    return f"<{type(value).__module__}.{type(value).__qualname__}>"
+
+
+def _rebound_names(code: types.CodeType) -> set:
+    """Return the closure variables a code object (or code nested in it) assigns."""
+    names = set()
+    for instruction in dis.get_instructions(code):
+        if instruction.opname in ("STORE_DEREF", "DELETE_DEREF"):
+            names.add(instruction.argval)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _rebound_names(const)
+    return names
+
+
+def _describe_function(function: types.FunctionType) -> Dict[str, Any]:
+    """Describe a function for fingerprints and cache keys.
+
+    Covers its bytecode (but not line numbers or the enclosing function, so
+    moving it or loading it from a manifest keeps the description) and the
+    values it captures: defaults and closure cells.
+    """
+    instructions = _stable_repr(_instructions(function.__code__))
+    description = {
+        "module": function.__module__,
+        "name": function.__name__,
+        "code": hashlib.sha256(instructions.encode()).hexdigest(),
+    }
+    if function.__defaults__ or function.__kwdefaults__:
+        kwdefaults = tuple(sorted((function.__kwdefaults__ or {}).items()))
+        description["defaults"] = _stable_repr((function.__defaults__, kwdefaults))
+    if function.__closure__:
+        # Variables the function itself assigns (nonlocal counters) are state
+        rebound = _rebound_names(function.__code__)
+        cells = []
+        for name, cell in zip(function.__code__.co_freevars, function.__closure__):
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                # A cell not assigned yet
+                cells.append(None)
+                continue
+            if value is function:
+                # A recursive local function refers to itself
+                cells.append("<self>")
+                continue
+            if name in rebound:
+                value = object()
+            cells.append(_stable_repr(value))
+        description["closure"] = cells
+    return description
+
+
+def _lambda_source(function: types.FunctionType) -> str:
+    """Extract the source of a lambda from the line(s) that define it."""
+    source = textwrap.dedent(inspect.getsource(function))
+    start = source.find("lambda")
+    while start != -1:
+        # The lambda ends somewhere before the end of the line(s); take the
+        # longest expression that compiles to the same code
+        for end in range(len(source), start, -1):
+            candidate = source[start:end].strip()
+            try:
+                if not isinstance(ast.parse(candidate, mode="eval").body, ast.Lambda):
+                    continue
+            except SyntaxError:
+                continue
+            code = compile(candidate, "<manifest>", "eval").co_consts[0]
+            if _instructions(code) == _instructions(function.__code__):
+                return candidate
+            break
+        start = source.find("lambda", start + 1)
+    raise ManifestError(f"Could not extract the source of {function!r}")
+
+
+def encode_function(function: Callable, lenient: bool = False) -> Dict[str, Any]:
+    """Reference a function by import path, or by source and content hash.
+
+    Module-level functions are stored as "module:qualname". Lambdas and other
+    local functions are stored as source, evaluated in their module's namespace
+    when loaded; they must not close over local variables. With `lenient` (for
+    fingerprints and cache keys, which are never loaded), every function is
+    described by its bytecode and captured values instead, so that closures over
+    different values and edited functions differ.
+    """
+    module = function.__module__
+    qualname = function.__qualname__
+    if lenient and isinstance(function, types.FunctionType):
+        return _describe_function(function)
+    if "<" not in qualname:
+        return {"import": f"{module}:{qualname}"}
+    if getattr(function, "__closure__", None):
+        raise ManifestError(
+            f"Cannot bake {qualname} from {module}: it uses local variables of its "
+            "enclosing function; define it at module level instead"
+        )
+    if function.__name__ == "<lambda>":
+        source = _lambda_source(function)
+    else:
+        source = textwrap.dedent(inspect.getsource(function))
+    return {
+        "source": source,
+        "module": module,
+        "name": function.__name__,
+        "sha256": hashlib.sha256(source.encode()).hexdigest(),
+    }
+
+
+def decode_function(ref: Dict[str, Any]) -> Callable:
+    """Recreate a function from the output of `encode_function`.
+
+    Functions stored as source are executed, so only decode references from a
+    trusted source: the content hash detects corruption, not tampering.
+    """
+    if "import" in ref:
+        module_name, _, qualname = ref["import"].partition(":")
+        obj: Any = importlib.import_module(module_name)
+        for name in qualname.split("."):
+            obj = getattr(obj, name)
+        return obj
+
+    source = ref["source"]
+    if hashlib.sha256(source.encode()).hexdigest() != ref["sha256"]:
+        raise ManifestError("Function source does not match its content hash")
+    try:
+        namespace = dict(vars(importlib.import_module(ref["module"])))
+    except ImportError:
+        namespace = {}
+
+    # Register the source so that inspect.getsource finds it, e.g. to re-bake it
+    filename = f"<pipeline_forge.manifest:{ref['sha256'][:16]}>"
+    lines = source.splitlines(keepends=True)
+    linecache.cache[filename] = (len(source), None, lines, filename)
+    if source.startswith("lambda"):
+        return eval(compile(source, filename, "eval"), namespace)
+    # One namespace, so that the function sees helpers defined next to it
+    name = ref.get("name") or source.split("def ", 1)[-1].split("(", 1)[0].strip()
+    previous = namespace.get(name)
+    exec(compile(source, filename, "exec"), namespace)
+    function = namespace.get(name)
+    if function is None or function is previous:
+        raise ManifestError(f"Function source does not define {name}")
+    return function
+
+
+def _encode_value(value: Any, lenient: bool = False) -> Any:
+    if isinstance(value, Pipeline):
+        return {"$pipeline": fingerprint(value) if lenient else bake(value)}
+    if isinstance(value, (types.FunctionType, type)):
+        # Classes (e.g. exception types) are stored by import path like functions
+        return {"$function": encode_function(value, lenient)}
+    if isinstance(value, dict):
+        return {key: _encode_value(item, lenient) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(item, lenient) for item in value]
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$pipeline" in value:
+            return load(value["$pipeline"])
+        if "$function" in value:
+            return decode_function(value["$function"])
+        return {key: _decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    return value
+
+
+def stage_fingerprint(stage_type: str, config: Dict[str, Any]) -> str:
+    """Return a content hash of an encoded stage definition."""
+    payload = json.dumps(
+        {"type": stage_type, "config": config}, sort_keys=True, default=repr
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def function_fingerprint(function: Callable) -> str:
+    """Return a content hash of a function, for cache keys of its results."""
+    payload = json.dumps(
+        _encode_value(function, lenient=True), sort_keys=True, default=repr
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def fingerprint(pipeline: Pipeline) -> str:
+    """Return a content hash of a pipeline's stage definitions.
+
+    Unlike `bake`, this accepts every stage type and closures, so it can be used
+    for cache keys of any pipeline.
+    """
+    fingerprints = [stage.get_fingerprint() for stage in pipeline.stages]
+    return hashlib.sha256(json.dumps(fingerprints).encode()).hexdigest()
+
+
+def bake(pipeline: Pipeline, llm_provider: LLMProvider | None = None) -> Dict[str, Any]:
+    """Serialize a pipeline (and optionally its provider) to a manifest dict.
+
+    Each stage's "fingerprint" is its `Stage.get_fingerprint()`, the namespace of
+    its cache entries, so a manifest tells which entries a pipeline can reuse.
+    """
+    stages = []
+    for stage in pipeline.stages:
+        stage_type = stage.__class__.__name__
+        if STAGE_TYPES.get(stage_type) is not stage.__class__:
+            raise ManifestError(f"Cannot bake stages of type {stage_type}")
+        config = _encode_value(stage.get_config())
+        stages.append(
+            {
+                "type": stage_type,
+                "name": stage.get_name(),
+                "fingerprint": stage.get_fingerprint(),
+                "config": config,
+            }
+        )
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": MANIFEST_VERSION,
+        "stages": stages,
+        "plan": pipeline.get_plan(),
+    }
+    if llm_provider is not None:
+        manifest["provider"] = bake_provider(llm_provider)
+    return manifest
+
+
+def bake_provider(llm_provider: LLMProvider) -> Dict[str, Any]:
+    """Serialize a provider's type and configuration, without credentials."""
+    provider_type = llm_provider.__class__.__name__
+    if PROVIDER_TYPES.get(provider_type) is not llm_provider.__class__:
+        raise ManifestError(f"Cannot bake providers of type {provider_type}")
+    return {"type": provider_type, "config": llm_provider.get_config()}
+
+
+def decode_provider(spec: Dict[str, Any]) -> LLMProvider:
+    """Recreate a provider from the output of `bake_provider`."""
+    provider_type = PROVIDER_TYPES.get(spec["type"])
+    if provider_type is None:
+        raise ManifestError(f"Unknown provider type {spec['type']}")
+    return provider_type.from_config(spec["config"])
+
+
+def _read(source: Dict[str, Any] | str | os.PathLike) -> Dict[str, Any]:
+    """Return a manifest dict from a dict or a JSON/YAML file."""
+    if isinstance(source, dict):
+        manifest = source
+    else:
+        with open(source) as f:
+            if str(source).endswith((".yaml", ".yml")):
+                manifest = yaml.safe_load(f)
+            else:
+                manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ManifestError(f"Not a pipeline manifest: {source}")
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ManifestError(
+            f"Unsupported manifest version {manifest.get('version')}, "
+            f"expected {MANIFEST_VERSION}"
+        )
+    return manifest
+
+
+def load(source: Dict[str, Any] | str | os.PathLike) -> Pipeline:
+    """Recreate a pipeline from a manifest, reusing its precomputed plan.
+
+    Loading runs the source of the lambdas and local functions stored in the
+    manifest, so only load manifests from a trusted source.
+    """
+    manifest = _read(source)
+    stages = []
+    for spec in manifest["stages"]:
+        stage_type = STAGE_TYPES.get(spec["type"])
+        if stage_type is None:
+            raise ManifestError(f"Unknown stage type {spec['type']}")
+        stages.append(stage_type(**_decode_value(spec["config"])))
+    return Pipeline(stages, plan=manifest["plan"])
+
+
+def load_provider(source: Dict[str, Any] | str | os.PathLike) -> Optional[LLMProvider]:
+    """Recreate the provider stored in a manifest, if any."""
+    spec = _read(source).get("provider")
+    if spec is None:
+        return None
+    return decode_provider(spec)
+
+
+def write(manifest: Dict[str, Any], path: str | os.PathLike) -> None:
+    """Write a manifest as YAML (.yaml/.yml) or JSON (any other extension)."""
+    with open(path, "w") as f:
+        if str(path).endswith((".yaml", ".yml")):
+            yaml.safe_dump(manifest, f, sort_keys=False)
+        else:
+            json.dump(manifest, f, indent=2)
@@ -0,0 +1,286 @@
+import copy
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from pipeline_forge.cache import Cache
+from pipeline_forge.llm.provider import LLMProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.progress import ProgressReporter
+from pipeline_forge.stage import Stage
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.stages.pipeline_stage import PipelineStage
+
+# Per-row cost guesses (seconds) used when stages are not measured on a sample
+DEFAULT_LLM_COST = 1.0
+DEFAULT_COST = 1e-4
+DEFAULT_SELECTIVITY = 0.5
+
+
+@dataclass
+class StageEstimate:
+    """Per-row cost of a stage and, for mask columns it produces, their selectivity."""
+
+    name: str
+    seconds_per_row: float
+    tokens_per_row: float = 0.0
+    selectivity: Dict[str, float] = field(default_factory=dict)
+    measured: bool = False
+
+
+@dataclass
+class OptimizedPlan:
+    """Stage order chosen by the optimizer, with the estimates behind it."""
+
+    original_order: List[str]
+    order: List[str]
+    estimates: List[StageEstimate]
+    pushed_masks: Dict[str, str] = field(default_factory=dict)
+    # Projected (seconds, tokens) per input row of the original and optimized pipeline
+    cost_before: Tuple[float, float] = (0.0, 0.0)
+    cost_after: Tuple[float, float] = (0.0, 0.0)
+
+    def explain(self) -> str:
+        """Describe the optimized order, one stage per line, and the projected cost
+        per input row before and after optimization.
+
+        A stage's rows do not depend on where it runs, so the projected cost only
+        drops with `push_masks=True`, when stages are gated by more masks.
+        """
+        by_name = {estimate.name: estimate for estimate in self.estimates}
+        lines = [
+            "pos  was  stage  cost/row  tokens/row  selectivity  mask",
+        ]
+        for position, name in enumerate(self.order):
+            estimate = by_name[name]
+            selectivity = ", ".join(
+                f"{col}={value:.2f}" for col, value in estimate.selectivity.items()
+            )
+            lines.append(
+                f"{position:>3}  {self.original_order.index(name):>3}  {name}  "
+                f"{estimate.seconds_per_row:.4g}s{'' if estimate.measured else '*'}  "
+                f"{estimate.tokens_per_row:.1f}  {selectivity or '-'}  "
+                f"{self.pushed_masks.get(name, '-')}"
+            )
+        lines.append(
+            f"projected cost/row: {self.cost_before[0]:.4g}s, "
+            f"{self.cost_before[1]:.1f} tokens before; {self.cost_after[0]:.4g}s, "
+            f"{self.cost_after[1]:.1f} tokens after"
+        )
+        if not all(estimate.measured for estimate in self.estimates):
+            lines.append("* estimated, not measured")
+        return "\n".join(lines)
+
+
+def _mask_columns(pipeline: Pipeline) -> Set[str]:
+    """Columns that some stage uses as its filter column."""
+    return {
+        stage.filter_colname
+        for stage in pipeline.stages
+        if stage.filter_colname is not None
+    }
+
+
+def _default_cost(stage: Stage) -> float:
+    if isinstance(stage, LLMStage):
+        return DEFAULT_LLM_COST
+    if isinstance(stage, PipelineStage):
+        return sum(_default_cost(inner) for inner in stage.pipeline.stages)
+    return DEFAULT_COST
+
+
+async def estimate_stages(
+    pipeline: Pipeline,
+    sample: pd.DataFrame | None = None,
+    llm_provider: LLMProvider | None = None,
+    cache: Cache | None = None,
+) -> List[StageEstimate]:
+    """Estimate every stage's per-row cost and its masks' selectivity.
+
+    With a sample, the pipeline is run on it and the stages' time, tokens and the
+    share of True values in each mask column are measured (pass the cache used for
+    the full run so the sample rows are not paid for twice). Without one, LLM
+    stages are assumed to be expensive, other stages cheap, and masks to keep half
+    of the rows.
+    """
+    masks = _mask_columns(pipeline)
+    if sample is None:
+        return [
+            StageEstimate(
+                name=stage.get_name(),
+                seconds_per_row=_default_cost(stage),
+                selectivity={
+                    col: DEFAULT_SELECTIVITY
+                    for col in stage.get_output_columns()
+                    if col in masks
+                },
+            )
+            for stage in pipeline.stages
+        ]
+
+    progress = ProgressReporter([], interval=float("inf"))
+    result = await pipeline.run(
+        sample, llm_provider=llm_provider, cache=cache, progress=progress
+    )
+    estimates = []
+    for stage in pipeline.stages:
+        counters = progress.stages[stage.get_name()]
+        rows = max(counters.total - counters.filtered, 1)
+        estimates.append(
+            StageEstimate(
+                name=stage.get_name(),
+                seconds_per_row=counters.elapsed / rows,
+                tokens_per_row=counters.tokens / rows,
+                selectivity={
+                    col: float(result[col].fillna(False).astype(bool).mean())
+                    for col in stage.get_output_columns()
+                    if col in masks and len(result)
+                },
+                measured=True,
+            )
+        )
+    return estimates
+
+
+def _projected_cost(
+    stages: List[Stage], estimates: List[StageEstimate]
+) -> Tuple[float, float]:
+    """Seconds and tokens per input row, with each stage paid only on the share
+    of rows its mask keeps."""
+    by_name = {estimate.name: estimate for estimate in estimates}
+    selectivity = {
+        col: value
+        for estimate in estimates
+        for col, value in estimate.selectivity.items()
+    }
+    seconds = tokens = 0.0
+    for stage in stages:
+        estimate = by_name[stage.get_name()]
+        share = selectivity.get(stage.filter_colname, 1.0)
+        seconds += estimate.seconds_per_row * share
+        tokens += estimate.tokens_per_row * share
+    return seconds, tokens
+
+
+def _push_masks(stages: List[Stage], keep_columns: Set[str]) -> Dict[int, str]:
+    """Find unfiltered stages whose outputs only feed stages gated by one mask.
+
+    Such a stage can be gated by the same mask: the rows it would skip are
+    replaced by the filter fallback value downstream anyway. Returns the mask
+    pushed into each stage, by position. Propagates backwards until no more
+    stages qualify.
+    """
+    producer = {col: i for i, stage in enumerate(stages) for col in stage.get_outputs()}
+
+    def ancestors(i: int) -> Set[int]:
+        found: Set[int] = set()
+        todo = [i]
+        while todo:
+            for col in stages[todo.pop()].get_dependencies():
+                j = producer.get(col)
+                if j is not None and j not in found:
+                    found.add(j)
+                    todo.append(j)
+        return found
+
+    masks = {i: stage.filter_colname for i, stage in enumerate(stages)}
+    pushed: Dict[int, str] = {}
+    changed = True
+    while changed:
+        changed = False
+        for i, stage in enumerate(stages):
+            if masks[i] is not None or stage.get_outputs() & keep_columns:
+                continue
+            consumers = [
+                j
+                for j, other in enumerate(stages)
+                if j != i and other.get_dependencies() & stage.get_outputs()
+            ]
+            consumer_masks = {masks[j] for j in consumers}
+            if not consumers or len(consumer_masks) != 1:
+                continue
+            (mask,) = consumer_masks
+            if mask is None or mask in stage.get_outputs():
+                continue
+            # The mask must not depend on this stage
+            mask_producer = producer.get(mask)
+            if mask_producer is not None and i in ancestors(mask_producer):
+                continue
+            masks[i] = pushed[i] = mask
+            changed = True
+    return pushed
+
+
+def optimize(
+    pipeline: Pipeline,
+    estimates: List[StageEstimate],
+    push_masks: bool = False,
+    keep_columns: List[str] | None = None,
+) -> Pipeline:
+    """Return a pipeline whose stages run cheap, selective filters first.
+
+    Stages are ordered greedily among those whose dependencies are ready: stages
+    producing a mask column come first, by rank (selectivity - 1) / cost (the
+    classic predicate-ordering rule), and the others keep their relative order.
+    Reordering alone gives the same output as the original pipeline, and costs
+    the same: every stage still processes the same rows.
+
+    With `push_masks`, unfiltered stages whose outputs are only used by stages
+    gated on one mask are gated on it too (on copies of the stages). This
+    changes the output: their columns hold the filter fallback value for rows
+    the mask excludes. Columns in `keep_columns` are always computed for every
+    row.
+    """
+    stages = list(pipeline.stages)
+    estimate_by_name = {estimate.name: estimate for estimate in estimates}
+
+    pushed: Dict[int, str] = {}
+    if push_masks:
+        pushed = _push_masks(stages, set(keep_columns or []))
+        for i, mask in pushed.items():
+            stage = copy.copy(stages[i])
+            stage.filter_colname = mask
+            stage.filter_fallback_value = next(
+                other.filter_fallback_value
+                for other in stages
+                if other.filter_colname == mask
+            )
+            stages[i] = stage
+
+    producer = {col: i for i, stage in enumerate(stages) for col in stage.get_outputs()}
+    dependencies = [
+        {producer[col] for col in stage.get_dependencies() if col in producer} - {i}
+        for i, stage in enumerate(stages)
+    ]
+
+    def rank(i: int) -> tuple:
+        estimate = estimate_by_name[stages[i].get_name()]
+        if not estimate.selectivity:
+            return (0.0, i)
+        selectivity = min(estimate.selectivity.values())
+        cost = max(estimate.seconds_per_row, 1e-9)
+        return ((selectivity - 1) / cost, i)
+
+    order: List[int] = []
+    done: Set[int] = set()
+    while len(order) < len(stages):
+        ready = [
+            i for i in range(len(stages)) if i not in done and dependencies[i] <= done
+        ]
+        if not ready:
+            raise ValueError("The pipeline's stages have a cyclic dependency")
+        chosen = min(ready, key=rank)
+        order.append(chosen)
+        done.add(chosen)
+
+    optimized = Pipeline([stages[i] for i in order])
+    optimized.optimization = OptimizedPlan(
+        original_order=[stage.get_name() for stage in pipeline.stages],
+        order=[stages[i].get_name() for i in order],
+        estimates=estimates,
+        pushed_masks={stages[i].get_name(): mask for i, mask in pushed.items()},
+        cost_before=_projected_cost(pipeline.stages, estimates),
+        cost_after=_projected_cost(stages, estimates),
+    )
+    return optimized
@@ -0,0 +1,63 @@
+import re
+from typing import List
+
+from pipeline_forge.llm.provider import Usage
+
+_ITEM_LINE = re.compile(r"^\s*(\d+)[.)]\s?(.*)$")
+
+
+class PackParseError(ValueError):
+    """Raised when a packed response cannot be split back into one answer per item."""
+
+    pass
+
+
+def format_packed_items(items: List[str]) -> str:
+    """Format several row prompts as one numbered-list request."""
+    lines = [
+        f"Answer each of the following {len(items)} items independently. Reply with "
+        "exactly one numbered answer per item, in order, formatted as "
+        "'<number>. <answer>', and nothing else.",
+        "",
+    ]
+    lines += [f"{i}. {item}" for i, item in enumerate(items, start=1)]
+    return "\n".join(lines)
+
+
+def parse_packed_response(text: str, n_items: int) -> List[str]:
+    """Split a numbered-list response into exactly `n_items` answers.
+
+    Lines that do not start a new number continue the previous answer. Raises
+    PackParseError if the numbers are not exactly 1..n_items in order.
+    """
+    answers: List[List[str]] = []
+    for line in text.strip().splitlines():
+        match = _ITEM_LINE.match(line)
+        if match and int(match.group(1)) == len(answers) + 1:
+            answers.append([match.group(2)])
+        elif answers:
+            answers[-1].append(line)
+        elif line.strip():
+            raise PackParseError(f"text before the first item: {line!r}")
+    if len(answers) != n_items:
+        raise PackParseError(f"expected {n_items} answers, got {len(answers)}")
+    return ["\n".join(lines).strip() for lines in answers]
+
+
+def split_usage(usage: Usage | None, n_items: int) -> List[Usage | None]:
+    """Split the usage of a packed request evenly across its items."""
+    if usage is None:
+        return [None] * n_items
+
+    def shares(total: int) -> List[int]:
+        base, extra = divmod(total, n_items)
+        return [base + (i < extra) for i in range(n_items)]
+
+    return [
+        Usage(*fields)
+        for fields in zip(
+            shares(usage.prompt_tokens),
+            shares(usage.completion_tokens),
+            shares(usage.cached_tokens),
+        )
+    ]
@@ -6,9 +6,12 @@ import asyncio
 import hashlib
 import uuid
 
+from pipeline_forge.budget import Budget, get_budget, use_budget
 from pipeline_forge.cache import Cache
 from pipeline_forge.llm.provider import LLMProvider
 from pipeline_forge.stage import Stage
+from pipeline_forge.progress import ProgressReporter, use_progress
+from pipeline_forge.tracing import Tracer, trace, use_tracer
 
 T = TypeVar("T")
 
@@ -16,11 +19,23 @@ T = TypeVar("T")
 class Pipeline:
     """Orchestrates the execution of multiple stages in sequence."""
 
-    def __init__(self, stages: List["Stage"]):
-        from pipeline_forge.stage import Stage
-
+    def __init__(self, stages: List["Stage"], plan: Dict[str, Any] | None = None):
+        """
+        Args:
+            stages: The stages of the pipeline
+            plan: A plan precomputed by `get_plan` (e.g. from a baked manifest),
+                which skips planning
+        """
         self.stages = stages
-        self._stage_by_output = self._index_stages_by_output()
+        self._plan = plan
+        # Set by `optimize` on the pipeline it returns
+        self.optimization = None
+        if plan is None:
+            self._stage_by_output = self._index_stages_by_output()
+        else:
+            self._stage_by_output = {
+                col: stages[i] for col, i in plan["stage_by_output"].items()
+            }
 
     def _index_stages_by_output(self) -> Dict[str, "Stage"]:
         """Create a mapping from output column to the stage that produces it."""
@@ -30,24 +45,297 @@ class Pipeline:
                 index[col] = stage
         return index
 
+    def get_plan(self) -> Dict[str, Any]:
+        """Return the execution plan: the stage producing each column, each stage's
+        upstream stages, and an order in which every stage follows its upstreams.
+
+        Stages are referred to by their position in `stages`.
+        """
+        if self._plan is None:
+            position = {id(stage): i for i, stage in enumerate(self.stages)}
+            graph = nx.DiGraph()
+            graph.add_nodes_from(range(len(self.stages)))
+            for i, stage in enumerate(self.stages):
+                for col in stage.get_dependencies():
+                    producer = self._stage_by_output.get(col)
+                    if producer is not None and producer is not stage:
+                        graph.add_edge(position[id(producer)], i)
+            try:
+                order = list(nx.lexicographical_topological_sort(graph))
+            except nx.NetworkXUnfeasible as e:
+                raise ValueError(
+                    "The pipeline's stages have a cyclic dependency"
+                ) from e
+            self._plan = {
+                "stage_by_output": {
+                    col: position[id(stage)]
+                    for col, stage in self._stage_by_output.items()
+                },
+                "dependencies": [
+                    sorted(graph.predecessors(i)) for i in range(len(self.stages))
+                ],
+                "order": order,
+            }
+        return self._plan
+
+    async def optimize(
+        self,
+        sample: pd.DataFrame | None = None,
+        llm_provider: Optional["LLMProvider"] = None,
+        cache: Optional["Cache"] = None,
+        push_masks: bool = False,
+        keep_columns: List[str] | None = None,
+    ) -> "Pipeline":
+        """Return an equivalent pipeline that runs cheap, selective filters first.
+
+        Stage costs and filter selectivities are measured by running on `sample`
+        (or guessed without one). With `push_masks`, stages whose outputs only feed
+        stages filtered on one mask are filtered on it too, except for stages
+        producing `keep_columns`; the pipeline is then no longer equivalent, as
+        their columns hold the filter fallback value for the excluded rows. Only
+        then do stages skip rows they would otherwise process, so savings need
+        `push_masks=True`; `explain` reports the projected cost before and after.
+        See `optimizer.optimize`.
+        """
+        from pipeline_forge import optimizer
+
+        estimates = await optimizer.estimate_stages(self, sample, llm_provider, cache)
+        return optimizer.optimize(self, estimates, push_masks, keep_columns)
+
+    def explain(self) -> str:
+        """Describe the execution order (and the optimizer's reasoning, if any)."""
+        if self.optimization is not None:
+            return self.optimization.explain()
+        return "\n".join(
+            f"{position:>3}  {self.stages[i].get_name()}"
+            for position, i in enumerate(self.get_plan()["order"])
+        )
+
+    def get_fingerprint(self) -> str:
+        """Return a content hash of the stage definitions (used in cache keys)."""
+        from pipeline_forge import manifest
+
+        return manifest.fingerprint(self)
+
+    def bake(
+        self,
+        path: str | None = None,
+        llm_provider: Optional["LLMProvider"] = None,
+    ) -> Dict[str, Any]:
+        """Serialize the pipeline to a versioned manifest, optionally writing it to
+        `path` (YAML for .yaml/.yml, JSON otherwise).
+
+        The manifest holds the stage definitions and fingerprints, the execution
+        plan, and the provider's configuration without credentials.
+        """
+        from pipeline_forge import manifest
+
+        baked = manifest.bake(self, llm_provider)
+        if path is not None:
+            manifest.write(baked, path)
+        return baked
+
+    @classmethod
+    def load(cls, source: Dict[str, Any] | str) -> "Pipeline":
+        """Recreate a pipeline from a manifest dict or file written by `bake`.
+
+        Loading runs the function source stored in the manifest, so only load
+        manifests from a trusted source.
+        """
+        from pipeline_forge import manifest
+
+        return manifest.load(source)
+
     async def run(
         self,
         data: pd.DataFrame,
         llm_provider: Optional["LLMProvider"] = None,
         cache: Optional["Cache"] = None,
+        tracer: Optional[Tracer] = None,
+        budget: Optional[Budget] = None,
+        progress: Optional[ProgressReporter] = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Run the entire pipeline on the provided data.
+
+        If a tracer is given, spans are recorded for every stage, row, cache
+        operation and provider call made during the run (including nested pipelines).
+        If a budget is given, all LLM stages share it; rows left unprocessed once it is
+        exhausted are flagged in the budget's marker column.
+        If a progress reporter is given, every stage (including nested ones) reports
+        its row and token counters to it, and a final snapshot is sent at the end.
+        """
+        with use_tracer(tracer), use_budget(budget), use_progress(progress), trace(
+            "pipeline", "run", rows=len(data)
+        ):
+            result = data.copy()
+
+            for stage in self.stages:
+                result = await self._run_stage(
+                    stage, result, llm_provider=llm_provider, cache=cache, **kwargs
+                )
+
+            if budget is not None:
+                result = budget.mark(result)
+            if progress is not None:
+                progress.close()
+            return result
+
+    async def run_dataflow(
+        self,
+        data: pd.DataFrame,
+        llm_provider: Optional["LLMProvider"] = None,
+        cache: Optional["Cache"] = None,
+        tracer: Optional[Tracer] = None,
+        budget: Optional[Budget] = None,
+        progress: Optional[ProgressReporter] = None,
+        batch_size: int = 128,
+        max_concurrency: int = 16,
+        queue_size: int = 64,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Run the pipeline micro-batch by micro-batch without waiting for a
+        stage to finish every row before the next one starts.
+
+        See `dataflow.run_dataflow` for the parameters; the output matches `run`.
+        """
+        from pipeline_forge import dataflow
+
+        return await dataflow.run_dataflow(
+            self,
+            data,
+            llm_provider=llm_provider,
+            cache=cache,
+            tracer=tracer,
+            budget=budget,
+            progress=progress,
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            queue_size=queue_size,
+            **kwargs,
+        )
+
+    async def run_stage(
+        self,
+        stage: Stage,
+        data: pd.DataFrame,
+        llm_provider: LLMProvider | None = None,
+        cache: Cache | None = None,
+        tracer: Tracer | None = None,
+        budget: Budget | None = None,
         **kwargs,
     ) -> pd.DataFrame:
-        """Run the entire pipeline on the provided data."""
+        """Run a specific stage and all its dependencies on the provided data.
+
+        Dependencies are evaluated on demand: a filtered stage's filter column is
+        computed first, and upstream stages that only feed it (directly or through
+        other such stages) then run only on the rows the filter keeps. Row subsets
+        propagate backwards through further filters. Columns of those upstream
+        stages are None on the rows they skipped. Stages whose outputs are used
+        elsewhere in the pipeline still run on every row.
+        """
+        with use_tracer(tracer), use_budget(budget):
+            if stage in self.stages:
+                result = await self._run_on_demand(
+                    stage, data, llm_provider=llm_provider, cache=cache, **kwargs
+                )
+            else:
+                result = await self._run_stage(
+                    stage, data, llm_provider=llm_provider, cache=cache, **kwargs
+                )
+            if budget is not None:
+                result = budget.mark(result)
+            return result
+
+    def _demand_restrictable(self, target: int) -> Set[int]:
+        """Return the upstream stages of `target` whose outputs only feed it (directly
+        or through other such stages), which can therefore run on a row subset."""
+        dependencies = self.get_plan()["dependencies"]
+        upstream: Set[int] = set()
+        todo = [target]
+        while todo:
+            for i in dependencies[todo.pop()]:
+                if i not in upstream:
+                    upstream.add(i)
+                    todo.append(i)
+        consumers: DefaultDict[int, Set[int]] = defaultdict(set)
+        for i, deps in enumerate(dependencies):
+            for dep in deps:
+                consumers[dep].add(i)
+        return {i for i in upstream if consumers[i] <= upstream | {target}}
+
+    async def _run_on_demand(
+        self,
+        stage: Stage,
+        data: pd.DataFrame,
+        llm_provider: LLMProvider | None = None,
+        cache: Cache | None = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Run a stage and its missing dependencies, each on the rows it is needed for."""
+        position = {id(s): i for i, s in enumerate(self.stages)}
+        target = position[id(stage)]
+        restrictable = self._demand_restrictable(target)
         result = data.copy()
+        available = set(data.columns)
+        # Rows each stage has been run on so far
+        done: Dict[int, pd.Index] = {}
 
-        for stage in self.stages:
-            result = await self.run_stage(
-                stage, result, llm_provider=llm_provider, cache=cache, **kwargs
+        async def need(col: str, rows: pd.Index) -> None:
+            if col in available:
+                return
+            producer = self._stage_by_output.get(col)
+            if producer is None:
+                raise ValueError(f"Unable to compute required dependencies: {col}")
+            await compute(position[id(producer)], rows)
+
+        async def compute(i: int, rows: pd.Index) -> None:
+            nonlocal result
+            current = self.stages[i]
+            if i != target and i not in restrictable:
+                rows = result.index
+            if i in done:
+                rows = rows.difference(done[i], sort=False)
+            if rows.empty:
+                return
+
+            # The filter column first, so the other inputs are only computed where
+            # it holds
+            input_rows = rows
+            if current.filter_colname is not None:
+                await need(current.filter_colname, rows)
+                input_rows = rows[result.loc[rows, current.filter_colname].eq(True)]
+            for col in sorted(current.get_dependencies() - {current.filter_colname}):
+                await need(col, input_rows)
+
+            subset = result.loc[rows]
+            budget = get_budget()
+            if budget is not None and budget.get_skipped():
+                subset = subset[~budget.skipped_mask(subset.index)]
+            processed = await current.process(
+                subset, llm_provider=llm_provider, cache=cache, **kwargs
             )
 
+            columns = current.get_output_columns()
+            if len(processed) == len(result) and not set(columns) & set(result):
+                result = pd.concat([result, processed[columns]], axis=1)
+            else:
+                for col in columns:
+                    if col not in result.columns:
+                        result[col] = pd.Series(
+                            [None] * len(result), index=result.index, dtype=object
+                        )
+                if len(processed):
+                    result.loc[processed.index, columns] = processed[columns].astype(
+                        object
+                    )
+            available.update(columns)
+            done[i] = rows if i not in done else done[i].append(rows)
+
+        await compute(target, result.index)
         return result
 
-    async def run_stage(
+    async def _run_stage(
         self,
         stage: Stage,
         data: pd.DataFrame,
@@ -55,13 +343,13 @@ class Pipeline:
         cache: Cache | None = None,
         **kwargs,
     ) -> pd.DataFrame:
-        """Run a specific stage and all its dependencies on the provided data."""
+        """Run a stage and its dependencies under the already-active tracer."""
         result = data.copy()
 
         # Check if all dependencies are available
         missing_deps = set(stage.get_dependencies()) - set(result.columns)
 
-        output_to_stage = self._index_stages_by_output()
+        output_to_stage = self._stage_by_output
         # If we have missing dependencies, compute them first
         if missing_deps:
             # Find which stages produce our missing dependencies
@@ -69,7 +357,7 @@ class Pipeline:
                 if column in output_to_stage:
                     # Recursively run the dependency stage
                     dep_stage = output_to_stage[column]
-                    result = await self.run_stage(
+                    result = await self._run_stage(
                         dep_stage,
                         result,
                         llm_provider=llm_provider,
@@ -85,11 +373,66 @@ class Pipeline:
             )
 
         # Finally, process the stage itself
+        return await self._process_stage(
+            stage, result, llm_provider=llm_provider, cache=cache, **kwargs
+        )
+
+    async def _process_stage(
+        self,
+        stage: Stage,
+        data: pd.DataFrame,
+        llm_provider: LLMProvider | None = None,
+        cache: Cache | None = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Process a stage whose inputs are available, except on budget-skipped rows."""
+        # Rows skipped by an exhausted budget are not processed any further
+        budget = get_budget()
+        if budget is not None and budget.get_skipped():
+            skipped = budget.skipped_mask(data.index)
+            if skipped.any():
+                processed = await stage.process(
+                    data[~skipped], llm_provider=llm_provider, cache=cache, **kwargs
+                )
+                return pd.concat([processed, data[skipped]]).reindex(data.index)
+
         return await stage.process(
-            result, llm_provider=llm_provider, cache=cache, **kwargs
+            data, llm_provider=llm_provider, cache=cache, **kwargs
         )
 
-    def clear_caches(self):
-        """Clear caches for all stages."""
-        for stage in self.stages:
-            stage.clear_cache()
+    def get_cache_namespaces(self) -> List[str]:
+        """Return the fingerprints under which the stages store cache entries."""
+        return [ns for stage in self.stages for ns in stage.get_cache_namespaces()]
+
+    def clear_caches(self, cache: Cache, stages: List[Stage] | None = None) -> int:
+        """Delete the cache entries of the given stages (all by default), leaving
+        other entries, and return how many were deleted.
+
+        Backends without stage tags (see `Cache.supports_stages`) cannot tell the
+        stages' entries apart, so nothing is deleted; use `cache.clear()`.
+        """
+        stages = self.stages if stages is None else stages
+        return sum(stage.clear_cache(cache) for stage in stages)
+
+    def prune_cache(self, cache: Cache) -> int:
+        """Delete the entries of stages that are no longer in this pipeline, such as
+        earlier versions of an edited prompt, and return how many were deleted.
+
+        Untagged entries are kept, so nothing is deleted from backends without
+        stage tags.
+        """
+        if not cache.supports_stages:
+            return 0
+        current = set(self.get_cache_namespaces())
+        stale = [s for s in cache.stage_counts() if s is not None and s not in current]
+        return cache.delete_stages(stale)
+
+    def get_cache_stats(self, cache: Cache) -> Dict[str, Dict[str, int]]:
+        """Return the hits, misses and size of each stage's cache namespace
+        (empty for backends without stage tags, which stages use directly)."""
+        if not cache.supports_stages:
+            return {}
+        return {
+            stage.get_name(): cache.namespace(stage.get_fingerprint()).get_stats()
+            for stage in self.stages
+        }
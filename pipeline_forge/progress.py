@@ -0,0 +1,297 @@
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+
+@dataclass
+class StageProgress:
+    """Counters for one stage of a run.
+
+    `completed` counts every row the stage finished, including the `cached` and
+    `failed` ones; `filtered` rows were skipped by the stage's filter column.
+    `planned` stages had their `total` registered up front (see `plan_stage`);
+    `active` counts the calls of the stage in progress.
+    """
+
+    name: str
+    total: int = 0
+    completed: int = 0
+    cached: int = 0
+    failed: int = 0
+    filtered: int = 0
+    tokens: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    planned: bool = False
+    active: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rows_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the stage finishes at its current rate (None if unknown)."""
+        if self.finished_at is not None:
+            return 0.0
+        remaining = self.total - self.filtered - self.completed
+        rate = self.rows_per_sec
+        if self.started_at is None or rate <= 0:
+            return None
+        return max(remaining, 0) / rate
+
+
+@dataclass
+class ProgressSnapshot:
+    """Copy of every stage's counters at one point of a run."""
+
+    stages: List[StageProgress]
+    elapsed: float
+    final: bool = False
+
+    @property
+    def eta(self) -> Optional[float]:
+        """ETA of the slowest running stage (stages run concurrently or nested)."""
+        etas = [
+            stage.eta
+            for stage in self.stages
+            if stage.started_at is not None and stage.finished_at is None
+        ]
+        if not etas or None in etas:
+            return None
+        return max(etas)
+
+
+ProgressCallback = Callable[[ProgressSnapshot], None]
+
+
+class ProgressReporter:
+    """Aggregates per-stage row and token counters and delivers periodic snapshots.
+
+    Stages only increment counters; callbacks are invoked at most once every
+    `interval` seconds, when a stage finishes for the last time, and once more on
+    `close`. A planned stage (e.g. run once per micro-batch) finishes for the last
+    time once all its rows are done. Stages of nested pipelines are reported under
+    "<outer stage>/<inner stage>".
+    """
+
+    def __init__(self, callbacks: List[ProgressCallback], interval: float = 1.0):
+        self.callbacks = callbacks
+        self.interval = interval
+        self.stages: Dict[str, StageProgress] = {}
+        self._started_at = time.monotonic()
+        self._last_emit = 0.0
+
+    def plan_stage(self, name: str, total: int) -> StageProgress:
+        """Register the total rows of a stage that will be started several times.
+
+        Its starts add no rows to the total, and it only counts as finished once
+        `total` rows are completed or filtered.
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageProgress(name)
+        stage.total += total
+        stage.planned = True
+        return stage
+
+    def start_stage(self, name: str, total: int) -> StageProgress:
+        """Register (or restart) a stage processing `total` rows."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageProgress(name)
+        if not stage.planned:
+            stage.total += total
+        if stage.started_at is None:
+            stage.started_at = time.monotonic()
+        stage.finished_at = None
+        stage.active += 1
+        return stage
+
+    def advance(
+        self,
+        stage: StageProgress,
+        completed: int = 1,
+        cached: int = 0,
+        failed: int = 0,
+        tokens: int = 0,
+    ) -> None:
+        """Count finished rows of a stage."""
+        stage.completed += completed
+        stage.cached += cached
+        stage.failed += failed
+        stage.tokens += tokens
+        now = time.monotonic()
+        if now - self._last_emit >= self.interval:
+            self._emit(now)
+
+    def finish_stage(self, stage: StageProgress) -> None:
+        """End one call of a stage, delivering a snapshot if it was the last."""
+        stage.active -= 1
+        now = time.monotonic()
+        if stage.active == 0 and self._done(stage):
+            stage.finished_at = now
+            if self._done_with_ancestors(stage):
+                self._emit(now)
+                return
+        if now - self._last_emit >= self.interval:
+            self._emit(now)
+
+    @staticmethod
+    def _done(stage: StageProgress) -> bool:
+        return not stage.planned or stage.completed + stage.filtered >= stage.total
+
+    def _done_with_ancestors(self, stage: StageProgress) -> bool:
+        """Whether no enclosing stage still has calls or planned rows to go."""
+        parts = stage.name.split("/")
+        for depth in range(1, len(parts)):
+            parent = self.stages.get("/".join(parts[:depth]))
+            if parent is not None and not self._done(parent):
+                return False
+        return True
+
+    def snapshot(self, final: bool = False) -> ProgressSnapshot:
+        return ProgressSnapshot(
+            stages=[replace(stage) for stage in self.stages.values()],
+            elapsed=time.monotonic() - self._started_at,
+            final=final,
+        )
+
+    def close(self) -> None:
+        """Deliver a final snapshot."""
+        snapshot = self.snapshot(final=True)
+        for callback in self.callbacks:
+            callback(snapshot)
+
+    def _emit(self, now: float) -> None:
+        self._last_emit = now
+        snapshot = self.snapshot()
+        for callback in self.callbacks:
+            callback(snapshot)
+
+
+def _format_count(value: float) -> str:
+    if value >= 1_000_000:
+        return f"{value / 1_000_000:.1f}M"
+    if value >= 1_000:
+        return f"{value / 1_000:.1f}k"
+    return f"{value:.0f}"
+
+
+def format_stage(stage: StageProgress) -> str:
+    """Render a stage's counters as one line."""
+    eta = stage.eta
+    return (
+        f"{stage.name}: {stage.completed}/{stage.total - stage.filtered} rows "
+        f"({stage.cached} cached, {stage.failed} failed, {stage.filtered} filtered) "
+        f"{_format_count(stage.rows_per_sec)} rows/s "
+        f"{_format_count(stage.tokens_per_sec)} tok/s "
+        f"ETA {'?' if eta is None else f'{eta:.0f}s'}"
+    )
+
+
+class TerminalRenderer:
+    """Redraws one line per stage on a terminal."""
+
+    def __init__(self, stream: TextIO = sys.stderr):
+        self.stream = stream
+        self._lines = 0
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        if self._lines:
+            # Move the cursor back up over the previous render
+            self.stream.write(f"\x1b[{self._lines}F")
+        lines = [format_stage(stage) for stage in snapshot.stages]
+        for line in lines:
+            self.stream.write(f"\x1b[2K{line}\n")
+        self.stream.flush()
+        self._lines = 0 if snapshot.final else len(lines)
+
+
+class LogRenderer:
+    """Logs one line per stage and snapshot."""
+
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("pipeline_forge.progress")
+        self.level = level
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        for stage in snapshot.stages:
+            self.logger.log(self.level, format_stage(stage))
+
+
+_active_progress: ContextVar[Optional[ProgressReporter]] = ContextVar(
+    "pipeline_forge_progress", default=None
+)
+_stage_path: ContextVar[str] = ContextVar("pipeline_forge_stage_path", default="")
+_current_stage: ContextVar[Optional[StageProgress]] = ContextVar(
+    "pipeline_forge_stage_progress", default=None
+)
+
+
+def get_progress() -> Optional[ProgressReporter]:
+    """Return the progress reporter active in the current context, if any."""
+    return _active_progress.get()
+
+
+@contextmanager
+def use_progress(
+    progress: Optional[ProgressReporter],
+) -> Iterator[Optional[ProgressReporter]]:
+    """Make `progress` the active reporter for the enclosed block (and tasks it spawns)."""
+    if progress is None:
+        yield get_progress()
+        return
+    token = _active_progress.set(progress)
+    try:
+        yield progress
+    finally:
+        _active_progress.reset(token)
+
+
+@contextmanager
+def stage_progress(name: str, total: int) -> Iterator[Optional[StageProgress]]:
+    """Track a stage on the active reporter, nesting its name under enclosing stages.
+
+    Yields None (and costs nothing further) if no reporter is active.
+    """
+    progress = _active_progress.get()
+    if progress is None:
+        yield None
+        return
+    parent = _stage_path.get()
+    path = f"{parent}/{name}" if parent else name
+    stage = progress.start_stage(path, total)
+    path_token = _stage_path.set(path)
+    stage_token = _current_stage.set(stage)
+    try:
+        yield stage
+    finally:
+        _current_stage.reset(stage_token)
+        _stage_path.reset(path_token)
+        progress.finish_stage(stage)
+
+
+def advance(
+    completed: int = 1, cached: int = 0, failed: int = 0, tokens: int = 0
+) -> None:
+    """Count finished rows of the current stage, if progress is being reported."""
+    stage = _current_stage.get()
+    if stage is not None:
+        _active_progress.get().advance(stage, completed, cached, failed, tokens)
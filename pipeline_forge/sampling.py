@@ -0,0 +1,219 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pipeline_forge.cache import Cache, InMemoryCache
+from pipeline_forge.llm.provider import LLMProvider, Usage
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.stages.pipeline_stage import PipelineStage
+
+
+def _row_hashes(
+    data: pd.DataFrame, key_columns: List[str] | None, seed: int
+) -> np.ndarray:
+    """Return a deterministic pseudo-random hash per row, based on its key values."""
+    keys = data if key_columns is None else data[key_columns]
+    hash_key = f"{seed:016d}"[-16:]
+    return pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy()
+
+
+def hash_sample(
+    data: pd.DataFrame,
+    n: int,
+    key_columns: List[str] | None = None,
+    stratify_by: str | None = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Return a deterministic sample of `n` rows, in the original row order.
+
+    Rows are ranked by a hash of their key columns (all columns by default) and
+    the lowest-ranked rows are taken, so a sample of n rows contains every smaller
+    sample and the same rows are picked on every run. With `stratify_by`, each
+    value of that column gets a share of the sample proportional to its frequency.
+    """
+    if n >= len(data):
+        return data
+    hashes = _row_hashes(data, key_columns, seed)
+    if stratify_by is None:
+        chosen = np.argsort(hashes, kind="stable")[:n]
+        return data.iloc[np.sort(chosen)]
+
+    strata = data[stratify_by].to_numpy()
+    values, counts = np.unique(strata, return_counts=True)
+    # Largest-remainder allocation of the n rows across strata
+    quotas = counts * n / len(data)
+    allocation = np.floor(quotas).astype(int)
+    remainder = n - allocation.sum()
+    allocation[np.argsort(-(quotas - allocation), kind="stable")[:remainder]] += 1
+
+    chosen = []
+    for value, quota in zip(values, allocation):
+        positions = np.flatnonzero(strata == value)
+        order = np.argsort(hashes[positions], kind="stable")
+        chosen.append(positions[order[:quota]])
+    return data.iloc[np.sort(np.concatenate(chosen))]
+
+
+def _llm_stages(pipeline: Pipeline) -> List[LLMStage]:
+    """Return the LLM stages of a pipeline, including those of nested pipelines."""
+    stages = []
+    for stage in pipeline.stages:
+        if isinstance(stage, LLMStage):
+            stages.append(stage)
+        elif isinstance(stage, PipelineStage):
+            stages.extend(_llm_stages(stage.pipeline))
+    return stages
+
+
+def _total_variation(p: pd.Series, q: pd.Series) -> float:
+    """Total variation distance between two normalized value counts."""
+    p, q = p.align(q, fill_value=0.0)
+    return float((p - q).abs().sum() / 2)
+
+
+@dataclass
+class SampleReport:
+    """Outcome of one step of a progressive run."""
+
+    rows: int
+    new_rows: int
+    seconds: float
+    usage: Usage
+    projected_usage: Usage
+    projected_cost: float
+    projected_seconds: float
+    distributions: Dict[str, Dict[Any, float]] = field(default_factory=dict)
+    drift: Dict[str, float] = field(default_factory=dict)
+
+
+class ProgressiveRunner:
+    """Runs a pipeline on growing, nested samples of the data.
+
+    Each step runs on a superset of the previous sample, so with a shared cache only
+    the new rows cost LLM requests. After each step the runner reports the
+    distribution of the watched output columns, how far it moved since the previous
+    step (total variation distance), and a projection of the full run's tokens,
+    cost and time from the requests made for the new rows.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        llm_provider: LLMProvider | None = None,
+        cache: Cache | None = None,
+        sizes: Sequence[int] = (100, 1_000, 10_000),
+        key_columns: List[str] | None = None,
+        stratify_by: str | None = None,
+        watch_columns: List[str] | None = None,
+        prompt_price: float = 0.0,
+        completion_price: float = 0.0,
+        stable_drift: float | None = None,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            pipeline: The pipeline to run
+            llm_provider: Provider passed to every run
+            cache: Cache shared by the steps (a new InMemoryCache by default)
+            sizes: Sample sizes, in increasing order
+            key_columns: Columns hashed to select rows (all columns by default)
+            stratify_by: Column whose value frequencies each sample preserves
+            watch_columns: Output columns whose distributions are reported
+            prompt_price: Dollars per million prompt tokens, for cost projections
+            completion_price: Dollars per million completion tokens
+            stable_drift: Stop growing once every watched column moved by at most
+                this total variation distance since the previous step
+            seed: Seed of the row hashes; change it to draw a different sample
+        """
+        self.pipeline = pipeline
+        self.llm_provider = llm_provider
+        self.cache = cache if cache is not None else InMemoryCache()
+        self.sizes = sorted(sizes)
+        self.key_columns = key_columns
+        self.stratify_by = stratify_by
+        self.watch_columns = watch_columns or []
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.stable_drift = stable_drift
+        self.seed = seed
+        self.reports: List[SampleReport] = []
+        self.result: Optional[pd.DataFrame] = None
+
+    def _usage(self) -> Usage:
+        total = Usage()
+        for stage in _llm_stages(self.pipeline):
+            usage = stage.get_usage()
+            total += Usage(
+                usage["prompt_tokens"],
+                usage["completion_tokens"],
+                usage["cached_tokens"],
+            )
+        return total
+
+    async def run(self, data: pd.DataFrame, **kwargs) -> List[SampleReport]:
+        """Run the steps on `data` and return their reports.
+
+        The output of the last step is kept in `result`.
+        """
+        previous: Optional[SampleReport] = None
+        for size in self.sizes:
+            sample = hash_sample(
+                data, size, self.key_columns, self.stratify_by, self.seed
+            )
+            usage_before = self._usage()
+            started = time.perf_counter()
+            self.result = await self.pipeline.run(
+                sample, llm_provider=self.llm_provider, cache=self.cache, **kwargs
+            )
+            seconds = time.perf_counter() - started
+            usage = self._usage() - usage_before
+
+            new_rows = len(sample) - (previous.rows if previous else 0)
+            report = SampleReport(
+                rows=len(sample),
+                new_rows=new_rows,
+                seconds=seconds,
+                usage=usage,
+                **self._project(usage, seconds, new_rows, len(data)),
+            )
+            for col in self.watch_columns:
+                counts = self.result[col].value_counts(normalize=True, dropna=False)
+                report.distributions[col] = counts.to_dict()
+                if previous is not None:
+                    report.drift[col] = _total_variation(
+                        counts, pd.Series(previous.distributions[col])
+                    )
+            self.reports.append(report)
+            previous = report
+
+            if len(sample) == len(data) or (
+                self.stable_drift is not None
+                and report.drift
+                and max(report.drift.values()) <= self.stable_drift
+            ):
+                break
+        return self.reports
+
+    def _project(
+        self, usage: Usage, seconds: float, new_rows: int, total_rows: int
+    ) -> Dict[str, Any]:
+        """Scale the cost of this step's new rows up to the full data."""
+        scale = total_rows / new_rows if new_rows else 0.0
+        projected = Usage(
+            round(usage.prompt_tokens * scale),
+            round(usage.completion_tokens * scale),
+            round(usage.cached_tokens * scale),
+        )
+        cost = (
+            projected.prompt_tokens * self.prompt_price
+            + projected.completion_tokens * self.completion_price
+        ) / 1e6
+        return {
+            "projected_usage": projected,
+            "projected_cost": cost,
+            "projected_seconds": seconds * scale,
+        }
@@ -0,0 +1,186 @@
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Hashable, List, Set, Tuple
+
+import numpy as np
+
+from pipeline_forge.llm.embedding import EmbeddingProvider
+from pipeline_forge.llm.provider import request_slot
+
+
+def normalize_text(value: Any) -> Any:
+    """Normalize a text for near-duplicate matching; other values are unchanged.
+
+    Applies Unicode NFKC, case folding, whitespace collapsing and strips
+    surrounding punctuation.
+    """
+    if not isinstance(value, str):
+        return value
+    text = unicodedata.normalize("NFKC", value).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .,;:!?\"'")
+
+
+class VectorIndex(ABC):
+    """Nearest-neighbour index over unit vectors, with a key per vector.
+
+    Implement this to plug in an approximate index (e.g. HNSW or IVF).
+    """
+
+    @abstractmethod
+    def add(self, vectors: np.ndarray, keys: List[Hashable]) -> None:
+        """Add unit vectors of shape (n, dimensions) and their keys."""
+        pass
+
+    @abstractmethod
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, List[Hashable | None]]:
+        """Return, per query, the best cosine similarity and its key (None if empty)."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force index: one matrix product per batch of queries."""
+
+    def __init__(self):
+        self._vectors: np.ndarray | None = None
+        self._keys: List[Hashable] = []
+
+    def add(self, vectors: np.ndarray, keys: List[Hashable]) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._vectors is None:
+            capacity = max(len(vectors), 64)
+            self._vectors = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+        needed = len(self._keys) + len(vectors)
+        if needed > len(self._vectors):
+            # Grow geometrically so that adds stay amortized O(1) per vector
+            grown = np.empty(
+                (max(needed, 2 * len(self._vectors)), self._vectors.shape[1]),
+                dtype=np.float32,
+            )
+            grown[: len(self._keys)] = self._vectors[: len(self._keys)]
+            self._vectors = grown
+        self._vectors[len(self._keys) : needed] = vectors
+        self._keys.extend(keys)
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, List[Hashable | None]]:
+        if not self._keys:
+            return np.full(len(queries), -np.inf, dtype=np.float32), [None] * len(
+                queries
+            )
+        similarities = np.asarray(queries, dtype=np.float32) @ (
+            self._vectors[: len(self._keys)].T
+        )
+        best = similarities.argmax(axis=1)
+        return (
+            similarities[np.arange(len(queries)), best],
+            [self._keys[i] for i in best],
+        )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class SemanticCache:
+    """Near-duplicate lookup layered over a stage's exact cache.
+
+    A row that misses its exact key is looked up under a key built from its
+    normalized inputs (see `normalize_text`), then by embedding its inputs and
+    searching an index of previously answered inputs of the same stage. A
+    neighbour at or above `threshold` cosine similarity reuses that input's
+    cached response. Rows answered from the cache, exactly or not, are indexed
+    too, so a cache filled by an earlier run or process serves near-duplicates.
+    The indexes live in memory, one per stage configuration.
+    """
+
+    def __init__(
+        self,
+        embedding_provider: EmbeddingProvider,
+        threshold: float = 0.95,
+        index_factory: type[VectorIndex] = ExactIndex,
+    ):
+        """
+        Args:
+            embedding_provider: Embeds row inputs for the similarity search
+            threshold: Minimum cosine similarity to reuse a neighbour's response
+            index_factory: Creates the index of each stage configuration
+        """
+        self.embedding_provider = embedding_provider
+        self.threshold = threshold
+        self.index_factory = index_factory
+        self._indexes: Dict[Hashable, VectorIndex] = {}
+        self._indexed_keys: Dict[Hashable, Set[Hashable]] = {}
+        self._lookups = 0
+        self._normalized_hits = 0
+        self._embedding_hits = 0
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as unit vectors, in batches the provider accepts."""
+        batch_size = self.embedding_provider.max_batch_size
+        parts = []
+        for start in range(0, len(texts), batch_size):
+            async with request_slot():
+                parts.append(
+                    await self.embedding_provider.embed(
+                        texts[start : start + batch_size]
+                    )
+                )
+        return _unit(np.concatenate(parts).astype(np.float32, copy=False))
+
+    def search(
+        self, scope: Hashable, vectors: np.ndarray
+    ) -> List[Tuple[float, Hashable] | None]:
+        """Return the best (similarity, key) at or above the threshold per vector."""
+        index = self._indexes.get(scope)
+        if index is None or not len(index):
+            return [None] * len(vectors)
+        similarities, keys = index.search(vectors)
+        return [
+            (float(similarity), key) if similarity >= self.threshold else None
+            for similarity, key in zip(similarities, keys)
+        ]
+
+    def add(self, scope: Hashable, vectors: np.ndarray, keys: List[Hashable]) -> None:
+        """Index the inputs (as unit vectors) of newly cached responses."""
+        if not keys:
+            return
+        index = self._indexes.get(scope)
+        if index is None:
+            index = self._indexes[scope] = self.index_factory()
+            self._indexed_keys[scope] = set()
+        index.add(vectors, keys)
+        self._indexed_keys[scope].update(keys)
+
+    def is_indexed(self, scope: Hashable, key: Hashable) -> bool:
+        """Whether the inputs cached under `key` have been added to the index."""
+        return key in self._indexed_keys.get(scope, ())
+
+    def record(self, lookups: int, normalized_hits: int, embedding_hits: int) -> None:
+        self._lookups += lookups
+        self._normalized_hits += normalized_hits
+        self._embedding_hits += embedding_hits
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return lookup counts and the hit rate the semantic layer added.
+
+        `lookups` counts rows that missed their exact key; `added_hit_rate` is the
+        share of them served by a normalized key or a similar input.
+        """
+        hits = self._normalized_hits + self._embedding_hits
+        return {
+            "lookups": self._lookups,
+            "normalized_hits": self._normalized_hits,
+            "embedding_hits": self._embedding_hits,
+            "misses": self._lookups - hits,
+            "added_hit_rate": hits / self._lookups if self._lookups else 0.0,
+            "indexed": sum(len(index) for index in self._indexes.values()),
+        }
@@ -4,13 +4,19 @@ import hashlib
 import json
 from typing import List, Any, Dict, Optional, Callable, Set, Tuple, Hashable
 
-from pipeline_forge.cache import Cache
+from pipeline_forge.cache import MISSING, Cache
 from pipeline_forge.llm.provider import LLMProvider
+from pipeline_forge.progress import stage_progress
+from pipeline_forge.tracing import get_tracer, trace
 
 
 class Stage(ABC):
     """Base class for all pipeline stages."""
 
+    # Configuration keys that change how the stage runs but not its cached
+    # values; they are left out of the fingerprint
+    execution_settings: Tuple[str, ...] = ()
+
     def __init__(
         self,
         input_columns: list[str],
@@ -23,6 +29,12 @@ class Stage(ABC):
         self.filter_colname = filter_colname
         self.filter_fallback_value = filter_fallback_value
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Public attributes are configuration: forget the memoized fingerprint
+        if not name.startswith("_"):
+            self.__dict__.pop("_fingerprint", None)
+        super().__setattr__(name, value)
+
     async def process(
         self, data: pd.DataFrame, llm_provider: LLMProvider, cache: Cache | None = None
     ) -> pd.DataFrame:
@@ -31,25 +43,37 @@ class Stage(ABC):
             self.filter_colname is None or self.filter_colname in data.columns
         ), f"Filter column {self.filter_colname} not found in dataset {data.head()}"
 
-        if self.filter_colname is None:
-            return await self._process_post_filter(data, llm_provider, cache)
-        else:
+        if cache is not None and cache.supports_stages:
+            # Entries this stage stores are tagged with its fingerprint
+            cache = cache.namespace(self.get_fingerprint())
+
+        name = self.get_name()
+        with trace("stage", name, rows=len(data)) as span, stage_progress(
+            name, len(data)
+        ) as progress:
+            if self.filter_colname is None:
+                return await self._process_post_filter(data, llm_provider, cache)
+
             # initialize output columns with filter fallback value
             result = data.copy()
-            for col in self.output_columns:
+            for col in self.get_output_columns():
                 result[col] = self.filter_fallback_value
 
             # filter data and process only those rows
             filtered_data = data[data[self.filter_colname]].copy()
+            span["rows_filtered"] = len(data) - len(filtered_data)
+            if progress is not None:
+                progress.filtered += len(data) - len(filtered_data)
             if not filtered_data.empty:
                 processed = await self._process_post_filter(
                     filtered_data, llm_provider, cache
                 )
 
                 # Update only the filtered rows in the result
-                for idx in processed.index:
-                    for col in self.output_columns:
-                        result.loc[idx, col] = processed.loc[idx, col]
+                with trace("merge", name, rows=len(processed)):
+                    for idx in processed.index:
+                        for col in self.get_output_columns():
+                            result.at[idx, col] = processed.at[idx, col]
 
             return result
 
@@ -69,7 +93,83 @@ class Stage(ABC):
 
     def get_outputs(self) -> Set[str]:
         """Return the columns this stage produces."""
-        return set(self.output_columns)
+        return set(self.get_output_columns())
+
+    def get_output_columns(self) -> List[str]:
+        """Return, in order, every column this stage writes (including any extras)."""
+        return self.output_columns
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this stage."""
+        return {
+            "input_columns": self.input_columns,
+            "output_columns": self.output_columns,
+            "filter_colname": self.filter_colname,
+            "filter_fallback_value": self.filter_fallback_value,
+        }
+
+    def get_cache_config(self) -> Dict[str, Any]:
+        """Return the configuration that determines the values this stage caches."""
+        return {
+            key: value
+            for key, value in self.get_config().items()
+            if key not in self.execution_settings
+        }
+
+    def get_fingerprint(self) -> str:
+        """Return a content hash of the stage's type and cache configuration.
+
+        Changing an execution setting (e.g. concurrency) keeps the fingerprint,
+        so the stage's cache entries stay valid and prunable. The fingerprint is
+        memoized until an attribute is assigned; configuration mutated in place
+        (e.g. appending to `input_columns`) is not detected.
+        """
+        fingerprint = self.__dict__.get("_fingerprint")
+        if fingerprint is None:
+            from pipeline_forge import manifest
+
+            stage_type = f"{self.__class__.__module__}.{self.__class__.__qualname__}"
+            config = manifest._encode_value(self.get_cache_config(), lenient=True)
+            fingerprint = manifest.stage_fingerprint(stage_type, config)
+            self._fingerprint = fingerprint
+        return fingerprint
+
+    def get_cache_namespaces(self) -> List[str]:
+        """Return the fingerprints under which this stage stores cache entries."""
+        return [self.get_fingerprint()]
+
+    def clear_cache(self, cache: Cache) -> int:
+        """Delete this stage's cache entries, leaving those of other stages, and
+        return how many were deleted (none for backends without stage tags)."""
+        if not cache.supports_stages:
+            return 0
+        return cache.delete_stages(self.get_cache_namespaces())
+
+    def get_name(self) -> str:
+        """Return a human-readable name used in traces and reports."""
+        return f"{self.__class__.__name__}({', '.join(self.output_columns)})"
+
+    def _cache_get(self, cache: Cache, key: Hashable) -> Any:
+        """Look up a key in the cache, tracing the operation if a tracer is active.
+
+        Returns `MISSING` if the key is absent, so that cached None values are hits.
+        """
+        tracer = get_tracer()
+        if tracer is None:
+            return cache.lookup(key)
+        with tracer.span("cache_get", self.get_name()) as span:
+            value = cache.lookup(key)
+            span["hit"] = value is not MISSING
+        return value
+
+    def _cache_set(self, cache: Cache, key: Hashable, value: Any) -> None:
+        """Store a value in the cache, tracing the operation if a tracer is active."""
+        tracer = get_tracer()
+        if tracer is None:
+            cache.set(key, value)
+            return
+        with tracer.span("cache_set", self.get_name()):
+            cache.set(key, value)
 
     def _should_process_row(self, row: pd.Series) -> bool:
         """Determine if this row should be processed based on filter column."""
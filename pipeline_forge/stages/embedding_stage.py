@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Hashable, List
+
+import numpy as np
+import pandas as pd
+
+from pipeline_forge.cache import MISSING, Cache
+from pipeline_forge.llm.embedding import EmbeddingProvider
+from pipeline_forge.llm.provider import LLMProvider, request_slot
+from pipeline_forge.progress import advance
+from pipeline_forge.stage import Stage
+from pipeline_forge.tracing import trace
+
+
+class EmbeddingStage(Stage):
+    """Stage that embeds a text column, many texts per request.
+
+    Equal texts are embedded once, and each text is cached on its own. The output
+    column holds float32 row views into one contiguous (rows, dimensions) array;
+    `embedding_matrix` turns the column back into a 2-D array.
+    """
+
+    execution_settings = ("batch_size", "max_concurrency")
+
+    def __init__(
+        self,
+        input_columns: list[str],
+        output_columns: list[str],
+        embedding_provider: EmbeddingProvider | None = None,
+        batch_size: int = 256,
+        max_concurrency: int = 4,
+        filter_colname: str | None = None,
+        filter_fallback_value: Any = None,
+    ):
+        """
+        Args:
+            input_columns: The text column to embed
+            output_columns: The embedding column
+            embedding_provider: Provider of the embeddings; by default the provider
+                passed to the run, which must then be an EmbeddingProvider
+            batch_size: Texts per request (capped by the provider's max_batch_size)
+            max_concurrency: Maximum number of requests in flight
+        """
+        assert len(input_columns) == 1, "EmbeddingStage embeds a single text column"
+        assert len(output_columns) == 1, "EmbeddingStage has a single output column"
+        self.embedding_provider = embedding_provider
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        super().__init__(
+            input_columns, output_columns, filter_colname, filter_fallback_value
+        )
+        self.reset_usage()
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this stage (the
+        provider is left out and is taken from the run)."""
+        return {
+            **super().get_config(),
+            "batch_size": self.batch_size,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def reset_usage(self) -> None:
+        """Reset the per-stage usage totals."""
+        self._requests = 0
+        self._texts_embedded = 0
+        self._cache_hits = 0
+        self._duplicates = 0
+
+    def get_usage(self) -> Dict[str, int]:
+        """Return request and text counts accumulated since the last reset.
+
+        `duplicates` counts rows whose text appeared earlier in the same call and
+        reused its embedding.
+        """
+        return {
+            "requests": self._requests,
+            "texts_embedded": self._texts_embedded,
+            "cache_hits": self._cache_hits,
+            "duplicates": self._duplicates,
+        }
+
+    def _get_provider(self, llm_provider: Any) -> EmbeddingProvider:
+        provider = self.embedding_provider or llm_provider
+        if not isinstance(provider, EmbeddingProvider):
+            raise TypeError(
+                f"{self.get_name()} needs an EmbeddingProvider, got "
+                f"{provider.__class__.__name__}"
+            )
+        return provider
+
+    def _get_cache_key(self, text: str, provider: EmbeddingProvider) -> Hashable:
+        """Generate a cache key from the provider configuration and the text."""
+        config = {"provider": provider.get_provider_id(), "text": text}
+        return hashlib.md5(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    async def _process_post_filter(
+        self, data: pd.DataFrame, llm_provider: LLMProvider, cache: Cache | None = None
+    ) -> pd.DataFrame:
+        """Embed the unique texts that are not cached, in batches."""
+        provider = self._get_provider(llm_provider)
+        result = data.copy()
+        texts = data[self.input_columns[0]].astype(str)
+        codes, unique_texts = pd.factorize(texts)
+        self._duplicates += len(texts) - len(unique_texts)
+
+        vectors: List[np.ndarray | None] = [None] * len(unique_texts)
+        missing: List[int] = []
+        for i, text in enumerate(unique_texts):
+            cached = MISSING
+            if cache:
+                cached = self._cache_get(cache, self._get_cache_key(text, provider))
+            if cached is MISSING:
+                missing.append(i)
+            else:
+                vectors[i] = np.asarray(cached, dtype=np.float32)
+                self._cache_hits += 1
+                advance(cached=1)
+
+        batch_size = min(self.batch_size, provider.max_batch_size)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def embed_batch(positions: List[int]) -> None:
+            async with semaphore, request_slot():
+                with trace("embed", self.get_name(), texts=len(positions)):
+                    matrix = await provider.embed([unique_texts[i] for i in positions])
+            self._requests += 1
+            self._texts_embedded += len(positions)
+            for i, vector in zip(positions, matrix):
+                vectors[i] = vector
+                if cache:
+                    key = self._get_cache_key(unique_texts[i], provider)
+                    self._cache_set(cache, key, vector.tolist())
+            advance(len(positions))
+
+        await asyncio.gather(
+            *[
+                embed_batch(missing[start : start + batch_size])
+                for start in range(0, len(missing), batch_size)
+            ]
+        )
+        # Rows repeating an earlier text are done too
+        advance(len(texts) - len(unique_texts))
+
+        output = self.output_columns[0]
+        if not len(data):
+            result[output] = pd.Series(dtype=object)
+            return result
+        # One contiguous array for all rows; the column holds views of its rows
+        matrix = np.stack(vectors).astype(np.float32, copy=False)[codes]
+        result[output] = pd.Series(list(matrix), index=result.index, dtype=object)
+        return result
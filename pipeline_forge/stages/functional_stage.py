@@ -1,17 +1,23 @@
+import asyncio
 import inspect
 import pandas as pd
 import hashlib
 import json
-from typing import Hashable, List, Any, Callable, Optional, Dict
+import time
+from typing import Hashable, List, Any, Callable, Optional, Dict, Tuple
 
-from pipeline_forge.cache import Cache
+from pipeline_forge.cache import MISSING, Cache, CachedFailure
 from pipeline_forge.llm.provider import LLMProvider
 from pipeline_forge.stage import Stage
+from pipeline_forge.progress import advance
+from pipeline_forge.tracing import trace
 
 
 class FunctionalStage(Stage):
     """Stage for applying custom functions to data."""
 
+    execution_settings = ("max_concurrency", "negative_cache_ttl")
+
     def __init__(
         self,
         input_columns: list[str],
@@ -19,20 +25,48 @@ class FunctionalStage(Stage):
         function: Callable[[Any], Any],
         filter_colname: str | None = None,
         filter_fallback_value: Any = None,
+        max_concurrency: int = 16,
+        deterministic_errors: Tuple[type, ...] = (),
+        negative_cache_ttl: float | None = None,
     ):
+        """
+        Args:
+            function: Called with the row's input values. Coroutine functions (e.g.
+                HTTP or database lookups) are awaited, up to `max_concurrency` rows
+                at a time; other functions run one row after another.
+            max_concurrency: Maximum number of rows awaited at once
+            deterministic_errors: Exception types the function raises for inputs
+                that will always fail (e.g. ValueError on malformed input). Such
+                rows are left None instead of failing the stage.
+            negative_cache_ttl: Cache those failures for this many seconds, so that
+                the rows are not recomputed on every run
+        """
         self.function = function
+        self.max_concurrency = max_concurrency
+        self.deterministic_errors = tuple(deterministic_errors)
+        self.negative_cache_ttl = negative_cache_ttl
         super().__init__(
             input_columns, output_columns, filter_colname, filter_fallback_value
         )
 
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this stage."""
+        return {
+            **super().get_config(),
+            "function": self.function,
+            "max_concurrency": self.max_concurrency,
+            "deterministic_errors": self.deterministic_errors,
+            "negative_cache_ttl": self.negative_cache_ttl,
+        }
+
     def _get_cache_key(self, row: pd.Series) -> Hashable:
         """Generate a unique key for the cache based on the details of this stage and the input row"""
-        function_code = inspect.getsource(self.function)
+        from pipeline_forge import manifest
 
         config = {
             "input_columns": self.input_columns,
             "values": [row[col] for col in self.input_columns],
-            "function_code": function_code,
+            "function_code": manifest.function_fingerprint(self.function),
         }
         config_str = json.dumps(config, sort_keys=True)
         return hashlib.md5(config_str.encode()).hexdigest()
@@ -52,20 +86,55 @@ class FunctionalStage(Stage):
             if col not in result.columns:
                 result[col] = None
 
-        # Process each row
-        for idx, row in result.iterrows():
+        rows = list(result.iterrows())
+        if inspect.iscoroutinefunction(self.function):
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def bounded(row: pd.Series) -> List[Any]:
+                async with semaphore:
+                    return await self._process_row(row, cache)
+
+            outputs = await asyncio.gather(*[bounded(row) for _, row in rows])
+        else:
+            outputs = [await self._process_row(row, cache) for _, row in rows]
+
+        # Update dataframe
+        for (idx, _), output in zip(rows, outputs):
+            for col, value in zip(self.output_columns, output):
+                result.at[idx, col] = value
+
+        return result
+
+    async def _process_row(self, row: pd.Series, cache: Cache | None) -> List[Any]:
+        """Return the output values of one row, from the cache or the function."""
+        with trace("row", self.get_name()):
             if cache:
                 cache_key = self._get_cache_key(row)
-                cached_value = cache.get(cache_key)
-                if cached_value is not None:
+                cached_value = self._cache_get(cache, cache_key)
+                if isinstance(cached_value, CachedFailure):
+                    advance(cached=1, failed=1)
+                    return [None] * len(self.output_columns)
+                if cached_value is not MISSING:
                     assert len(cached_value) == len(self.output_columns)
-                    for cache_value, col in zip(cached_value, self.output_columns):
-                        result.at[idx, col] = cache_value
-                    continue
+                    advance(cached=1)
+                    return cached_value
 
             # Extract input values and apply function
             input_values = [row[col] for col in self.input_columns]
-            output = self.function(*input_values)
+            try:
+                output = self.function(*input_values)
+                if inspect.isawaitable(output):
+                    output = await output
+            except self.deterministic_errors as e:
+                if cache and self.negative_cache_ttl is not None:
+                    failure = CachedFailure(
+                        type(e).__name__,
+                        str(e),
+                        expires_at=time.time() + self.negative_cache_ttl,
+                    )
+                    self._cache_set(cache, cache_key, failure)
+                advance(failed=1)
+                return [None] * len(self.output_columns)
 
             # Convert to list if not already
             if not isinstance(output, (list, tuple)):
@@ -79,14 +148,10 @@ class FunctionalStage(Stage):
 
             # Store in cache
             if cache:
-                cache_key = self._get_cache_key(row)
-                cache.set(cache_key, output)
+                self._cache_set(cache, cache_key, output)
 
-            # Update dataframe
-            for col, value in zip(self.output_columns, output):
-                result.at[idx, col] = value
-
-        return result
+            advance()
+            return output
 
 
 class FilterStage(FunctionalStage):
@@ -99,6 +164,9 @@ class FilterStage(FunctionalStage):
         output_columns: list[str],
         filter_colname: str | None = None,
         filter_fallback_value: Any = None,
+        max_concurrency: int = 16,
+        deterministic_errors: Tuple[type, ...] = (),
+        negative_cache_ttl: float | None = None,
     ):
         super().__init__(
             input_columns=input_columns,
@@ -106,4 +174,7 @@ class FilterStage(FunctionalStage):
             function=function,
             filter_colname=filter_colname,
             filter_fallback_value=filter_fallback_value,
+            max_concurrency=max_concurrency,
+            deterministic_errors=deterministic_errors,
+            negative_cache_ttl=negative_cache_ttl,
         )
@@ -1,15 +1,54 @@
 import json
+import re
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional, Set, Hashable
+from typing import List, Dict, Any, Optional, Set, Hashable, Callable
 import asyncio
-from pipeline_forge.cache import Cache
+import time
+from pipeline_forge.budget import get_budget
+from pipeline_forge.cache import MISSING, Cache, CachedFailure
 from pipeline_forge.stage import Stage
-from pipeline_forge.llm.provider import LLMProvider
+from pipeline_forge.llm.provider import (
+    LLMProvider,
+    LLMResponse,
+    Usage,
+    estimate_tokens,
+    request_slot,
+)
+from pipeline_forge.packing import (
+    PackParseError,
+    format_packed_items,
+    parse_packed_response,
+    split_usage,
+)
+from pipeline_forge.structured import (
+    SchemaValidationError,
+    check_schema,
+    parse_json_response,
+    schema_for_columns,
+)
+from pipeline_forge.progress import advance, get_progress
+from pipeline_forge.semantic_cache import SemanticCache, normalize_text
+from pipeline_forge.tracing import get_tracer
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+
+# Outputs of `_parse_with_reasks` when the budget did not allow a re-ask
+_BUDGET_SKIPPED = object()
 
 
 class LLMStage(Stage):
     """Stage for processing data through an LLM."""
 
+    # Usage columns are filled from the usage stored with each cached value
+    execution_settings = (
+        "usage_columns",
+        "pack_size",
+        "pack_max_tokens",
+        "prefix_caching",
+        "negative_cache_ttl",
+    )
+
     def __init__(
         self,
         input_columns: list[str],
@@ -17,12 +56,173 @@ class LLMStage(Stage):
         output_columns: list[str],
         filter_colname: str | None = None,
         filter_fallback_value: Any = None,
+        usage_columns: bool = False,
+        stream_parser: Callable[[str], Any] | None = None,
+        output_schema: Dict[str, Any] | bool | None = None,
+        max_reasks: int = 1,
+        pack_size: int | None = None,
+        pack_max_tokens: int = 4000,
+        prefix_caching: bool = False,
+        semantic_cache: SemanticCache | None = None,
+        negative_cache_ttl: float | None = None,
     ):
-        assert len(output_columns) == 1, "LLMStage must have exactly one output column"
+        """
+        Args:
+            usage_columns: Also emit `<output>_prompt_tokens`, `<output>_completion_tokens`
+                and `<output>_cached_tokens` columns with each row's token usage
+            stream_parser: Stream responses and call this with the text received so
+                far after every chunk. Returning None (or False) keeps streaming;
+                returning True stops and uses the text so far; any other value stops
+                and becomes the output. If the stream ends undecided, the full text
+                is the output.
+            output_schema: Request a JSON object and split it into `output_columns`,
+                one key per column. Either a JSON schema whose properties include
+                every output column, or True for an object with exactly those keys.
+                The provider is asked for schema-constrained output when it
+                supports it, and the schema is also described in the prompt.
+            max_reasks: With `output_schema`, how many times to re-ask (showing the
+                validation error) before giving up on a row and leaving it None
+            pack_size: Send up to this many rows per request, as a numbered list
+                appended to the last template message (which must be the only one
+                referencing input columns). Packs whose answer cannot be split back
+                into one line per row fall back to per-row requests.
+            pack_max_tokens: Estimated prompt tokens allowed per packed request;
+                rows are added to a pack until it would exceed this limit
+            prefix_caching: Arrange requests to benefit from provider-side prompt
+                caching. The template is checked to put its static text before the
+                input columns (raising ValueError otherwise), and rows whose
+                messages share everything but the last message are sent together:
+                one request first to warm the provider's cache, then the rest.
+            semantic_cache: Reuse cached responses of near-duplicate inputs: rows
+                missing their exact cache key are looked up by normalized inputs,
+                then by embedding similarity. It is not part of the stage config.
+            negative_cache_ttl: With `output_schema` and a cache, cache rows still
+                invalid after the last re-ask for this many seconds, so that they
+                are left None without being re-sent on every run
+        """
+        if output_schema is None:
+            assert (
+                len(output_columns) == 1
+            ), "LLMStage must have exactly one output column unless output_schema is set"
+        else:
+            assert (
+                stream_parser is None
+            ), "output_schema and stream_parser are exclusive"
+            if output_schema is True:
+                output_schema = schema_for_columns(output_columns)
+            check_schema(output_schema)
+            missing = set(output_columns) - set(output_schema.get("properties", {}))
+            assert not missing, f"output_schema has no properties for {sorted(missing)}"
+        if pack_size is not None:
+            assert (
+                output_schema is None and stream_parser is None
+            ), "pack_size cannot be combined with output_schema or stream_parser"
+            assert not any(
+                f"{{{col}}}" in message["content"]
+                for message in conversation_template[:-1]
+                for col in input_columns
+            ), "With pack_size, only the last template message may use input columns"
         self.conversation_template = conversation_template
+        self.usage_columns = usage_columns
+        self.stream_parser = stream_parser
+        self.output_schema = output_schema
+        self.max_reasks = max_reasks
+        self.pack_size = pack_size
+        self.pack_max_tokens = pack_max_tokens
+        self.prefix_caching = prefix_caching
+        self.semantic_cache = semantic_cache
+        self.negative_cache_ttl = negative_cache_ttl
         super().__init__(
             input_columns, output_columns, filter_colname, filter_fallback_value
         )
+        if prefix_caching:
+            self._check_static_prefix()
+        self.reset_usage()
+
+    def get_output_columns(self) -> List[str]:
+        """Return the output column, followed by the usage columns if enabled."""
+        if not self.usage_columns:
+            return self.output_columns
+        return self.output_columns + [
+            f"{self.output_columns[0]}_{field}" for field in USAGE_FIELDS
+        ]
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this stage."""
+        return {
+            **super().get_config(),
+            "conversation_template": self.conversation_template,
+            "usage_columns": self.usage_columns,
+            "stream_parser": self.stream_parser,
+            "output_schema": self.output_schema,
+            "max_reasks": self.max_reasks,
+            "pack_size": self.pack_size,
+            "pack_max_tokens": self.pack_max_tokens,
+            "prefix_caching": self.prefix_caching,
+            "negative_cache_ttl": self.negative_cache_ttl,
+        }
+
+    def reset_usage(self) -> None:
+        """Reset the per-stage usage totals."""
+        self._requests = 0
+        self._cache_hits = 0
+        self._usage = Usage()
+        self._saved_usage = Usage()
+        self._time_to_first_token: List[float] = []
+        self._early_stops = 0
+        self._reasks = 0
+        self._parse_failures = 0
+        self._negative_hits = 0
+        self._packs = 0
+        self._pack_fallbacks = 0
+        self._semantic_hits = 0
+
+    def get_usage(self) -> Dict[str, int]:
+        """Return token usage accumulated by this stage since the last reset.
+
+        Tokens spent on requests made by this stage are reported in `prompt_tokens`,
+        `completion_tokens` and `cached_tokens` (prompt tokens the provider served
+        from its own prompt cache). `saved_tokens` counts the tokens that cache hits
+        would have cost, based on the usage stored alongside the cached values.
+        With an output schema, `reasks` counts follow-up requests after invalid
+        responses and `parse_failures` the rows left None after the last re-ask.
+        With packing, `packs` counts multi-row requests and `pack_fallbacks` those
+        whose rows had to be re-sent one by one; rows of a pack share its usage.
+        `cached_ratio` is the share of prompt tokens served from the provider's
+        prompt cache. `semantic_hits` counts rows answered by the semantic cache
+        and `negative_hits` rows left None by a cached failure (both are also
+        counted in `cache_hits`).
+        """
+        return {
+            "requests": self._requests,
+            "cache_hits": self._cache_hits,
+            **self._usage.to_dict(),
+            "total_tokens": self._usage.total_tokens,
+            "saved_tokens": self._saved_usage.total_tokens,
+            "reasks": self._reasks,
+            "parse_failures": self._parse_failures,
+            "packs": self._packs,
+            "pack_fallbacks": self._pack_fallbacks,
+            "semantic_hits": self._semantic_hits,
+            "negative_hits": self._negative_hits,
+            "cached_ratio": (
+                self._usage.cached_tokens / self._usage.prompt_tokens
+                if self._usage.prompt_tokens
+                else 0.0
+            ),
+        }
+
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Return time-to-first-token percentiles (seconds) and early-stop counts."""
+        stats: Dict[str, Any] = {
+            "streams": len(self._time_to_first_token),
+            "early_stops": self._early_stops,
+        }
+        if self._time_to_first_token:
+            p50, p95 = np.percentile(self._time_to_first_token, [50, 95])
+            stats["ttft_p50"] = float(p50)
+            stats["ttft_p95"] = float(p95)
+        return stats
 
     async def _process_post_filter(
         self,
@@ -36,57 +236,681 @@ class LLMStage(Stage):
         result = data.copy()
 
         # Initialize output columns with None
-        for col in self.output_columns:
+        for col in self.get_output_columns():
             if col not in result.columns:
                 result[col] = None
 
-        # Process each row concurrently
-        tasks = [
-            self._process_row(row, llm_provider, cache) for _, row in result.iterrows()
-        ]
-        outputs = await asyncio.gather(*tasks)
+        # Rows answered by the semantic cache need no request
+        semantic_hits: Dict[Hashable, Any] = {}
+        semantic_misses: Dict[Hashable, Any] = {}
+        pending = result
+        if self.semantic_cache is not None and cache:
+            semantic_hits, semantic_misses = await self._semantic_lookup(
+                result, llm_provider, cache
+            )
+            pending = result.drop(index=list(semantic_hits))
 
-        # Update dataframe with results
-        for idx, output in zip(result.index, outputs):
-            result.at[idx, self.output_columns[0]] = output[0]
+        # Process each row (or pack of rows) concurrently
+        if self.pack_size is not None:
+            outputs = await self._process_packed(pending, llm_provider, cache)
+        else:
+            if get_tracer() is None:
+                process = lambda row: self._process_row(row, llm_provider, cache)
+            else:
+                dispatched_at = time.perf_counter()
+                process = lambda row: self._process_row_traced(
+                    row, llm_provider, cache, dispatched_at
+                )
+            if get_progress() is not None:
+                process = self._with_progress(process)
+            rows = [row for _, row in pending.iterrows()]
+            if self.prefix_caching:
+                outputs = await self._process_by_prefix(rows, process)
+            else:
+                outputs = await asyncio.gather(*[process(row) for row in rows])
+
+        if self.semantic_cache is not None and cache:
+            by_index = dict(zip(pending.index, outputs))
+            self._semantic_add(semantic_misses, by_index, llm_provider, cache)
+            by_index.update(semantic_hits)
+            outputs = [by_index[idx] for idx in result.index]
+
+        # Update dataframe with results, assigning all output columns at once
+        skipped = []
+        done = []
+        records = []
+        for idx, (output, usage, from_cache) in zip(result.index, outputs):
+            if output is None:
+                # Requests made before the budget ran out still count
+                self._record_usage(usage, from_cache)
+                skipped.append(idx)
+                continue
+            self._record_usage(usage, from_cache)
+            done.append(idx)
+            if self.usage_columns:
+                output = list(output) + [
+                    getattr(usage, field) if usage else None for field in USAGE_FIELDS
+                ]
+            records.append(output)
+
+        if done:
+            columns = self.get_output_columns()
+            result.loc[done, columns] = pd.DataFrame(
+                records, index=done, columns=columns, dtype=object
+            )
+
+        if skipped:
+            get_budget().mark_skipped(self.get_name(), skipped)
 
         return result
 
+    def _record_usage(self, usage: Usage | None, from_cache: bool) -> None:
+        """Add a row's usage to the stage totals."""
+        if from_cache:
+            self._cache_hits += 1
+            if usage is not None:
+                self._saved_usage += usage
+        elif usage is not None:
+            self._usage += usage
+
     def _get_llm_cache_key(self, row: pd.Series, llm_provider: LLMProvider) -> Hashable:
         """Generate a cache key for LLM processing based on stage ID, inputs, and provider."""
         input_values = tuple(row[col] for col in self.input_columns)
-        return (
+        return self._cache_key_for_inputs(json.dumps(input_values), llm_provider)
+
+    def _cache_key_for_inputs(self, inputs: str, llm_provider: LLMProvider) -> Hashable:
+        """Build a cache key from serialized inputs and the stage configuration."""
+        key = (
             json.dumps(self.conversation_template, sort_keys=True),
-            json.dumps(input_values),
+            inputs,
             llm_provider.get_provider_id(),
         )
+        if self.stream_parser is not None:
+            # The parser decides the output, so it is part of the key
+            from pipeline_forge import manifest
+
+            key += (manifest.function_fingerprint(self.stream_parser),)
+        if self.output_schema is not None:
+            key += (
+                json.dumps(self.output_schema, sort_keys=True),
+                tuple(self.output_columns),
+            )
+        return key
+
+    def _normalized_cache_key(
+        self, row: pd.Series, llm_provider: LLMProvider
+    ) -> Hashable:
+        """Cache key of a row's normalized inputs, for the semantic cache."""
+        values = [normalize_text(row[col]) for col in self.input_columns]
+        return self._cache_key_for_inputs(
+            "normalized:" + json.dumps(values, default=str), llm_provider
+        )
+
+    def _similar_cache_key(self, row: pd.Series, llm_provider: LLMProvider) -> Hashable:
+        """Cache key of the response a row borrowed from a similar input.
+
+        Kept apart from the exact key, so that approximate answers are only
+        served through the semantic cache.
+        """
+        input_values = tuple(row[col] for col in self.input_columns)
+        return self._cache_key_for_inputs(
+            "similar:" + json.dumps(input_values), llm_provider
+        )
+
+    async def _semantic_lookup(
+        self, data: pd.DataFrame, llm_provider: LLMProvider, cache: Cache
+    ) -> tuple[Dict[Hashable, Any], Dict[Hashable, Any]]:
+        """Look up rows missing their exact key by normalized inputs, then by
+        embedding similarity (one batched embedding request for all of them).
+
+        Embedding hits are stored under the row's similar-input key (never its
+        exact key), so later runs reuse them without embedding. Exact hits are
+        read here once, and those not indexed yet (e.g. loaded from a persistent
+        cache) are embedded in the same request and indexed. Returns the outputs
+        of the rows found, and for the others the normalized key, exact key and
+        embedding under which their response will be added.
+        """
+        scope = self._cache_key_for_inputs("", llm_provider)
+        candidates = []
+        seeds: Dict[Hashable, pd.Series] = {}
+        exact_hits: Dict[Hashable, Any] = {}
+        hits: Dict[Hashable, Any] = {}
+        normalized_hits = 0
+        embedding_hits = 0
+        for idx, row in data.iterrows():
+            exact_key = self._get_llm_cache_key(row, llm_provider)
+            if cache.contains(exact_key):
+                cached_value = self._cache_get(cache, exact_key)
+                if cached_value is not MISSING:
+                    exact_hits[idx] = (*self._unpack_cached_value(cached_value), True)
+                    if (
+                        exact_key not in seeds
+                        and self._is_answer(cached_value)
+                        and not self.semantic_cache.is_indexed(scope, exact_key)
+                    ):
+                        seeds[exact_key] = row
+                    continue
+            normalized_key = self._normalized_cache_key(row, llm_provider)
+            cached_value = self._cache_get(cache, normalized_key)
+            if cached_value is not MISSING:
+                hits[idx] = (*self._unpack_cached_value(cached_value), True)
+                normalized_hits += 1
+                continue
+            similar_key = self._similar_cache_key(row, llm_provider)
+            cached_value = self._cache_get(cache, similar_key)
+            if cached_value is not MISSING:
+                hits[idx] = (*self._unpack_cached_value(cached_value), True)
+                embedding_hits += 1
+            else:
+                candidates.append((idx, row, normalized_key, exact_key))
+
+        misses: Dict[Hashable, Any] = {}
+        lookups = normalized_hits + embedding_hits + len(candidates)
+        if candidates or seeds:
+            rows = [row for _, row, _, _ in candidates] + list(seeds.values())
+            vectors = await self.semantic_cache.embed(
+                [self._semantic_text(row) for row in rows]
+            )
+            # Seeded rows can already answer the candidates
+            self.semantic_cache.add(scope, vectors[len(candidates) :], list(seeds))
+            vectors = vectors[: len(candidates)]
+            matches = self.semantic_cache.search(scope, vectors)
+            # Rows answered by a neighbour are indexed under their similar key too
+            indexed_keys = []
+            indexed_vectors = []
+            for (idx, row, normalized_key, exact_key), vector, match in zip(
+                candidates, vectors, matches
+            ):
+                cached_value = MISSING
+                if match is not None:
+                    cached_value = self._cache_get(cache, match[1])
+                if cached_value is not MISSING:
+                    hits[idx] = (*self._unpack_cached_value(cached_value), True)
+                    similar_key = self._similar_cache_key(row, llm_provider)
+                    self._cache_set(cache, similar_key, cached_value)
+                    indexed_keys.append(similar_key)
+                    indexed_vectors.append(vector)
+                    embedding_hits += 1
+                else:
+                    misses[idx] = (normalized_key, exact_key, vector)
+            if indexed_keys:
+                self.semantic_cache.add(scope, np.stack(indexed_vectors), indexed_keys)
+
+        self.semantic_cache.record(lookups, normalized_hits, embedding_hits)
+        self._semantic_hits += len(hits)
+        hits.update(exact_hits)
+        if get_progress() is not None:
+            self._report_progress(list(hits.values()))
+        return hits, misses
+
+    def _semantic_text(self, row: pd.Series) -> str:
+        """The normalized inputs of a row, as embedded for the semantic cache."""
+        return "\n".join(str(normalize_text(row[col])) for col in self.input_columns)
+
+    @staticmethod
+    def _is_answer(cached_value: Any) -> bool:
+        """Whether a cached value holds outputs worth reusing for similar inputs."""
+        if cached_value is MISSING or isinstance(cached_value, CachedFailure):
+            return False
+        outputs = (
+            cached_value.get("outputs")
+            if isinstance(cached_value, dict)
+            else cached_value
+        )
+        return outputs is not None and not all(v is None for v in outputs)
+
+    def _semantic_add(
+        self,
+        misses: Dict[Hashable, Any],
+        outputs: Dict[Hashable, Any],
+        llm_provider: LLMProvider,
+        cache: Cache,
+    ) -> None:
+        """Make newly answered rows findable by normalized inputs and similarity."""
+        keys = []
+        vectors = []
+        for idx, (normalized_key, exact_key, vector) in misses.items():
+            output, usage, from_cache = outputs[idx]
+            if output is None or from_cache or all(v is None for v in output):
+                continue
+            self._cache_set(
+                cache,
+                normalized_key,
+                {"outputs": output, "usage": usage.to_dict() if usage else None},
+            )
+            keys.append(exact_key)
+            vectors.append(vector)
+        if keys:
+            scope = self._cache_key_for_inputs("", llm_provider)
+            self.semantic_cache.add(scope, np.stack(vectors), keys)
+
+    @staticmethod
+    def _report_progress(
+        outputs: List[tuple[list[Any] | None, Usage | None, bool]],
+    ) -> None:
+        """Count finished rows; skipped or unparseable rows count as failed."""
+        for output, usage, from_cache in outputs:
+            advance(
+                cached=int(from_cache),
+                failed=int(output is None or all(v is None for v in output)),
+                tokens=usage.total_tokens if usage and not from_cache else 0,
+            )
+
+    def _with_progress(self, process: Callable[[pd.Series], Any]) -> Callable:
+        """Wrap a row coroutine function so that each finished row is counted."""
+
+        async def process_with_progress(row: pd.Series):
+            output = await process(row)
+            self._report_progress([output])
+            return output
+
+        return process_with_progress
+
+    def _check_static_prefix(self) -> None:
+        """Check that no long static text follows the template's first input column.
+
+        Provider prompt caches match on an exact prefix, so static instructions
+        placed after a per-row value are re-sent uncached on every request.
+        """
+        placeholder = re.compile(
+            "|".join(re.escape(f"{{{col}}}") for col in self.input_columns)
+        )
+        prefix = ""
+        trailing = ""
+        variable = False
+        for message in self.conversation_template:
+            for i, part in enumerate(placeholder.split(message["content"])):
+                # Every part but the first follows an input column
+                variable = variable or i > 0
+                if variable:
+                    trailing += part
+                else:
+                    prefix += part
+        if estimate_tokens(trailing) > estimate_tokens(prefix):
+            raise ValueError(
+                f"{self.get_name()}: the template has more static text after its "
+                f"first input column (~{estimate_tokens(trailing)} tokens) than "
+                f"before it (~{estimate_tokens(prefix)} tokens); move the static "
+                "instructions ahead of the input columns so requests share a prefix"
+            )
+
+    async def _process_by_prefix(
+        self,
+        rows: List[pd.Series],
+        process: Callable[[pd.Series], Any],
+    ) -> List[Any]:
+        """Process rows grouped by shared prompt prefix, warming each group first.
+
+        Rows whose messages are identical up to the last message form a group. The
+        first request of a group runs alone so the provider caches the prefix, then
+        the rest of the group is sent at once; groups run concurrently.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            prefix = json.dumps(self._format_conversation(row)[:-1])
+            groups.setdefault(prefix, []).append(i)
+
+        outputs: List[Any] = [None] * len(rows)
+
+        async def run_group(positions: List[int]) -> None:
+            first, rest = positions[0], positions[1:]
+            outputs[first] = await process(rows[first])
+            results = await asyncio.gather(*[process(rows[i]) for i in rest])
+            for i, output in zip(rest, results):
+                outputs[i] = output
+
+        await asyncio.gather(*[run_group(positions) for positions in groups.values()])
+        return outputs
+
+    async def _process_row_traced(
+        self,
+        row: pd.Series,
+        llm_provider: LLMProvider,
+        cache: Cache | None,
+        dispatched_at: float,
+    ) -> tuple[list[str], Usage | None, bool]:
+        """Process a single row inside a row span, recording its queueing delay."""
+        tracer = get_tracer()
+        queued = time.perf_counter() - dispatched_at
+        with tracer.span("row", self.get_name(), queued=queued):
+            return await self._process_row(row, llm_provider, cache)
 
     async def _process_row(
         self, row: pd.Series, llm_provider: LLMProvider, cache: Cache | None = None
-    ) -> list[str]:
-        """Process a single row through the LLM."""
+    ) -> tuple[list[str], Usage | None, bool]:
+        """Process a single row through the LLM.
+
+        Returns the outputs, the usage of the request that produced them, and
+        whether they were served from the cache. The outputs are None if the
+        active budget did not allow the request to be dispatched.
+        """
         # Check cache first if available
         if cache:
             cache_key = self._get_llm_cache_key(row, llm_provider)
-            cached_value = cache.get(cache_key)
+            cached_value = self._cache_get(cache, cache_key)
+
+            if cached_value is not MISSING:
+                return (*self._unpack_cached_value(cached_value), True)
+
+        return await self._process_uncached_row(row, llm_provider, cache)
 
-            if cached_value is not None:
-                return cached_value
+    async def _process_uncached_row(
+        self, row: pd.Series, llm_provider: LLMProvider, cache: Cache | None
+    ) -> tuple[list[str], Usage | None, bool]:
+        """Send a single row's request and cache its outputs."""
+        tracer = get_tracer()
+        if tracer is None:
+            messages = self._format_conversation(row)
+        else:
+            with tracer.span("format", self.get_name()):
+                messages = self._format_conversation(row)
 
-        messages = self._format_conversation(row)
+        response = await self._request(messages, llm_provider)
+        if response is None:
+            return None, None, False
 
-        # No options needed - provider has all configuration
-        response = await llm_provider.generate(messages)
+        if self.output_schema is None:
+            output = [response.text]
+        else:
+            output, usage = await self._parse_with_reasks(
+                messages, response, llm_provider
+            )
+            if output is _BUDGET_SKIPPED:
+                # Skipped like an undispatched request: not a parse failure, and
+                # not cached, so a later run with more budget retries the row
+                return None, usage, False
+            if output is None:
+                # Invalid after every re-ask: leave the row empty, and cache the
+                # failure only if negative caching is enabled
+                self._parse_failures += 1
+                if cache and self.negative_cache_ttl is not None:
+                    failure = CachedFailure(
+                        "SchemaValidationError",
+                        f"invalid after {self.max_reasks} re-asks",
+                        expires_at=time.time() + self.negative_cache_ttl,
+                    )
+                    self._cache_set(
+                        cache, self._get_llm_cache_key(row, llm_provider), failure
+                    )
+                return [None] * len(self.output_columns), usage, False
+            response.usage = usage
 
-        # Store result in cache if available
+        # Store result in cache if available, along with the usage that produced it
         if cache:
             cache_key = self._get_llm_cache_key(row, llm_provider)
-            output = [response] * len(self.output_columns)
-            cache.set(cache_key, output)
-            return output
+            self._cache_set(
+                cache,
+                cache_key,
+                {
+                    "outputs": output,
+                    "usage": response.usage.to_dict() if response.usage else None,
+                },
+            )
+
+        return output, response.usage, False
+
+    async def _request(
+        self, messages: List[Dict[str, str]], llm_provider: LLMProvider
+    ) -> LLMResponse | None:
+        """Send one request, charging it to the active budget.
+
+        Returns None if the budget did not allow the request to be dispatched.
+        """
+        budget = get_budget()
+        if budget is not None:
+            reservation = budget.reserve(messages)
+            if reservation is None:
+                return None
+
+        tracer = get_tracer()
+        try:
+            async with request_slot():
+                if tracer is None:
+                    # No options needed - provider has all configuration
+                    response = await self._generate(messages, llm_provider)
+                else:
+                    with tracer.span(
+                        "generate", llm_provider.__class__.__name__
+                    ) as span:
+                        response = await self._generate(messages, llm_provider)
+                        if response.usage is not None:
+                            span.update(response.usage.to_dict())
+                        if response.time_to_first_token is not None:
+                            span["ttft"] = response.time_to_first_token
+        except BaseException:
+            if budget is not None:
+                budget.release(reservation)
+            raise
+        if budget is not None:
+            budget.commit(reservation, response.usage)
+        self._requests += 1
+        return response
+
+    async def _process_packed(
+        self, data: pd.DataFrame, llm_provider: LLMProvider, cache: Cache | None
+    ) -> List[tuple[list[str] | None, Usage | None, bool]]:
+        """Process rows in packs of several rows per request.
+
+        Cache lookups and writes stay per row, so a row's cached output is reused
+        whichever pack (or single request) it was computed in.
+        """
+        outputs: List[Any] = [None] * len(data)
+        pending = []
+        for i, (_, row) in enumerate(data.iterrows()):
+            if cache:
+                cached_value = self._cache_get(
+                    cache, self._get_llm_cache_key(row, llm_provider)
+                )
+                if cached_value is not MISSING:
+                    outputs[i] = (*self._unpack_cached_value(cached_value), True)
+                    self._report_progress([outputs[i]])
+                    continue
+            pending.append((i, row))
+
+        packs = self._make_packs(pending)
+        results = await asyncio.gather(
+            *[
+                self._process_pack_with_progress(pack, llm_provider, cache)
+                for pack in packs
+            ]
+        )
+        for pack, pack_outputs in zip(packs, results):
+            for (i, _), output in zip(pack, pack_outputs):
+                outputs[i] = output
+        return outputs
+
+    def _make_packs(self, pending: List[tuple[int, pd.Series]]) -> List[list]:
+        """Group rows into packs that fit `pack_size` and `pack_max_tokens`."""
+        prefix_tokens = sum(
+            estimate_tokens(message["content"])
+            for message in self.conversation_template[:-1]
+        )
+        packs: List[list] = []
+        pack_tokens = 0
+        for item in pending:
+            row_tokens = estimate_tokens(
+                self._format_conversation(item[1])[-1]["content"]
+            )
+            if (
+                packs
+                and len(packs[-1]) < self.pack_size
+                and prefix_tokens + pack_tokens + row_tokens <= self.pack_max_tokens
+            ):
+                packs[-1].append(item)
+                pack_tokens += row_tokens
+            else:
+                packs.append([item])
+                pack_tokens = row_tokens
+        return packs
 
-        # For simplicity, use the same content for all output columns
-        return [response] * len(self.output_columns)
+    async def _process_pack_with_progress(
+        self,
+        pack: List[tuple[int, pd.Series]],
+        llm_provider: LLMProvider,
+        cache: Cache | None,
+    ) -> List[tuple[list[str] | None, Usage | None, bool]]:
+        outputs = await self._process_pack(pack, llm_provider, cache)
+        self._report_progress(outputs)
+        return outputs
+
+    async def _process_pack(
+        self,
+        pack: List[tuple[int, pd.Series]],
+        llm_provider: LLMProvider,
+        cache: Cache | None,
+    ) -> List[tuple[list[str] | None, Usage | None, bool]]:
+        """Send one packed request and split its answer back into per-row outputs."""
+        rows = [row for _, row in pack]
+        if len(rows) == 1:
+            return [await self._process_uncached_row(rows[0], llm_provider, cache)]
+
+        conversations = [self._format_conversation(row) for row in rows]
+        items = [conversation[-1]["content"] for conversation in conversations]
+        last = conversations[0][-1]
+        messages = conversations[0][:-1] + [
+            {"role": last["role"], "content": format_packed_items(items)}
+        ]
+        response = await self._request(messages, llm_provider)
+        if response is None:
+            return [(None, None, False)] * len(rows)
+        self._packs += 1
+
+        try:
+            answers = parse_packed_response(response.text, len(rows))
+        except PackParseError:
+            # Charge the failed pack to the stage, then ask row by row
+            self._pack_fallbacks += 1
+            self._record_usage(response.usage, from_cache=False)
+            return await asyncio.gather(
+                *[self._process_uncached_row(row, llm_provider, cache) for row in rows]
+            )
+
+        outputs = []
+        for row, answer, usage in zip(
+            rows, answers, split_usage(response.usage, len(rows))
+        ):
+            output = [answer]
+            if cache:
+                self._cache_set(
+                    cache,
+                    self._get_llm_cache_key(row, llm_provider),
+                    {"outputs": output, "usage": usage.to_dict() if usage else None},
+                )
+            outputs.append((output, usage, False))
+        return outputs
+
+    async def _parse_with_reasks(
+        self,
+        messages: List[Dict[str, str]],
+        response: LLMResponse,
+        llm_provider: LLMProvider,
+    ) -> tuple[list[Any] | None, Usage | None]:
+        """Parse a structured response, re-asking with the error while it is invalid.
+
+        Returns the per-column outputs (None if no attempt was valid, or
+        `_BUDGET_SKIPPED` if the budget refused a re-ask) and the usage summed over
+        every attempt.
+        """
+        usage = response.usage
+        for attempt in range(self.max_reasks + 1):
+            try:
+                value = parse_json_response(response.text, self.output_schema)
+            except SchemaValidationError as e:
+                error = e
+            else:
+                return [value.get(col) for col in self.output_columns], usage
+            if attempt == self.max_reasks:
+                break
+
+            messages = messages + [
+                {"role": "assistant", "content": response.text or ""},
+                {
+                    "role": "user",
+                    "content": f"That response was invalid ({error}). Reply with "
+                    "only a JSON object matching the schema.",
+                },
+            ]
+            response = await self._request(messages, llm_provider)
+            if response is None:
+                return _BUDGET_SKIPPED, usage
+            self._reasks += 1
+            if response.usage is not None:
+                usage = response.usage if usage is None else usage + response.usage
+        return None, usage
+
+    async def _generate(
+        self, messages: List[Dict[str, str]], llm_provider: LLMProvider
+    ) -> LLMResponse:
+        """Request a response, streaming it if the stage has a stream parser."""
+        if self.stream_parser is None:
+            return await llm_provider.generate_response(
+                messages, self._response_format()
+            )
+
+        started = time.perf_counter()
+        time_to_first_token = None
+        text = ""
+        output = None
+        usage = None
+        finish_reason = None
+        stream = llm_provider.stream(messages)
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                finish_reason = chunk.finish_reason or finish_reason
+                if not chunk.text:
+                    continue
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - started
+                text += chunk.text
+                parsed = self.stream_parser(text)
+                if parsed is not None and parsed is not False:
+                    output = text if parsed is True else parsed
+                    finish_reason = "early_stop"
+                    self._early_stops += 1
+                    break
+        finally:
+            # Closing the stream cancels the request if we stopped early
+            await stream.aclose()
+
+        if time_to_first_token is not None:
+            self._time_to_first_token.append(time_to_first_token)
+        if usage is None:
+            # Cancelled streams report no usage; estimate what was consumed
+            usage = Usage(
+                prompt_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+                completion_tokens=estimate_tokens(text),
+            )
+        return LLMResponse(
+            text=text if output is None else output,
+            usage=usage,
+            latency=time.perf_counter() - started,
+            finish_reason=finish_reason,
+            time_to_first_token=time_to_first_token,
+        )
+
+    def _response_format(self) -> Dict[str, Any] | None:
+        """Return the provider response format for the output schema, if any."""
+        if self.output_schema is None:
+            return None
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "output", "schema": self.output_schema},
+        }
+
+    def _unpack_cached_value(self, cached_value: Any) -> tuple[list[str], Usage | None]:
+        """Split a cached value into outputs and usage (older entries are bare lists).
+
+        A cached failure unpacks to None outputs.
+        """
+        if isinstance(cached_value, CachedFailure):
+            self._negative_hits += 1
+            return [None] * len(self.output_columns), None
+        if isinstance(cached_value, dict):
+            usage = cached_value.get("usage")
+            return cached_value["outputs"], Usage.from_dict(usage) if usage else None
+        return cached_value, None
 
     def _format_conversation(self, row: pd.Series) -> List[Dict[str, str]]:
         """Format the conversation template with row values."""
@@ -102,4 +926,15 @@ class LLMStage(Stage):
 
             messages.append({"role": message["role"], "content": content})
 
+        if self.output_schema is not None:
+            instruction = (
+                "Respond with only a JSON object matching this JSON schema:\n"
+                + json.dumps(self.output_schema)
+            )
+            if messages and messages[0]["role"] == "system":
+                content = messages[0]["content"] + "\n\n" + instruction
+                messages[0] = {"role": "system", "content": content}
+            else:
+                messages.insert(0, {"role": "system", "content": instruction})
+
         return messages
@@ -1,13 +1,23 @@
+import json
 import pandas as pd
-from typing import List, Any, Optional
+from typing import Hashable, List, Any, Dict, Optional
+from pipeline_forge.budget import get_budget
+from pipeline_forge.progress import advance
 from pipeline_forge.stage import Stage
 from pipeline_forge.pipeline import Pipeline
 from pipeline_forge.llm.provider import LLMProvider
-from pipeline_forge.cache import Cache
+from pipeline_forge.cache import MISSING, Cache
 
 
 class PipelineStage(Stage):
-    """Stage that encapsulates a nested pipeline."""
+    """Stage that encapsulates a nested pipeline.
+
+    The nested pipeline only sees the stage's input columns. With a cache, the
+    whole nested pipeline is memoized per row: rows whose inputs were seen before
+    (by a PipelineStage with the same fingerprint, which covers the nested stages
+    and the columns kept) are filled in with one cache lookup, and only the other
+    rows are run through the nested pipeline.
+    """
 
     def __init__(
         self,
@@ -16,11 +26,54 @@ class PipelineStage(Stage):
         output_columns: List[str],
         filter_colname: Optional[str] = None,
         filter_fallback_value: Any = None,
+        expose_columns: Optional[List[str]] = None,
     ):
+        """
+        Args:
+            expose_columns: Intermediate columns of the nested pipeline to keep in
+                the output (and in its cached results) alongside `output_columns`
+        """
         super().__init__(
             input_columns, output_columns, filter_colname, filter_fallback_value
         )
         self.pipeline = pipeline
+        self.expose_columns = expose_columns or []
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the constructor arguments needed to recreate this stage."""
+        return {
+            **super().get_config(),
+            "pipeline": self.pipeline,
+            "expose_columns": self.expose_columns,
+        }
+
+    def get_fingerprint(self) -> str:
+        """Return the stage's fingerprint, recomputed when a nested stage changes."""
+        nested = self.pipeline.get_fingerprint()
+        if self.__dict__.get("_nested_fingerprint") != nested:
+            self.__dict__.pop("_fingerprint", None)
+            self._nested_fingerprint = nested
+        return super().get_fingerprint()
+
+    def get_cache_namespaces(self) -> List[str]:
+        """Return this stage's fingerprint and those of the nested stages."""
+        return super().get_cache_namespaces() + self.pipeline.get_cache_namespaces()
+
+    def get_output_columns(self) -> List[str]:
+        """Return the output columns followed by the exposed intermediate columns."""
+        return self.output_columns + [
+            col for col in self.expose_columns if col not in self.output_columns
+        ]
+
+    def _get_cache_key(
+        self, fingerprint: str, row: pd.Series, llm_provider: LLMProvider | None
+    ) -> Hashable:
+        """Key a row's nested results by stage fingerprint, inputs and provider."""
+        return (
+            fingerprint,
+            json.dumps([row[col] for col in self.input_columns], default=str),
+            llm_provider.get_provider_id() if llm_provider is not None else None,
+        )
 
     async def _process_post_filter(
         self,
@@ -29,8 +82,53 @@ class PipelineStage(Stage):
         cache: Cache | None = None,
         **kwargs
     ) -> pd.DataFrame:
-        """Process through the nested pipeline."""
-        data = await self.pipeline.run(
-            data, llm_provider=llm_provider, cache=cache, **kwargs
-        )
-        return data[self.input_columns + self.output_columns]
+        """Process through the nested pipeline, reusing cached nested results."""
+        columns = self.get_output_columns()
+        result = data.copy()
+        for col in columns:
+            if col not in result.columns:
+                result[col] = None
+
+        inputs = data[self.input_columns]
+        if not cache:
+            nested = await self.pipeline.run(
+                inputs, llm_provider=llm_provider, cache=cache, **kwargs
+            )
+            result[columns] = nested[columns]
+            advance(len(result))
+            return result
+
+        # The stage's fingerprint, unlike the nested pipeline's, covers the
+        # columns stored in the cached values
+        fingerprint = self.get_fingerprint()
+        keys = {}
+        hits = {}
+        for idx, row in inputs.iterrows():
+            keys[idx] = self._get_cache_key(fingerprint, row, llm_provider)
+            cached_value = self._cache_get(cache, keys[idx])
+            if cached_value is not MISSING:
+                hits[idx] = cached_value
+
+        if hits:
+            result.loc[list(hits), columns] = pd.DataFrame(
+                list(hits.values()), index=list(hits), columns=columns, dtype=object
+            )
+            advance(len(hits), cached=len(hits))
+
+        misses = [idx for idx in inputs.index if idx not in hits]
+        if misses:
+            nested = await self.pipeline.run(
+                inputs.loc[misses], llm_provider=llm_provider, cache=cache, **kwargs
+            )
+            result.loc[misses, columns] = nested[columns]
+            advance(len(misses))
+
+            # Rows left unprocessed by an exhausted budget are not cached
+            budget = get_budget()
+            complete = nested.index
+            if budget is not None and budget.get_skipped():
+                complete = complete[~budget.skipped_mask(complete)]
+            for idx, values in nested.loc[complete, columns].iterrows():
+                self._cache_set(cache, keys[idx], values.to_dict())
+
+        return result
@@ -0,0 +1,109 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+_NUMBER_TYPES = ("integer", "number")
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+class SchemaValidationError(ValueError):
+    """Raised when an LLM response is not valid JSON or does not match the schema."""
+
+    pass
+
+
+def schema_for_columns(columns: List[str]) -> Dict[str, Any]:
+    """Return a JSON schema for an object with one required (untyped) key per column."""
+    return {
+        "type": "object",
+        "properties": {col: {} for col in columns},
+        "required": list(columns),
+    }
+
+
+def check_schema(schema: Dict[str, Any], path: str = "$") -> None:
+    """Raise ValueError if a schema uses a `type` that `validate` does not know."""
+    expected = schema.get("type")
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        unknown = [t for t in types if t not in _JSON_TYPES and t not in _NUMBER_TYPES]
+        if unknown:
+            raise ValueError(
+                f"{path}: unsupported schema type {unknown[0]!r}, expected one of "
+                f"{sorted([*_JSON_TYPES, *_NUMBER_TYPES])}"
+            )
+    for key, subschema in schema.get("properties", {}).items():
+        check_schema(subschema, f"{path}.{key}")
+    if "items" in schema:
+        check_schema(schema["items"], f"{path}[]")
+
+
+def _matches_type(value: Any, expected: str) -> bool:
+    if expected == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if expected == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _JSON_TYPES[expected])
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$") -> None:
+    """Validate a value against a JSON schema.
+
+    Supports the subset of JSON Schema used for structured outputs: `type` (single
+    or list), `enum`, `properties`, `required`, `additionalProperties: false` and
+    `items`. Raises SchemaValidationError describing the first mismatch.
+    """
+    expected = schema.get("type")
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_matches_type(value, t) for t in types):
+            raise SchemaValidationError(
+                f"{path}: expected {' or '.join(types)}, got {type(value).__name__}"
+            )
+
+    if "enum" in schema and value not in schema["enum"]:
+        raise SchemaValidationError(f"{path}: {value!r} is not one of {schema['enum']}")
+
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value:
+                raise SchemaValidationError(f"{path}: missing required key {key!r}")
+        if schema.get("additionalProperties") is False:
+            extra = set(value) - set(properties)
+            if extra:
+                raise SchemaValidationError(f"{path}: unexpected keys {sorted(extra)}")
+        for key, subschema in properties.items():
+            if key in value:
+                validate(value[key], subschema, f"{path}.{key}")
+
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{i}]")
+
+
+def parse_json_response(text: Optional[str], schema: Dict[str, Any]) -> Any:
+    """Parse an LLM response as JSON (tolerating a code fence) and validate it.
+
+    A response without content (e.g. a refusal) is a parse failure too.
+    """
+    if text is None:
+        raise SchemaValidationError("empty response")
+    match = _CODE_FENCE.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise SchemaValidationError(f"invalid JSON: {e}") from e
+    validate(value, schema)
+    return value
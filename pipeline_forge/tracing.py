@@ -0,0 +1,276 @@
+import itertools
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class TraceEvent:
+    """A single completed span (stage, row, cache operation, provider call, ...)."""
+
+    kind: str
+    name: str
+    start: float
+    duration: float
+    span_id: int
+    parent_id: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class TraceExporter(ABC):
+    """Receives completed trace events from a Tracer."""
+
+    @abstractmethod
+    def export(self, event: TraceEvent) -> None:
+        """Handle a completed event."""
+        pass
+
+    def close(self) -> None:
+        """Flush any buffered events."""
+        pass
+
+
+class _NullAttributes(dict):
+    """Attribute sink used when tracing is disabled; discards writes."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _NullSpan:
+    """Reusable no-op context manager returned when no tracer is active."""
+
+    _attributes = _NullAttributes()
+
+    def __enter__(self) -> Dict[str, Any]:
+        return self._attributes
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_active_tracer: ContextVar[Optional["Tracer"]] = ContextVar(
+    "pipeline_forge_tracer", default=None
+)
+_current_span: ContextVar[Optional[int]] = ContextVar(
+    "pipeline_forge_span", default=None
+)
+
+
+class Tracer:
+    """Creates timed spans and forwards them to exporters."""
+
+    def __init__(self, exporters: List[TraceExporter] | None = None):
+        self.exporters = exporters if exporters is not None else [InMemoryExporter()]
+        self._ids = itertools.count(1)
+        self._in_flight: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attributes) -> Iterator[Dict[str, Any]]:
+        """Time the enclosed block; the yielded dict can be used to add attributes."""
+        span_id = next(self._ids)
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+
+        gauge = (kind, name)
+        self._in_flight[gauge] += 1
+        attributes["in_flight"] = self._in_flight[gauge]
+
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            self._in_flight[gauge] -= 1
+            _current_span.reset(token)
+            self.record(
+                TraceEvent(kind, name, start, duration, span_id, parent_id, attributes)
+            )
+
+    def record(self, event: TraceEvent) -> None:
+        """Forward an event to every exporter."""
+        for exporter in self.exporters:
+            exporter.export(event)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return the summary of the first in-memory exporter."""
+        for exporter in self.exporters:
+            if isinstance(exporter, InMemoryExporter):
+                return exporter.summary()
+        raise ValueError("Tracer has no InMemoryExporter to summarize")
+
+    def close(self) -> None:
+        """Close all exporters."""
+        for exporter in self.exporters:
+            exporter.close()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Return the tracer active in the current context, if any."""
+    return _active_tracer.get()
+
+
+@contextmanager
+def use_tracer(tracer: Optional[Tracer]) -> Iterator[Optional[Tracer]]:
+    """Make `tracer` the active tracer for the enclosed block (and tasks it spawns)."""
+    if tracer is None:
+        yield get_tracer()
+        return
+    token = _active_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active_tracer.reset(token)
+
+
+def trace(kind: str, name: str, **attributes):
+    """Open a span on the active tracer, or a shared no-op span if tracing is off."""
+    tracer = _active_tracer.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(kind, name, **attributes)
+
+
+class InMemoryExporter(TraceExporter):
+    """Aggregates latency histograms, in-flight gauges and token counts in memory."""
+
+    def __init__(self, keep_events: bool = False):
+        self.keep_events = keep_events
+        self.events: List[TraceEvent] = []
+        self._durations: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self._errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._max_in_flight: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._tokens: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+
+    def export(self, event: TraceEvent) -> None:
+        key = (event.kind, event.name)
+        self._durations[key].append(event.duration)
+        attributes = event.attributes
+        if "error" in attributes:
+            self._errors[key] += 1
+        in_flight = attributes.get("in_flight", 0)
+        if in_flight > self._max_in_flight[key]:
+            self._max_in_flight[key] = in_flight
+        for attr, value in attributes.items():
+            if attr.endswith("_tokens") and isinstance(value, int):
+                self._tokens[key][attr] += value
+        if self.keep_events:
+            self.events.append(event)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return per `kind:name` counts, latency percentiles (seconds) and gauges."""
+        summary = {}
+        for (kind, name), durations in self._durations.items():
+            values = np.asarray(durations)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[f"{kind}:{name}"] = {
+                "kind": kind,
+                "name": name,
+                "count": len(durations),
+                "errors": self._errors[(kind, name)],
+                "total": float(values.sum()),
+                "mean": float(values.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(values.max()),
+                "max_in_flight": self._max_in_flight[(kind, name)],
+                "tokens": dict(self._tokens[(kind, name)]),
+            }
+        return summary
+
+
+class JSONLinesExporter(TraceExporter):
+    """Appends one JSON object per event to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, event: TraceEvent) -> None:
+        self._file.write(json.dumps(asdict(event), default=str) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class OTLPJSONExporter(TraceExporter):
+    """Buffers events and writes them as an OTLP/JSON `resourceSpans` document on close.
+
+    The output can be sent to any OpenTelemetry collector's OTLP/HTTP JSON endpoint
+    or loaded by tools that read the OTLP file format.
+    """
+
+    def __init__(self, path: str, service_name: str = "pipeline_forge"):
+        self.path = path
+        self.service_name = service_name
+        self.trace_id = os.urandom(16).hex()
+        self._spans: List[Dict[str, Any]] = []
+
+    def export(self, event: TraceEvent) -> None:
+        start_ns = int(event.start * 1e9)
+        span = {
+            "traceId": self.trace_id,
+            "spanId": f"{event.span_id:016x}",
+            "name": f"{event.kind} {event.name}",
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(event.duration * 1e9)),
+            "attributes": [
+                {"key": "pipeline_forge.kind", "value": {"stringValue": event.kind}}
+            ]
+            + [
+                {"key": key, "value": self._any_value(value)}
+                for key, value in event.attributes.items()
+            ],
+            "status": {"code": 2 if "error" in event.attributes else 1},
+        }
+        if event.parent_id is not None:
+            span["parentSpanId"] = f"{event.parent_id:016x}"
+        self._spans.append(span)
+
+    @staticmethod
+    def _any_value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def close(self) -> None:
+        document = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "pipeline_forge"}, "spans": self._spans}
+                    ],
+                }
+            ]
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
@@ -0,0 +1,62 @@
+import pytest
+
+from pipeline_forge.benchmark import SCENARIOS, compare_reports, run_benchmark
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+async def test_run_benchmark_reports_metrics(scenario):
+    """Test that each scenario runs and produces a complete report."""
+    report = await run_benchmark(scenario, rows=50, duplicate_ratio=0.5)
+
+    assert report.rows == 50
+    assert report.rows_per_second > 0
+    assert report.peak_memory_bytes > 0
+    # Duplicated rows are served from the cache
+    assert 0 < report.provider_calls < 100
+    assert report.stage_seconds
+    assert set(report.stage_seconds) == set(report.stage_overhead_us_per_row)
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_with_dataflow():
+    """Test that the dataflow engine is benchmarked with the given batch size."""
+    report = await run_benchmark(
+        "filtered", rows=50, profile=False, engine="dataflow", batch_size=8
+    )
+
+    assert report.scenario == "filtered/dataflow"
+    assert report.rows_per_second > 0
+    assert 0 < report.provider_calls < 100
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_fails_over_simulated_errors():
+    """Test that simulated errors are retried on other backends and counted."""
+    report = await run_benchmark(
+        "filtered", rows=200, duplicate_ratio=0.0, profile=False, error_rate=0.05
+    )
+
+    assert report.rows_per_second > 0
+    assert report.provider_errors > 0
+    assert report.provider_calls > report.provider_errors
+
+
+def test_compare_reports_flags_regressions():
+    """Test that only changes beyond the tolerance are reported."""
+    baseline = {
+        "rows_per_second": 1000.0,
+        "peak_memory_bytes": 1_000_000,
+        "stage_overhead_us_per_row": {"LLMStage(a)": 100.0, "FunctionalStage(b)": 10.0},
+    }
+    current = {
+        "rows_per_second": 950.0,
+        "peak_memory_bytes": 2_000_000,
+        "stage_overhead_us_per_row": {"LLMStage(a)": 150.0, "FunctionalStage(b)": 10.5},
+    }
+
+    regressions = compare_reports(baseline, current, tolerance=0.1)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("peak_memory_bytes")
+    assert regressions[1].startswith("LLMStage(a)")
@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+
+from pipeline_forge.budget import Budget
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.provider import MockProvider, Usage
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FilterStage
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+def make_pipeline():
+    return Pipeline(
+        stages=[
+            LLMStage(
+                input_columns=["question"],
+                conversation_template=[{"role": "user", "content": "{question}"}],
+                output_columns=["answer"],
+            ),
+            # Would fail on rows whose answer was never computed
+            FilterStage(
+                input_columns=["answer"],
+                function=lambda answer: answer.lower().startswith("mock"),
+                output_columns=["is_mock"],
+            ),
+            LLMStage(
+                input_columns=["answer"],
+                conversation_template=[{"role": "user", "content": "{answer}"}],
+                output_columns=["followup"],
+                filter_colname="is_mock",
+            ),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_budget_stops_dispatching_and_marks_rows():
+    """Test that an exhausted budget leaves remaining rows unprocessed and marked."""
+    data = pd.DataFrame({"question": [f"q{i}" for i in range(5)]})
+    cache = InMemoryCache()
+    provider = MockProvider()
+
+    # Each request costs 1 prompt + 3 completion tokens
+    budget = Budget(max_tokens=10, completion_estimate=3)
+    result = await make_pipeline().run(
+        data, llm_provider=provider, cache=cache, budget=budget
+    )
+
+    assert result["answer"].tolist()[:2] == ["Mock response"] * 2
+    assert result["answer"][2:].isna().all()
+    # The follow-up stage could not dispatch either, so every row is marked
+    assert result["budget_exhausted"].all()
+    assert result["followup"][:2].isna().all()
+    assert budget.get_skipped() == {
+        "LLMStage(answer)": [2, 3, 4],
+        "LLMStage(followup)": [0, 1],
+    }
+    stats = budget.get_stats()
+    assert stats["exhausted"]
+    assert stats["requests"] == 2
+    assert stats["spent_tokens"] == 8
+    assert stats["reserved_tokens"] == 0
+
+    # Skipped rows belong to their run: rows with the same labels answered from
+    # the cache in a later run are not held back (only the follow-ups, which
+    # need requests, are skipped by the exhausted budget)
+    cached = pd.DataFrame({"question": ["q0", "q1", "q0", "q1", "q0"]})
+    result = await make_pipeline().run(
+        cached, llm_provider=provider, cache=cache, budget=budget
+    )
+    assert result["answer"].tolist() == ["Mock response"] * 5
+    assert budget.get_skipped() == {"LLMStage(followup)": [0, 1, 2, 3, 4]}
+
+    # A later run with a fresh budget picks up where the first one stopped
+    budget = Budget(max_tokens=1000, completion_estimate=3)
+    result = await make_pipeline().run(
+        data, llm_provider=provider, cache=cache, budget=budget
+    )
+
+    assert not result["budget_exhausted"].any()
+    assert result["answer"].tolist() == ["Mock response"] * 5
+    assert result["followup"].tolist() == ["Mock response"] * 5
+    # Three new answers, and one follow-up (the others are identical cache hits)
+    assert budget.get_stats()["requests"] == 4
+
+
+def test_budget_cost_accounting():
+    """Test that costs use per-million prices and discount cached prompt tokens."""
+    budget = Budget(
+        max_cost=1.0, prompt_price=2.0, completion_price=8.0, cached_prompt_price=0.5
+    )
+    usage = Usage(prompt_tokens=1000, completion_tokens=100, cached_tokens=400)
+
+    assert budget.cost(usage) == pytest.approx(
+        (600 * 2.0 + 400 * 0.5 + 100 * 8.0) / 1e6
+    )
+
+    reservation = budget.reserve([{"role": "user", "content": "x" * 4000}])
+    assert reservation is not None
+    budget.commit(reservation, usage)
+    assert budget.spent_cost == pytest.approx(budget.cost(usage))
+    assert budget.reserved_cost == pytest.approx(0.0)
+
+
+def test_budget_cost_ceiling():
+    """Test that a reservation over the cost ceiling exhausts the budget."""
+    budget = Budget(max_cost=0.001, prompt_price=1.0, completion_estimate=0)
+
+    assert budget.reserve([{"role": "user", "content": "x" * 40000}]) is None
+    assert budget.exhausted
+    assert budget.reserve([{"role": "user", "content": "x"}]) is None
+
+
+def test_budget_requires_a_ceiling():
+    with pytest.raises(ValueError):
+        Budget()
@@ -0,0 +1,115 @@
+import json
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.cache import CacheEntry, CachedFailure, InMemoryCache
+from pipeline_forge.cache_io import export_cache, import_cache
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+def make_pipeline():
+    answer = LLMStage(
+        input_columns=["question"],
+        conversation_template=[{"role": "user", "content": "{question}"}],
+        output_columns=["answer"],
+    )
+    length = FunctionalStage(
+        input_columns=["answer"],
+        output_columns=["length"],
+        function=lambda answer: len(answer),
+    )
+    return Pipeline(stages=[answer, length]), answer, length
+
+
+@pytest.mark.asyncio
+async def test_export_import_warm_starts_a_fresh_cache(tmp_path):
+    data = pd.DataFrame({"question": ["a?", "b?", "c?"]})
+    pipeline, answer, _ = make_pipeline()
+    cache = InMemoryCache()
+    provider = MockProvider(default_response="ok")
+    expected = await pipeline.run(data, llm_provider=provider, cache=cache)
+
+    path = tmp_path / "cache.jsonl"
+    # Three answers, and one length since the answers are equal
+    assert export_cache(cache, path) == 4
+    entries = list(cache.entries(stages=[answer.get_fingerprint()]))
+    assert len(entries) == 3
+
+    warm = InMemoryCache()
+    assert import_cache(warm, path) == 4
+    imported = {entry.key: entry for entry in warm.entries()}
+    for entry in entries:
+        assert imported[entry.key].value == entry.value
+        assert imported[entry.key].created_at == entry.created_at
+
+    # A rerun on the seeded cache is served entirely from it
+    result = await pipeline.run(data, llm_provider=provider, cache=warm)
+    pd.testing.assert_frame_equal(result, expected)
+    assert warm.get_stats()["misses"] == 0
+
+
+@pytest.mark.asyncio
+async def test_export_filters_by_stage_and_age(tmp_path):
+    data = pd.DataFrame({"question": ["a?", "b?"]})
+    pipeline, answer, length = make_pipeline()
+    cache = InMemoryCache()
+    await pipeline.run(data, llm_provider=MockProvider(), cache=cache)
+    cache.set_many([CacheEntry("old", "value", answer.get_fingerprint(), 0.0)])
+
+    path = tmp_path / "answers.jsonl"
+    assert export_cache(cache, path, stages=[answer], max_age=3600) == 2
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[0])["format"] == "pipeline_forge.cache"
+    assert {json.loads(line)["stage"] for line in lines[1:]} == {
+        answer.get_fingerprint()
+    }
+
+    # Filters also apply on import
+    path = tmp_path / "all.jsonl"
+    export_cache(cache, path)
+    warm = InMemoryCache()
+    assert import_cache(warm, path, stages=[length.get_fingerprint()]) == 1
+    assert import_cache(warm, path, max_age=3600, batch_size=1) == 3
+
+
+def test_export_round_trips_tuples_and_objects(tmp_path):
+    cache = InMemoryCache()
+    cache.set_entry(
+        CacheEntry(("a", 1), {"outputs": [("x", None)], "$odd": {1, 2}}, "s")
+    )
+    path = tmp_path / "cache.jsonl"
+    export_cache(cache, path)
+
+    warm = InMemoryCache()
+    import_cache(warm, path, allow_pickle=True)
+    assert warm.get(("a", 1)) == {"outputs": [("x", None)], "$odd": {1, 2}}
+    assert next(warm.entries()).stage == "s"
+
+
+def test_import_rejects_pickles_unless_allowed(tmp_path):
+    cache = InMemoryCache()
+    failure = CachedFailure("SchemaValidationError", "invalid", expires_at=None)
+    cache.set_entry(CacheEntry(("failed",), failure, "s"))
+    path = tmp_path / "cache.jsonl"
+    export_cache(cache, path)
+    # Cached failures have a JSON form and need no pickle
+    assert "$pickle" not in path.read_text()
+    warm = InMemoryCache()
+    assert import_cache(warm, path) == 1
+    assert warm.get(("failed",)) == failure
+
+    cache.set_entry(CacheEntry(("set",), {1, 2}, "s"))
+    export_cache(cache, path)
+    with pytest.raises(ValueError, match="allow_pickle=True"):
+        import_cache(InMemoryCache(), path)
+
+
+def test_import_rejects_other_files(tmp_path):
+    path = tmp_path / "other.jsonl"
+    path.write_text('{"key": "a"}\n')
+    with pytest.raises(ValueError, match="Not a cache export"):
+        import_cache(InMemoryCache(), path)
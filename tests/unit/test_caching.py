@@ -2,10 +2,18 @@ import pytest
 
 from pipeline_forge.stages.llm_stage import LLMStage
 from pipeline_forge.pipeline import Pipeline
-from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.cache import (
+    MISSING,
+    Cache,
+    CachedFailure,
+    InMemoryCache,
+    ValueStore,
+)
 from pipeline_forge.llm.provider import MockProvider
 import pandas as pd
 
+from pipeline_forge.stages.functional_stage import FunctionalStage
+
 
 @pytest.mark.asyncio
 async def test_caching():
@@ -99,3 +107,275 @@ async def test_compute_options_affect_cache():
     stats3 = cache.get_stats()
     assert stats3["hits"] == 1  # Hit count increased
     assert stats3["misses"] == 2  # Miss count unchanged
+
+
+@pytest.mark.asyncio
+async def test_cached_values_keep_usage():
+    """Test that cache hits report the usage of the request that produced them."""
+    data = pd.DataFrame({"question": ["What is 1+1?", "Who are you?"]})
+    stage = LLMStage(
+        input_columns=["question"],
+        conversation_template=[{"role": "user", "content": "{question}"}],
+        output_columns=["answer"],
+        usage_columns=True,
+    )
+    pipeline = Pipeline(stages=[stage])
+    cache = InMemoryCache()
+    provider = MockProvider(default_response="Mock response")
+
+    first = await pipeline.run(data, llm_provider=provider, cache=cache)
+    first_usage = stage.get_usage()
+    stage.reset_usage()
+    second = await pipeline.run(data, llm_provider=provider, cache=cache)
+
+    assert first.equals(second)
+    usage = stage.get_usage()
+    assert usage["requests"] == 0
+    assert usage["cache_hits"] == 2
+    assert usage["total_tokens"] == 0
+    assert usage["saved_tokens"] == first_usage["total_tokens"]
+
+
+def test_value_store_interns_and_compresses_values():
+    """Test that identical values are stored once and large ones compressed."""
+    cache = InMemoryCache(value_store=ValueStore(compress_threshold=100))
+    for i in range(100):
+        # Same outputs, different usage: the outputs field is shared
+        cache.set(
+            f"row {i}",
+            {"outputs": ["positive"], "usage": {"prompt_tokens": i % 3}},
+        )
+    long_text = "The quick brown fox jumps over the lazy dog. " * 50
+    cache.set("long", {"outputs": [long_text], "usage": None})
+
+    assert cache.get("row 7") == {
+        "outputs": ["positive"],
+        "usage": {"prompt_tokens": 1},
+    }
+    assert cache.get("long")["outputs"] == [long_text]
+    stats = cache.get_stats()
+    # ["positive"], 3 usages, the long text and None
+    assert stats["blobs"] == 6
+    assert stats["bytes_stored"] < stats["bytes_logical"] / 2
+    assert stats["bytes_saved"] == stats["bytes_logical"] - stats["bytes_stored"]
+
+    # Overwriting and clearing release the blobs
+    cache.set("long", {"outputs": ["negative"], "usage": None})
+    assert cache.get_stats()["blobs"] == 6
+    cache.clear()
+    assert cache.get_stats()["bytes_logical"] == 0
+
+
+def test_value_store_shared_dictionary():
+    prefix = b"You are a helpful assistant. Here is the answer you asked for: "
+    plain = ValueStore(compress_threshold=0)
+    with_dictionary = ValueStore(compress_threshold=0, dictionary=prefix)
+    value = prefix.decode() + "42"
+    plain.put(value)
+    ref = with_dictionary.put(value)
+    assert with_dictionary.get(ref) == value
+    assert (
+        with_dictionary.get_stats()["bytes_stored"] < plain.get_stats()["bytes_stored"]
+    )
+    with pytest.raises(ValueError):
+        ValueStore(compression="lz4")
+
+
+def make_two_stage_pipeline(prompt: str) -> Pipeline:
+    answer = LLMStage(
+        input_columns=["question"],
+        conversation_template=[{"role": "user", "content": "{question}"}],
+        output_columns=["answer"],
+    )
+    summary = LLMStage(
+        input_columns=["answer"],
+        conversation_template=[{"role": "user", "content": prompt}],
+        output_columns=["summary"],
+    )
+    return Pipeline(stages=[answer, summary])
+
+
+@pytest.mark.asyncio
+async def test_cache_namespaces_per_stage():
+    """Each stage's entries live in a namespace with its own statistics."""
+    data = pd.DataFrame({"question": ["a?", "b?", "a?"]})
+    pipeline = make_two_stage_pipeline("Summarize {answer}")
+    answer, summary = pipeline.stages
+    cache = InMemoryCache()
+    await pipeline.run(data, llm_provider=MockProvider(), cache=cache)
+
+    counts = cache.stage_counts()
+    assert counts == {answer.get_fingerprint(): 2, summary.get_fingerprint(): 1}
+    stats = pipeline.get_cache_stats(cache)
+    assert stats[answer.get_name()] == {
+        "hits": 1,
+        "misses": 2,
+        "negative_hits": 0,
+        "size": 2,
+    }
+    assert stats[summary.get_name()] == {
+        "hits": 2,
+        "misses": 1,
+        "negative_hits": 0,
+        "size": 1,
+    }
+    assert set(cache.get_namespace_stats()) == set(counts)
+
+
+@pytest.mark.asyncio
+async def test_targeted_invalidation_keeps_upstream_entries():
+    """Clearing or editing one stage leaves the other stages' entries cached."""
+    data = pd.DataFrame({"question": ["a?", "b?"]})
+    provider = MockProvider()
+    cache = InMemoryCache(value_store=ValueStore())
+    pipeline = make_two_stage_pipeline("Summarize {answer}")
+    answer, summary = pipeline.stages
+    await pipeline.run(data, llm_provider=provider, cache=cache)
+
+    assert pipeline.clear_caches(cache, stages=[summary]) == 1
+    assert cache.stage_counts() == {answer.get_fingerprint(): 2}
+
+    # Editing the downstream prompt only misses in the downstream stage
+    edited = make_two_stage_pipeline("Shorten {answer}")
+    before = cache.namespace(answer.get_fingerprint()).get_stats()
+    await edited.run(data, llm_provider=provider, cache=cache)
+    after = cache.namespace(answer.get_fingerprint()).get_stats()
+    assert after["misses"] == before["misses"]
+    assert after["hits"] == before["hits"] + 2
+    await pipeline.run(data, llm_provider=provider, cache=cache)
+
+    # Pruning drops the entries of the earlier summary prompt only
+    assert edited.prune_cache(cache) == 1
+    assert set(cache.stage_counts()) == set(edited.get_cache_namespaces())
+
+    cache.namespace(answer.get_fingerprint()).clear()
+    assert edited.clear_caches(cache) == 1
+    assert cache.get_stats()["size"] == 0
+    assert cache.get_stats()["blobs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_execution_settings_keep_the_fingerprint():
+    """Changing only how a stage runs keeps its entries prunable and clearable."""
+    data = pd.DataFrame({"question": ["a?", "b?"]})
+    provider = MockProvider()
+    cache = InMemoryCache()
+    pipeline = make_two_stage_pipeline("Summarize {answer}")
+    answer, summary = pipeline.stages
+    await pipeline.run(data, llm_provider=provider, cache=cache)
+    fingerprint = answer.get_fingerprint()
+
+    answer.usage_columns = True
+    answer.prefix_caching = True
+    assert answer.get_fingerprint() == fingerprint
+    result = await pipeline.run(data, llm_provider=provider, cache=cache)
+    assert result["answer_prompt_tokens"].notna().all()
+    assert answer.get_usage()["cache_hits"] == 2
+
+    assert pipeline.prune_cache(cache) == 0
+    assert pipeline.clear_caches(cache, stages=[answer]) == 2
+    assert cache.stage_counts() == {summary.get_fingerprint(): 1}
+
+
+class DictCache(Cache):
+    """A backend implementing only the basic cache methods."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def contains(self, key):
+        return key in self.values
+
+    def clear(self):
+        self.values = {}
+
+    def get_stats(self):
+        return {"size": len(self.values)}
+
+
+@pytest.mark.asyncio
+async def test_basic_cache_backends_still_work():
+    """Backends with only get(key) and set(key, value) serve stages' cache hits."""
+    data = pd.DataFrame({"question": ["a?", "b?"]})
+    pipeline = make_two_stage_pipeline("Summarize {answer}")
+    answer, _ = pipeline.stages
+    cache = DictCache()
+    await pipeline.run(data, llm_provider=MockProvider(), cache=cache)
+    assert cache.get_stats() == {"size": 3}
+
+    await pipeline.run(data, llm_provider=MockProvider(), cache=cache)
+    assert answer.get_usage()["cache_hits"] == 2
+
+    # Without stage tags, targeted invalidation is a no-op rather than an error
+    assert pipeline.clear_caches(cache, stages=[answer]) == 0
+    assert pipeline.prune_cache(cache) == 0
+    assert pipeline.get_cache_stats(cache) == {}
+    assert cache.get_stats() == {"size": 3}
+
+
+@pytest.mark.parametrize("value_store", [None, ValueStore()])
+def test_stored_none_is_a_hit(value_store):
+    cache = InMemoryCache(value_store=value_store)
+    assert cache.lookup("key") is MISSING
+    cache.set("key", None)
+    assert cache.lookup("key") is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_cached_failures_expire():
+    cache = InMemoryCache()
+    cache.set("bad", CachedFailure("ValueError", "no", expires_at=None))
+    cache.set("old", CachedFailure("ValueError", "no", expires_at=0.0))
+    assert isinstance(cache.get("bad"), CachedFailure)
+    assert cache.get("old", MISSING) is MISSING
+    assert not cache.contains("old")
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["negative_hits"], stats["misses"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_negative_caching_skips_known_failures():
+    """Deterministic failures and None results are not recomputed on later runs."""
+    calls = []
+
+    def parse(text):
+        calls.append(text)
+        if text == "bad":
+            raise ValueError("cannot parse")
+        return None if text == "none" else int(text)
+
+    stage = FunctionalStage(
+        input_columns=["text"],
+        output_columns=["number"],
+        function=parse,
+        deterministic_errors=(ValueError,),
+        negative_cache_ttl=3600,
+    )
+    pipeline = Pipeline(stages=[stage])
+    data = pd.DataFrame({"text": ["1", "bad", "none"]})
+    cache = InMemoryCache()
+    first = await pipeline.run(data, cache=cache)
+    second = await pipeline.run(data, cache=cache)
+
+    assert first["number"].tolist() == [1, None, None]
+    assert second["number"].tolist() == [1, None, None]
+    assert calls == ["1", "bad", "none"]
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["negative_hits"], stats["misses"]) == (3, 1, 3)
+
+    # Without a TTL the failure is not cached, and other errors still propagate
+    stage.negative_cache_ttl = None
+    cache = InMemoryCache()
+    await pipeline.run(data, cache=cache)
+    await pipeline.run(data, cache=cache)
+    assert calls.count("bad") == 3
+    stage.deterministic_errors = ()
+    with pytest.raises(ValueError):
+        await pipeline.run(data, cache=InMemoryCache())
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.llm.simulated_provider import SimulatedProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+class SlowRowProvider(MockProvider):
+    """Echoes the request, taking longer for requests mentioning "slow"."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = []
+        self.finished = []
+
+    async def generate_response(self, messages, response_format=None):
+        content = messages[-1]["content"]
+        self.started.append((time.monotonic(), content))
+        await asyncio.sleep(0.3 if "slow" in content else 0.01)
+        self.finished.append((time.monotonic(), content))
+        return await super().generate_response(messages, response_format)
+
+    def _respond(self, messages):
+        return messages[-1]["content"].split(": ", 1)[1]
+
+
+def make_pipeline():
+    return Pipeline(
+        [
+            LLMStage(
+                input_columns=["text"],
+                conversation_template=[{"role": "user", "content": "first: {text}"}],
+                output_columns=["first"],
+            ),
+            LLMStage(
+                input_columns=["first"],
+                conversation_template=[{"role": "user", "content": "second: {first}"}],
+                output_columns=["second"],
+            ),
+            FunctionalStage(
+                input_columns=["text"],
+                function=lambda text: len(text),
+                output_columns=["length"],
+                filter_colname="is_odd",
+                filter_fallback_value=-1,
+            ),
+            FunctionalStage(
+                input_columns=["text"],
+                function=lambda text: len(text) % 2 == 1,
+                output_columns=["is_odd"],
+            ),
+        ]
+    )
+
+
+def make_data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {"text": ["slow row", "a", "bb", "ccc", "dddd"]}, index=[10, 11, 12, 13, 14]
+    )
+
+
+@pytest.mark.asyncio
+async def test_rows_move_on_without_waiting_for_the_stage():
+    """Test that fast rows reach the next LLM stage before a slow row finishes."""
+    provider = SlowRowProvider()
+    result = await make_pipeline().run_dataflow(
+        make_data(), llm_provider=provider, batch_size=1
+    )
+
+    slow_done = next(
+        t for t, content in provider.finished if content == "first: slow row"
+    )
+    second_started = [
+        t for t, content in provider.started if content.startswith("second")
+    ]
+    assert min(second_started) < slow_done
+
+    expected = await make_pipeline().run(make_data(), llm_provider=MockProvider())
+    assert list(result.columns) == list(expected.columns)
+    assert result.index.tolist() == [10, 11, 12, 13, 14]
+    assert result["second"].tolist() == make_data()["text"].tolist()
+    assert result["length"].tolist() == [-1, 1, -1, 3, -1]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_budget_is_global():
+    """Test that requests across all stages share one concurrency limit."""
+    provider = SimulatedProvider(latency="constant", latency_mean=0.02)
+    data = pd.DataFrame({"text": [f"row {i}" for i in range(20)]})
+
+    result = await make_pipeline().run_dataflow(
+        data, llm_provider=provider, batch_size=1, max_concurrency=3, queue_size=4
+    )
+
+    assert 1 < provider.max_in_flight <= 3
+    assert provider.calls == 40
+    assert result["first"].tolist() == ["Mock response"] * 20
+
+    # Batches of many rows still send at most max_concurrency requests at once
+    provider = SimulatedProvider(latency="constant", latency_mean=0.02)
+    await make_pipeline().run_dataflow(
+        data, llm_provider=provider, batch_size=10, max_concurrency=3
+    )
+    assert provider.max_in_flight == 3
+    assert provider.calls == 40
+
+
+@pytest.mark.asyncio
+async def test_stage_errors_propagate():
+    pipeline = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["text"],
+                function=lambda text: 1 / 0,
+                output_columns=["broken"],
+            )
+        ]
+    )
+    with pytest.raises(ZeroDivisionError):
+        await pipeline.run_dataflow(make_data())
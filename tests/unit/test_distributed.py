@@ -0,0 +1,141 @@
+import os
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.distributed import (
+    PartitionFailedError,
+    partition,
+    run_distributed,
+)
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.manifest import ManifestError
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+def fail_once(marker: str) -> None:
+    """Fail the first time a marker path is seen, by raising or by exiting the process."""
+    if not marker or os.path.exists(marker):
+        return
+    open(marker, "w").close()
+    if marker.endswith(".crash"):
+        os._exit(1)
+    raise RuntimeError("transient failure")
+
+
+def make_pipeline() -> Pipeline:
+    return Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["text", "marker"],
+                output_columns=["clean"],
+                function=lambda text, marker: fail_once(marker) or text.strip(),
+            ),
+            LLMStage(
+                input_columns=["clean"],
+                conversation_template=[{"role": "user", "content": "{clean}"}],
+                output_columns=["reply"],
+            ),
+            FunctionalStage(
+                input_columns=["reply"],
+                output_columns=["pid"],
+                function=lambda reply: os.getpid(),
+            ),
+        ]
+    )
+
+
+def make_provider() -> MockProvider:
+    return MockProvider(default_response="ok")
+
+
+def test_partition_by_position_and_key():
+    """Test that partitions cover every row and hash partitioning groups equal keys."""
+    data = pd.DataFrame({"key": ["a", "b", "a", "c", "b", "a", "d"]})
+
+    by_position = partition(data, 3)
+    assert [len(part) for part in by_position] == [2, 2, 3]
+
+    by_key = partition(data, 3, key_columns=["key"])
+    assert sorted(i for part in by_key for i in part.index) == list(range(7))
+    for key in "abcd":
+        assert sum((part["key"] == key).any() for part in by_key) == 1
+
+
+def test_run_distributed_retries_failed_partitions(tmp_path):
+    """Test that failing and crashing partitions are retried and results merged in order."""
+    data = pd.DataFrame(
+        {"text": [f" row {i} " for i in range(12)], "marker": [""] * 12},
+        index=range(100, 112),
+    )
+    data.loc[103, "marker"] = str(tmp_path / "row3.error")
+    data.loc[108, "marker"] = str(tmp_path / "row8.crash")
+
+    result = run_distributed(
+        data,
+        pipeline="test_distributed:make_pipeline",
+        llm_provider="test_distributed:make_provider",
+        n_workers=2,
+        n_partitions=4,
+        timeout=60,
+    )
+
+    assert result.index.tolist() == data.index.tolist()
+    assert result["clean"].tolist() == [f"row {i}" for i in range(12)]
+    assert (result["reply"] == "ok").all()
+    assert os.getpid() not in set(result["pid"])
+
+
+def test_run_distributed_gives_up_after_retries():
+    """Test that a partition failing on every attempt raises PartitionFailedError."""
+    data = pd.DataFrame({"text": ["a"], "marker": ["/nonexistent/dir/marker"]})
+
+    with pytest.raises(PartitionFailedError, match="No such file"):
+        run_distributed(
+            data,
+            pipeline="test_distributed:make_pipeline",
+            llm_provider="test_distributed:make_provider",
+            n_workers=1,
+            max_retries=1,
+            timeout=60,
+        )
+
+
+def test_run_distributed_ships_baked_pipeline():
+    """Test that pipeline objects are baked for the workers, and that duplicate
+    index labels come back in input order."""
+    data = pd.DataFrame(
+        {"text": [f" row {i} " for i in range(6)], "marker": [""] * 6},
+        index=[1, 1, 0, 0, 2, 1],
+    )
+
+    result = run_distributed(
+        data,
+        pipeline=make_pipeline(),
+        llm_provider=make_provider(),
+        n_workers=2,
+        n_partitions=3,
+        key_columns=["text"],
+        timeout=60,
+    )
+
+    assert result.index.tolist() == data.index.tolist()
+    assert result["clean"].tolist() == [f"row {i}" for i in range(6)]
+    assert (result["reply"] == "ok").all()
+
+
+def test_run_distributed_rejects_pipelines_that_cannot_be_baked():
+    suffix = "!"
+    pipeline = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["text"],
+                output_columns=["loud"],
+                function=lambda text: text + suffix,
+            )
+        ]
+    )
+    with pytest.raises(ManifestError, match="module:attribute"):
+        run_distributed(pd.DataFrame({"text": ["a"]}), pipeline)
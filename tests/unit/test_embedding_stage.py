@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.embedding import MockEmbeddingProvider, embedding_matrix
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.embedding_stage import EmbeddingStage
+
+
+@pytest.mark.asyncio
+async def test_embedding_stage_batches_deduplicates_and_caches():
+    """Test that unique texts are embedded in batches and cached per text."""
+    provider = MockEmbeddingProvider(dimensions=4)
+    stage = EmbeddingStage(
+        input_columns=["text"],
+        output_columns=["embedding"],
+        embedding_provider=provider,
+        batch_size=3,
+    )
+    data = pd.DataFrame({"text": ["a", "b", "a", "c", "d", "b", "e"]})
+    cache = InMemoryCache()
+
+    result = await stage.process(data, llm_provider=MockProvider(), cache=cache)
+
+    # 5 unique texts in batches of 3
+    assert provider.requests == 2
+    assert provider.texts_embedded == 5
+    assert stage.get_usage()["duplicates"] == 2
+
+    matrix = embedding_matrix(result["embedding"])
+    assert matrix.shape == (7, 4)
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix[0], matrix[2])
+    np.testing.assert_array_equal(matrix[0], provider._vector("a"))
+    # Every row is a view into one contiguous array
+    first = result["embedding"].iloc[0]
+    assert first.base is not None and first.base.flags.c_contiguous
+    assert all(v.base is first.base for v in result["embedding"])
+
+    more = pd.DataFrame({"text": ["e", "f", "a"]})
+    result = await stage.process(more, llm_provider=MockProvider(), cache=cache)
+    assert provider.texts_embedded == 6
+    assert stage.get_usage()["cache_hits"] == 2
+    np.testing.assert_allclose(
+        embedding_matrix(result["embedding"])[2], matrix[0], rtol=1e-6
+    )
+
+
+@pytest.mark.asyncio
+async def test_embedding_stage_in_pipeline_with_filter():
+    """Test that the run's provider is used and filtered rows have no embedding."""
+    pipeline = Pipeline(
+        [
+            EmbeddingStage(
+                input_columns=["text"],
+                output_columns=["embedding"],
+                filter_colname="keep",
+            )
+        ]
+    )
+    data = pd.DataFrame({"text": ["a", "b", "c"], "keep": [True, False, True]})
+
+    result = await pipeline.run(data, llm_provider=MockEmbeddingProvider())
+
+    matrix = embedding_matrix(result["embedding"])
+    assert result["embedding"].iloc[1] is None
+    assert np.isnan(matrix[1]).all()
+    assert not np.isnan(matrix[[0, 2]]).any()
+
+    with pytest.raises(TypeError):
+        await pipeline.run(data, llm_provider=MockProvider())
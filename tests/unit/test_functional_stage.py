@@ -1,5 +1,7 @@
+import asyncio
 import pytest
 import pandas as pd
+from pipeline_forge.cache import InMemoryCache
 from pipeline_forge.stages.functional_stage import FunctionalStage
 from pipeline_forge.llm.provider import MockProvider
 
@@ -109,3 +111,40 @@ async def test_functional_stage_parametrized(
                 assert pd.isna(result[col][i]), f"Expected None at {col}[{i}]"
             else:
                 assert result[col][i] == expected, f"Mismatch at {col}[{i}]"
+
+
+@pytest.mark.asyncio
+async def test_functional_stage_awaits_coroutines_concurrently():
+    """Test that async functions run concurrently up to max_concurrency and are cached."""
+    in_flight = 0
+    max_in_flight = 0
+    calls = []
+
+    async def lookup(city):
+        nonlocal in_flight, max_in_flight
+        calls.append(city)
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        # Fewer values than output columns are padded with None
+        return (city.upper(),)
+
+    data = pd.DataFrame({"city": [f"city {i}" for i in range(10)]})
+    stage = FunctionalStage(
+        input_columns=["city"],
+        output_columns=["upper", "country"],
+        function=lookup,
+        max_concurrency=3,
+    )
+    cache = InMemoryCache()
+
+    result = await stage.process(data, llm_provider=MockProvider(), cache=cache)
+
+    assert max_in_flight == 3
+    assert result["upper"].tolist() == [f"CITY {i}" for i in range(10)]
+    assert result["country"].tolist() == [None] * 10
+
+    result = await stage.process(data, llm_provider=MockProvider(), cache=cache)
+    assert len(calls) == 10
+    assert result["upper"].tolist() == [f"CITY {i}" for i in range(10)]
@@ -1,6 +1,13 @@
+import asyncio
+import json
+import re
+
 import pandas as pd
 from pipeline_forge.stages.llm_stage import LLMStage
-from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.budget import Budget, use_budget
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.provider import MockProvider, estimate_tokens
+from pipeline_forge.llm.simulated_provider import SimulatedProvider
 import pytest
 
 
@@ -123,3 +130,419 @@ async def test_llm_stage_parametrized(
             assert pd.isna(result[stage_config["output_columns"][0]][i])
         else:
             assert result[stage_config["output_columns"][0]][i] == expected
+
+
+@pytest.mark.asyncio
+async def test_llm_stage_usage_columns_and_totals():
+    """Test that token usage is emitted per row and aggregated per stage."""
+    data = pd.DataFrame({"input_text": ["Hello, world!", "Test message"]})
+    llm_stage = LLMStage(
+        input_columns=["input_text"],
+        conversation_template=[{"role": "user", "content": "{input_text}"}],
+        output_columns=["response"],
+        usage_columns=True,
+    )
+
+    result = await llm_stage.process(data, llm_provider=MockProvider())
+
+    assert result.columns.tolist() == [
+        "input_text",
+        "response",
+        "response_prompt_tokens",
+        "response_completion_tokens",
+        "response_cached_tokens",
+    ]
+    assert result["response_prompt_tokens"].tolist() == [3, 3]
+    assert result["response_completion_tokens"].tolist() == [3, 3]
+
+    usage = llm_stage.get_usage()
+    assert usage["requests"] == 2
+    assert usage["prompt_tokens"] == 6
+    assert usage["total_tokens"] == 12
+    assert usage["saved_tokens"] == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_stage_usage_columns_with_filter():
+    """Test that usage columns receive the fallback value for filtered-out rows."""
+    data = pd.DataFrame({"input_text": ["a", "b"], "process_row": [True, False]})
+    llm_stage = LLMStage(
+        input_columns=["input_text"],
+        conversation_template=[{"role": "user", "content": "{input_text}"}],
+        output_columns=["response"],
+        filter_colname="process_row",
+        usage_columns=True,
+    )
+
+    result = await llm_stage.process(data, llm_provider=MockProvider())
+
+    assert result["response_completion_tokens"][0] == 3
+    assert pd.isna(result["response_completion_tokens"][1])
+
+
+@pytest.mark.asyncio
+async def test_llm_stage_stream_parser_stops_early():
+    """Test that a stream parser cancels the stream once the answer is known."""
+    response = "Let me think. The category is SWE because they write software for IBM"
+    provider = SimulatedProvider(
+        default_response=response, latency="constant", latency_mean=0.001
+    )
+    categories = ["SWE", "scientist", "other"]
+
+    def first_category(text):
+        for word in text.split():
+            if word in categories:
+                return word
+        return None
+
+    llm_stage = LLMStage(
+        input_columns=["input_text"],
+        conversation_template=[{"role": "user", "content": "{input_text}"}],
+        output_columns=["category"],
+        stream_parser=first_category,
+        usage_columns=True,
+    )
+    data = pd.DataFrame({"input_text": ["I make software for IBM", "I code"]})
+
+    result = await llm_stage.process(data, llm_provider=provider)
+
+    assert result["category"].tolist() == ["SWE", "SWE"]
+    # Only the words up to the category (plus the lookahead chunk) were streamed
+    assert provider.chunks_sent < 2 * len(response.split())
+    assert provider.in_flight == 0
+    assert result["category_completion_tokens"].tolist() == [8, 8]
+    stats = llm_stage.get_stream_stats()
+    assert stats["streams"] == 2
+    assert stats["early_stops"] == 2
+    assert 0 < stats["ttft_p50"] <= stats["ttft_p95"]
+
+
+@pytest.mark.asyncio
+async def test_llm_stage_stream_parser_without_early_stop():
+    """Test that an undecided stream yields the full text, and True keeps the prefix."""
+    data = pd.DataFrame({"input_text": ["a"]})
+
+    undecided = LLMStage(
+        input_columns=["input_text"],
+        conversation_template=[{"role": "user", "content": "{input_text}"}],
+        output_columns=["response"],
+        stream_parser=lambda text: None,
+    )
+    result = await undecided.process(data, llm_provider=MockProvider("one two three"))
+    assert result["response"].tolist() == ["one two three"]
+    assert undecided.get_stream_stats()["early_stops"] == 0
+
+    prefix = LLMStage(
+        input_columns=["input_text"],
+        conversation_template=[{"role": "user", "content": "{input_text}"}],
+        output_columns=["response"],
+        stream_parser=lambda text: text.count(" ") >= 2,
+    )
+    result = await prefix.process(data, llm_provider=MockProvider("one two three"))
+    assert result["response"].tolist() == ["one two "]
+
+
+class ScriptedProvider(MockProvider):
+    """Returns the scripted responses in order and records the requests."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def _respond(self, messages):
+        self.requests.append(messages)
+        return self.responses.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_output_schema_fills_several_columns_in_one_request():
+    """Test that a schema'd stage splits one JSON response into its output columns."""
+    provider = MockProvider(
+        map_responses={
+            "great phone": '{"sentiment": "positive", "score": 5}',
+            "broke in a day": '```json\n{"sentiment": "negative", "score": 1}\n```',
+        }
+    )
+    stage = LLMStage(
+        input_columns=["review"],
+        conversation_template=[
+            {"role": "system", "content": "Rate the review."},
+            {"role": "user", "content": "{review}"},
+        ],
+        output_columns=["sentiment", "score"],
+        output_schema=True,
+    )
+    data = pd.DataFrame({"review": ["great phone", "broke in a day"]})
+
+    result = await stage.process(data, provider)
+
+    assert result["sentiment"].tolist() == ["positive", "negative"]
+    assert result["score"].tolist() == [5, 1]
+    assert stage.get_usage()["requests"] == 2
+    assert (
+        '"required": ["sentiment", "score"]'
+        in stage._format_conversation(data.iloc[0])[0]["content"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_output_schema_with_cache():
+    """Test that a schema'd stage caches its split outputs."""
+    provider = MockProvider(default_response='{"sentiment": "positive", "score": 5}')
+    stage = LLMStage(
+        input_columns=["review"],
+        conversation_template=[{"role": "user", "content": "{review}"}],
+        output_columns=["sentiment", "score"],
+        output_schema=True,
+    )
+    data = pd.DataFrame({"review": ["great phone", "great phone"]})
+    cache = InMemoryCache()
+
+    first = await stage.process(data, provider, cache)
+    second = await stage.process(data, provider, cache)
+
+    assert second["sentiment"].tolist() == ["positive", "positive"]
+    assert second["score"].tolist() == first["score"].tolist() == [5, 5]
+    assert stage.get_usage()["requests"] == 1
+    assert stage.get_usage()["cache_hits"] == 3
+
+
+@pytest.mark.asyncio
+async def test_output_schema_reasks_are_bounded():
+    """Test that invalid responses are re-asked with the error, then left None."""
+    schema = {
+        "type": "object",
+        "properties": {"label": {"enum": ["spam", "ham"]}},
+        "required": ["label"],
+    }
+    stage = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "{text}"}],
+        output_columns=["label"],
+        output_schema=schema,
+        max_reasks=1,
+    )
+    provider = ScriptedProvider(['{"label": "eggs"}', '{"label": "spam"}'])
+    result = await stage.process(pd.DataFrame({"text": ["buy now"]}), provider)
+
+    assert result["label"].tolist() == ["spam"]
+    assert "is not one of" in provider.requests[1][-1]["content"]
+    assert provider.requests[1][-2] == {
+        "role": "assistant",
+        "content": '{"label": "eggs"}',
+    }
+
+    provider = ScriptedProvider(["not json", "still not json", "never sent"])
+    result = await stage.process(pd.DataFrame({"text": ["hello"]}), provider)
+
+    assert result["label"].tolist() == [None]
+    assert len(provider.requests) == 2
+    usage = stage.get_usage()
+    assert usage["reasks"] == 2
+    assert usage["parse_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_skips_rows_that_stay_invalid():
+    """Test that rows invalid after every re-ask are cached as failures."""
+    stage = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "{text}"}],
+        output_columns=["label"],
+        output_schema=True,
+        max_reasks=1,
+        negative_cache_ttl=3600,
+    )
+    cache = InMemoryCache()
+    data = pd.DataFrame({"text": ["hello"]})
+    provider = ScriptedProvider(["not json", "still not json", "never sent"])
+    await stage.process(data, provider, cache)
+    result = await stage.process(data, provider, cache)
+
+    assert result["label"].tolist() == [None]
+    assert len(provider.requests) == 2
+    usage = stage.get_usage()
+    assert usage["negative_hits"] == 1
+    assert usage["cache_hits"] == 1
+    assert cache.get_stats()["negative_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_budget_refused_reask_skips_the_row():
+    """Test that a re-ask the budget refuses skips the row instead of failing it."""
+    stage = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "{text}"}],
+        output_columns=["label"],
+        output_schema=True,
+        max_reasks=1,
+        negative_cache_ttl=3600,
+    )
+    cache = InMemoryCache()
+    data = pd.DataFrame({"text": ["hello"]})
+    provider = ScriptedProvider(["not json", '{"label": "greeting"}'])
+    # Room for the first request only
+    budget = Budget(max_tokens=60, completion_estimate=3)
+    with use_budget(budget):
+        result = await stage.process(data, provider, cache)
+
+    assert result["label"].tolist() == [None]
+    assert len(provider.requests) == 1
+    assert budget.get_skipped() == {"LLMStage(label)": [0]}
+    usage = stage.get_usage()
+    assert usage["parse_failures"] == 0
+    assert usage["completion_tokens"] > 0
+    assert cache.get_stats()["size"] == 0
+
+    # With budget to spare, the row is retried rather than served a failure
+    result = await stage.process(data, provider, cache)
+    assert result["label"].tolist() == ["greeting"]
+
+
+class PackAnsweringProvider(MockProvider):
+    """Answers numbered-list requests line by line, or garbles them on demand."""
+
+    def __init__(self, garble_packs=False):
+        super().__init__()
+        self.garble_packs = garble_packs
+        self.requests = []
+
+    def _respond(self, messages):
+        content = messages[-1]["content"]
+        self.requests.append(content)
+        items = re.findall(r"^(\d+)\. (.*)$", content, re.MULTILINE)
+        if not items:
+            return content.upper()
+        if self.garble_packs:
+            return "I can't answer in that format."
+        return "\n".join(f"{i}. {item.upper()}" for i, item in items)
+
+
+@pytest.mark.asyncio
+async def test_llm_stage_packs_rows_and_caches_per_row():
+    """Test that rows are packed into few requests and cached individually."""
+    template = [
+        {"role": "system", "content": "Uppercase the input."},
+        {"role": "user", "content": "{text}"},
+    ]
+    packed = LLMStage(
+        input_columns=["text"],
+        conversation_template=template,
+        output_columns=["upper"],
+        pack_size=2,
+    )
+    data = pd.DataFrame({"text": ["a", "b", "c", "d", "e"]})
+    provider = PackAnsweringProvider()
+    cache = InMemoryCache()
+
+    result = await packed.process(data, provider, cache)
+
+    assert result["upper"].tolist() == ["A", "B", "C", "D", "E"]
+    assert len(provider.requests) == 3
+    usage = packed.get_usage()
+    assert usage["requests"] == 3
+    assert usage["packs"] == 2
+
+    # Per-row cache entries are reused by an unpacked stage
+    single = LLMStage(
+        input_columns=["text"],
+        conversation_template=template,
+        output_columns=["upper"],
+    )
+    result = await single.process(data, provider, cache)
+    assert result["upper"].tolist() == ["A", "B", "C", "D", "E"]
+    assert len(provider.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_llm_stage_packing_falls_back_to_single_rows():
+    """Test that unparseable packs are re-sent row by row, and packs obey the token limit."""
+    stage = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "{text}"}],
+        output_columns=["upper"],
+        pack_size=10,
+        pack_max_tokens=50,
+    )
+    data = pd.DataFrame({"text": ["word " * 60, "x", "y"]})
+    provider = PackAnsweringProvider(garble_packs=True)
+
+    result = await stage.process(data, provider)
+
+    assert result["upper"].tolist()[1:] == ["X", "Y"]
+    # The long row is sent alone; the pack of the short rows fails and is split
+    assert len(provider.requests) == 4
+    usage = stage.get_usage()
+    assert usage["packs"] == 1
+    assert usage["pack_fallbacks"] == 1
+
+
+class PromptCachingProvider(MockProvider):
+    """Reports a prefix as cached once a request with that prefix has completed."""
+
+    def __init__(self):
+        super().__init__()
+        self.cached_prefixes = set()
+        self.cache_hits = 0
+
+    async def generate_response(self, messages, response_format=None):
+        prefix = json.dumps(messages[:-1])
+        cached = prefix in self.cached_prefixes
+        await asyncio.sleep(0.01)
+        response = await super().generate_response(messages)
+        self.cached_prefixes.add(prefix)
+        if cached:
+            self.cache_hits += 1
+            response.usage.cached_tokens = sum(
+                estimate_tokens(m["content"]) for m in messages[:-1]
+            )
+        return response
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prefix_caching", [False, True])
+async def test_llm_stage_prefix_caching_warms_each_prefix(prefix_caching):
+    """Test that grouped dispatch lets requests sharing a prefix hit the prompt cache."""
+    stage = LLMStage(
+        input_columns=["document", "question"],
+        conversation_template=[
+            {"role": "system", "content": "Answer questions about the document."},
+            {"role": "user", "content": "{document}"},
+            {"role": "user", "content": "{question}"},
+        ],
+        output_columns=["answer"],
+        prefix_caching=prefix_caching,
+    )
+    data = pd.DataFrame(
+        {
+            "document": ["a long report " * 20, "a short memo " * 20] * 3,
+            "question": ["who?", "who?", "what?", "what?", "when?", "when?"],
+        }
+    )
+
+    provider = PromptCachingProvider()
+    await stage.process(data, provider)
+
+    usage = stage.get_usage()
+    if prefix_caching:
+        # Only the first request of each of the two documents misses the cache
+        assert provider.cache_hits == 4
+        assert usage["cached_ratio"] > 0.5
+    else:
+        assert provider.cache_hits == 0
+        assert usage["cached_ratio"] == 0.0
+
+
+def test_llm_stage_prefix_caching_rejects_variable_first_templates():
+    """Test that static text after the input columns is reported."""
+    with pytest.raises(ValueError, match="move the static instructions"):
+        LLMStage(
+            input_columns=["text"],
+            conversation_template=[
+                {"role": "user", "content": "{text}"},
+                {"role": "user", "content": "Classify the text above. " * 10},
+            ],
+            output_columns=["label"],
+            prefix_caching=True,
+        )
@@ -0,0 +1,181 @@
+import hashlib
+import json
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.openai_provider import OpenAIProvider
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.llm.simulated_provider import SimulatedProvider
+from pipeline_forge.manifest import (
+    ManifestError,
+    decode_function,
+    encode_function,
+    function_fingerprint,
+    load_provider,
+)
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FilterStage, FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.stages.pipeline_stage import PipelineStage
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def make_pipeline() -> Pipeline:
+    inner = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["summary"],
+                output_columns=["shout"],
+                function=lambda s: str(s).upper(),
+            )
+        ]
+    )
+    return Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["text"], output_columns=["words"], function=word_count
+            ),
+            FilterStage(
+                input_columns=["words"],
+                output_columns=["is_long"],
+                function=lambda n: n > 2,
+            ),
+            LLMStage(
+                input_columns=["text"],
+                conversation_template=[
+                    {"role": "system", "content": "Summarize."},
+                    {"role": "user", "content": "{text}"},
+                ],
+                output_columns=["summary"],
+                filter_colname="is_long",
+            ),
+            PipelineStage(
+                input_columns=["summary"], pipeline=inner, output_columns=["shout"]
+            ),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filename", ["pipeline.yaml", "pipeline.json"])
+async def test_baked_pipeline_round_trip(tmp_path, filename):
+    """Test that a loaded manifest runs like the original pipeline and keeps its plan."""
+    pipeline = make_pipeline()
+    provider = SimulatedProvider(default_response="short", seed=3)
+    path = tmp_path / filename
+    manifest = pipeline.bake(str(path), llm_provider=provider)
+
+    assert manifest["plan"]["order"] == [0, 1, 2, 3]
+    assert manifest["plan"]["dependencies"] == [[], [0], [1], [2]]
+    assert manifest["stages"][0]["config"]["function"] == {
+        "$function": {"import": "test_manifest:word_count"}
+    }
+    assert manifest["stages"][1]["config"]["function"]["$function"]["source"] == (
+        "lambda n: n > 2"
+    )
+
+    loaded = Pipeline.load(str(path))
+    assert loaded.get_plan() == manifest["plan"]
+    loaded_provider = load_provider(str(path))
+    assert loaded_provider.get_config() == provider.get_config()
+
+    data = pd.DataFrame({"text": ["one two three", "one"]})
+    expected = await pipeline.run(data, llm_provider=provider)
+    result = await loaded.run(data, llm_provider=loaded_provider, cache=InMemoryCache())
+    pd.testing.assert_frame_equal(result, expected)
+
+    # Manifests store the cache fingerprints, which loading and re-baking keep
+    assert [s["fingerprint"] for s in manifest["stages"]] == [
+        stage.get_fingerprint() for stage in pipeline.stages
+    ]
+    assert [stage.get_fingerprint() for stage in loaded.stages] == [
+        s["fingerprint"] for s in manifest["stages"]
+    ]
+    rebaked = loaded.bake()
+    assert [s["fingerprint"] for s in rebaked["stages"]] == [
+        s["fingerprint"] for s in manifest["stages"]
+    ]
+
+
+def test_bake_leaves_out_secrets():
+    """Test that provider credentials are not written to the manifest."""
+    provider = OpenAIProvider(
+        api_key="sk-secret", base_url="http://127.0.0.1:1/v1", model="gpt-4o"
+    )
+    manifest = make_pipeline().bake(llm_provider=provider)
+
+    assert "sk-secret" not in json.dumps(manifest)
+    assert manifest["provider"]["config"]["model"] == "gpt-4o"
+    assert manifest["provider"]["config"]["base_url"] == "http://127.0.0.1:1/v1"
+
+
+def test_bake_rejects_closures_and_unknown_versions():
+    """Test that closures cannot be baked and newer manifests are refused."""
+    threshold = 3
+    pipeline = Pipeline(
+        [
+            FilterStage(
+                input_columns=["n"],
+                output_columns=["big"],
+                function=lambda n: n > threshold,
+            )
+        ]
+    )
+    with pytest.raises(ManifestError, match="local variables"):
+        pipeline.bake()
+
+    manifest = make_pipeline().bake()
+    manifest["version"] = 99
+    with pytest.raises(ManifestError, match="Unsupported manifest version"):
+        Pipeline.load(manifest)
+
+
+def test_functions_round_trip_with_module_calls_and_helpers():
+    """Test lambdas calling imported modules, and local functions with helpers."""
+    lam = lambda value: json.dumps(value)
+    assert decode_function(encode_function(lam))([1]) == "[1]"
+
+    def scale(value):
+        return value * 10
+
+    ref = encode_function(scale)
+    ref["source"] = "def helper(value):\n    return value * 10\n\n" + (
+        "def scale(value):\n    return helper(value)\n"
+    )
+    ref["sha256"] = hashlib.sha256(ref["source"].encode()).hexdigest()
+    assert decode_function(ref)(2) == 20
+
+    ref["name"] = "missing"
+    with pytest.raises(ManifestError, match="does not define missing"):
+        decode_function(ref)
+
+
+@pytest.mark.asyncio
+async def test_function_fingerprints_cover_captured_values_and_bytecode():
+    """Test that closures over different values and sourceless functions differ."""
+
+    def make(k):
+        return FunctionalStage(
+            input_columns=["a"], output_columns=["b"], function=lambda a: a + k
+        )
+
+    one, hundred = make(1), make(100)
+    assert one.get_fingerprint() != hundred.get_fingerprint()
+    assert make(1).get_fingerprint() == one.get_fingerprint()
+
+    cache = InMemoryCache()
+    data = pd.DataFrame({"a": [1]})
+    provider = MockProvider()
+    assert (await one.process(data, provider, cache))["b"].tolist() == [2]
+    assert (await hundred.process(data, provider, cache))["b"].tolist() == [101]
+
+    namespace = {}
+    exec("plus_one = lambda a: a + 1\nplus_two = lambda a: a + 2", namespace)
+    assert function_fingerprint(namespace["plus_one"]) != function_fingerprint(
+        namespace["plus_two"]
+    )
@@ -0,0 +1,194 @@
+import asyncio
+import gc
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pipeline_forge.llm import openai_provider
+from pipeline_forge.llm.openai_provider import (
+    HTTPPoolConfig,
+    OpenAIEmbeddingProvider,
+    OpenAIProvider,
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible chat completions endpoint with keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.auth_headers.add(self.headers["Authorization"])
+        content = "echo: " + body["messages"][-1]["content"]
+        if body.get("stream"):
+            self._stream(body, content)
+            return
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 10,
+                    "completion_tokens": 3,
+                    "total_tokens": 13,
+                    "prompt_tokens_details": {"cached_tokens": 4},
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, content):
+        """Send the content word by word as server-sent events, then a usage chunk."""
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        base = {"id": "chatcmpl-test", "object": "chat.completion.chunk"}
+        base.update(created=0, model=body["model"])
+        words = [word + " " for word in content.split()]
+        for i, word in enumerate(words):
+            finish_reason = "stop" if i == len(words) - 1 else None
+            delta = {"index": 0, "delta": {"content": word}}
+            delta["finish_reason"] = finish_reason
+            chunk = dict(base, choices=[delta])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        usage = {"prompt_tokens": 10, "completion_tokens": len(words)}
+        usage["total_tokens"] = 10 + len(words)
+        chunk = dict(base, choices=[], usage=usage)
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.auth_headers = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_providers_share_a_bounded_connection_pool(fake_openai_server):
+    """Test that providers with the same endpoint and key reuse one connection pool."""
+    server, base_url = fake_openai_server
+    pool_config = HTTPPoolConfig(max_connections=2, max_keepalive_connections=2)
+
+    async with OpenAIProvider(
+        api_key="key-a", base_url=base_url, pool_config=pool_config, temperature=0.0
+    ) as cold, OpenAIProvider(
+        api_key="key-a", base_url=base_url, pool_config=pool_config, temperature=1.0
+    ) as hot:
+        assert cold.client is hot.client
+        assert cold.get_provider_id() != hot.get_provider_id()
+
+        messages = [{"role": "user", "content": "hi"}]
+        responses = await asyncio.gather(
+            *[p.generate_response(messages) for p in [cold, hot] * 10]
+        )
+
+    assert server.requests == 20
+    assert server.connections <= 2
+    assert responses[0].text == "echo: hi"
+    assert responses[0].usage.prompt_tokens == 10
+    assert responses[0].usage.cached_tokens == 4
+    assert responses[0].finish_reason == "stop"
+    assert responses[0].model == "gpt-4o-mini"
+
+
+@pytest.mark.asyncio
+async def test_shared_client_lifecycle(fake_openai_server):
+    """Test that a shared client is closed only after its last provider is closed."""
+    server, base_url = fake_openai_server
+    first = OpenAIProvider(api_key="key-a", base_url=base_url)
+    second = OpenAIProvider(api_key="key-a", base_url=base_url)
+    other_key = OpenAIProvider(api_key="key-b", base_url=base_url)
+    unshared = OpenAIProvider(api_key="key-a", base_url=base_url, share_client=False)
+
+    assert first.client is second.client
+    assert other_key.client is not first.client
+    assert unshared.client is not first.client
+
+    await first.aclose()
+    await first.aclose()  # closing twice is harmless
+    assert not second.client.is_closed()
+    assert await second.generate([{"role": "user", "content": "x"}]) == "echo: x"
+
+    client = second.client
+    await second.aclose()
+    assert client.is_closed()
+    await other_key.aclose()
+    await unshared.aclose()
+    assert unshared.client.is_closed()
+    assert all(key[3] != base_url for key in openai_provider._shared_clients)
+    assert server.auth_headers == {"Bearer key-a"}
+
+
+def test_shared_clients_are_per_event_loop_and_released(fake_openai_server):
+    """Test that each event loop gets its own client, that embedding providers
+    share it, and that dropped providers release their registry entries."""
+    _, base_url = fake_openai_server
+    provider = OpenAIProvider(api_key="key-c", base_url=base_url)
+    embedder = OpenAIEmbeddingProvider(api_key="key-c", base_url=base_url)
+
+    async def run():
+        assert embedder.client is provider.client
+        await provider.generate([{"role": "user", "content": "x"}])
+        return provider.client
+
+    first = asyncio.run(run())
+    second = asyncio.run(run())
+    assert first is not second
+
+    del provider, embedder, first, second
+    gc.collect()
+    assert all(key[3] != base_url for key in openai_provider._shared_clients)
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_deltas_and_usage(fake_openai_server):
+    """Test that streamed chunks carry text deltas and the final usage."""
+    _, base_url = fake_openai_server
+    async with OpenAIProvider(api_key="key-a", base_url=base_url) as provider:
+        chunks = [
+            chunk
+            async for chunk in provider.stream(
+                [{"role": "user", "content": "one two three"}]
+            )
+        ]
+
+    assert "".join(chunk.text for chunk in chunks) == "echo: one two three "
+    assert chunks[-2].finish_reason == "stop"
+    assert chunks[-1].usage.completion_tokens == 4
@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.optimizer import estimate_stages, optimize
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FilterStage, FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+def make_pipeline():
+    """An expensive LLM stage listed before the cheap filter gating its consumer."""
+    summarize = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "Summarize {text}"}],
+        output_columns=["summary"],
+    )
+    is_long = FilterStage(
+        input_columns=["text"],
+        output_columns=["is_long"],
+        function=lambda text: len(text) > 10,
+    )
+    shout = FunctionalStage(
+        input_columns=["summary"],
+        output_columns=["shouted"],
+        function=lambda summary: summary.upper(),
+        filter_colname="is_long",
+        filter_fallback_value="",
+    )
+    return Pipeline([summarize, is_long, shout]), summarize
+
+
+def make_data() -> pd.DataFrame:
+    return pd.DataFrame({"text": ["short", "a much longer text", "tiny", "x" * 20]})
+
+
+@pytest.mark.asyncio
+async def test_filter_moves_first_and_mask_is_pushed():
+    """Test that the filter runs first and gates the LLM stage feeding its consumer."""
+    pipeline, _ = make_pipeline()
+    optimized = await pipeline.optimize(push_masks=True)
+
+    assert [s.get_name() for s in optimized.stages] == [
+        pipeline.stages[1].get_name(),
+        pipeline.stages[0].get_name(),
+        pipeline.stages[2].get_name(),
+    ]
+    assert optimized.stages[1].filter_colname == "is_long"
+    # The original stages are left untouched
+    assert pipeline.stages[0].filter_colname is None
+
+    summarize = optimized.stages[1]
+    result = await optimized.run(make_data(), llm_provider=MockProvider("ok"))
+    assert summarize.get_usage()["requests"] == 2
+    assert list(result["shouted"]) == ["", "OK", "", "OK"]
+    # The upstream column now holds the fallback value for the excluded rows
+    assert list(result["summary"]) == ["", "ok", "", "ok"]
+
+
+@pytest.mark.asyncio
+async def test_optimize_keeps_outputs_by_default():
+    """Test that reordering without mask push-down leaves every column unchanged."""
+    pipeline, _ = make_pipeline()
+    optimized = await pipeline.optimize()
+
+    assert optimized.stages[0].get_name() == pipeline.stages[1].get_name()
+    assert optimized.stages[1].filter_colname is None
+    expected = await pipeline.run(make_data(), llm_provider=MockProvider("ok"))
+    result = await optimized.run(make_data(), llm_provider=MockProvider("ok"))
+    pd.testing.assert_frame_equal(result[expected.columns], expected)
+
+
+@pytest.mark.asyncio
+async def test_keep_columns_prevents_push_down():
+    """Test that stages producing kept columns still run on every row."""
+    pipeline, _ = make_pipeline()
+    optimized = await pipeline.optimize(push_masks=True, keep_columns=["summary"])
+
+    assert optimized.stages[0].get_name() == pipeline.stages[1].get_name()
+    assert optimized.stages[1] is pipeline.stages[0]
+    result = await optimized.run(make_data(), llm_provider=MockProvider("ok"))
+    assert list(result["summary"]) == ["ok"] * 4
+    assert list(result["shouted"]) == ["", "OK", "", "OK"]
+
+
+@pytest.mark.asyncio
+async def test_estimates_are_measured_on_a_sample():
+    """Test that selectivity and tokens come from running the sample."""
+    pipeline, summarize = make_pipeline()
+    estimates = await estimate_stages(
+        pipeline, make_data(), llm_provider=MockProvider("ok")
+    )
+
+    by_name = {estimate.name: estimate for estimate in estimates}
+    assert by_name[pipeline.stages[1].get_name()].selectivity == {"is_long": 0.5}
+    assert by_name[summarize.get_name()].tokens_per_row > 0
+    assert all(estimate.measured for estimate in estimates)
+
+    optimized = optimize(pipeline, estimates, push_masks=False)
+    assert optimized.stages[0].get_name() == pipeline.stages[1].get_name()
+    assert optimized.stages[1].filter_colname is None
+
+    explanation = optimized.explain()
+    assert "is_long=0.50" in explanation
+    assert "*" not in explanation
+    # Reordering alone does not change which rows each stage processes
+    plan = optimized.optimization
+    assert plan.cost_after == pytest.approx(plan.cost_before)
+    assert "projected cost/row" in explanation
+
+    pushed = optimize(pipeline, estimates, push_masks=True).optimization
+    assert pushed.cost_after[1] < pushed.cost_before[1]
+
+
+def test_explain_without_optimization_lists_the_plan():
+    pipeline, _ = make_pipeline()
+    lines = pipeline.explain().splitlines()
+    assert len(lines) == 3
+    assert lines[0].split()[0] == "0"
@@ -0,0 +1,32 @@
+import pytest
+
+from pipeline_forge.llm.provider import Usage
+from pipeline_forge.packing import (
+    PackParseError,
+    format_packed_items,
+    parse_packed_response,
+    split_usage,
+)
+
+
+def test_packed_items_round_trip():
+    """Test that a numbered answer (with a continuation line) splits per item."""
+    prompt = format_packed_items(["first", "second"])
+    assert prompt.endswith("1. first\n2. second")
+
+    answers = parse_packed_response("1) yes\n2. no,\nbecause 3. reasons", 2)
+    assert answers == ["yes", "no,\nbecause 3. reasons"]
+
+
+@pytest.mark.parametrize("text", ["1. a", "1. a\n3. c", "Sure!\n1. a\n2. b"])
+def test_parse_packed_response_rejects_mismatches(text):
+    """Test that missing, skipped or preceded answers raise PackParseError."""
+    with pytest.raises(PackParseError):
+        parse_packed_response(text, 2)
+
+
+def test_split_usage_preserves_totals():
+    """Test that a pack's usage is split across rows without losing tokens."""
+    shares = split_usage(Usage(10, 5, 3), 3)
+    assert [u.prompt_tokens for u in shares] == [4, 3, 3]
+    assert sum(shares, Usage()) == Usage(10, 5, 3)
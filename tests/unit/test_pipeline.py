@@ -5,6 +5,7 @@ from pipeline_forge.pipeline import Pipeline
 from pipeline_forge.stages.functional_stage import FunctionalStage
 from pipeline_forge.stages.llm_stage import LLMStage
 from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm import provider as llm_provider
 from pipeline_forge.llm.provider import MockProvider
 from pipeline_forge.stages.pipeline_stage import PipelineStage
 
@@ -26,7 +27,7 @@ async def test_dependency_resolution():
     # Create stages with dependencies:
     # input_value -> A -> B -> C
     #             -> D
-    # input_value -> filter_flag 
+    # input_value -> filter_flag
     # filter_flag + B -> E
 
     stage_a = FunctionalStage(
@@ -118,3 +119,62 @@ async def test_dependency_resolution():
         121,
         None,
     ]  # B^2 where filter_flag is True
+
+
+@pytest.mark.asyncio
+async def test_run_stage_only_computes_demanded_rows():
+    """Test that upstream stages only feeding a filtered stage skip filtered-out rows."""
+    data = pd.DataFrame({"text": ["short", "a much longer line", "tiny", "x" * 20]})
+    summarize = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "Summarize {text}"}],
+        output_columns=["summary"],
+    )
+    has_x = FunctionalStage(
+        input_columns=["text"],
+        function=lambda text: "x" in text,
+        output_columns=["has_x"],
+    )
+    # Filtered itself, so its input is only needed where both filters hold
+    details = LLMStage(
+        input_columns=["summary"],
+        conversation_template=[{"role": "user", "content": "Detail {summary}"}],
+        output_columns=["details"],
+        filter_colname="has_x",
+        filter_fallback_value="none",
+    )
+    is_long = FunctionalStage(
+        input_columns=["text"],
+        function=lambda text: len(text) > 10,
+        output_columns=["is_long"],
+    )
+    target = FunctionalStage(
+        input_columns=["details"],
+        function=lambda details: details.upper(),
+        output_columns=["shouted"],
+        filter_colname="is_long",
+        filter_fallback_value="",
+    )
+    pipeline = Pipeline([summarize, has_x, details, is_long, target])
+
+    result = await pipeline.run_stage(
+        target, data, llm_provider=llm_provider.MockProvider("ok")
+    )
+
+    assert summarize.get_usage()["requests"] == 1
+    assert details.get_usage()["requests"] == 1
+    assert result["summary"].tolist() == [None, None, None, "ok"]
+    assert result["shouted"].tolist() == ["", "NONE", "", "OK"]
+    assert result["is_long"].tolist() == [False, True, False, True]
+
+    # A stage whose output is also used elsewhere still runs on every row
+    other = FunctionalStage(
+        input_columns=["summary"],
+        function=lambda summary: len(summary),
+        output_columns=["summary_length"],
+    )
+    pipeline = Pipeline([summarize, has_x, details, is_long, target, other])
+    result = await pipeline.run_stage(
+        target, data, llm_provider=llm_provider.MockProvider("ok")
+    )
+    assert result["summary"].tolist() == ["ok"] * 4
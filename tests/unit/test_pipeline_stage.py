@@ -5,6 +5,7 @@ from pipeline_forge.stages.functional_stage import FunctionalStage
 from pipeline_forge.stages.llm_stage import LLMStage
 from pipeline_forge.pipeline import Pipeline
 from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.cache import InMemoryCache
 
 
 @pytest.mark.asyncio
@@ -210,3 +211,121 @@ async def test_pipeline_stage_parametrized(
                 assert pd.isna(result[col][i]), f"Expected None at {col}[{i}]"
             else:
                 assert result[col][i] == expected, f"Mismatch at {col}[{i}]"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stage_caches_nested_results_and_exposes_intermediates():
+    """Test that repeated nested inputs are served in one lookup per row."""
+    calls = []
+
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    inner = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["value"], output_columns=["doubled"], function=double
+            ),
+            LLMStage(
+                input_columns=["doubled"],
+                conversation_template=[{"role": "user", "content": "{doubled}"}],
+                output_columns=["reply"],
+            ),
+        ]
+    )
+    stage = PipelineStage(
+        input_columns=["value"],
+        pipeline=inner,
+        output_columns=["reply"],
+        expose_columns=["doubled"],
+    )
+    provider = MockProvider(map_responses={"2": "two", "4": "four"})
+    cache = InMemoryCache()
+    data = pd.DataFrame({"value": [1, 2], "other": ["a", "b"]})
+
+    first = await stage.process(data, provider, cache)
+    assert first["reply"].tolist() == ["two", "four"]
+    assert first["doubled"].tolist() == [2, 4]
+    assert first["other"].tolist() == ["a", "b"]
+
+    hits_before = cache.get_stats()["hits"]
+    second = await stage.process(pd.DataFrame({"value": [2, 1, 3]}), provider, cache)
+    assert second["reply"].tolist() == ["four", "two", "Mock response"]
+    assert second["doubled"].tolist() == [4, 2, 6]
+    # Two whole-pipeline hits, then one miss run through the nested stages
+    assert cache.get_stats()["hits"] - hits_before == 2
+    assert calls == [1, 2, 3]
+
+    # A different nested pipeline does not reuse the entries
+    other = PipelineStage(
+        input_columns=["value"],
+        pipeline=Pipeline(
+            [
+                FunctionalStage(
+                    input_columns=["value"],
+                    output_columns=["reply"],
+                    function=lambda x: str(x),
+                )
+            ]
+        ),
+        output_columns=["reply"],
+    )
+    result = await other.process(pd.DataFrame({"value": [1]}), provider, cache)
+    assert result["reply"].tolist() == ["1"]
+
+
+def test_fingerprints_are_memoized_until_the_config_changes(monkeypatch):
+    from pipeline_forge import manifest
+
+    hashed = []
+    stage_fingerprint = manifest.stage_fingerprint
+    monkeypatch.setattr(
+        manifest,
+        "stage_fingerprint",
+        lambda *args: hashed.append(args[0]) or stage_fingerprint(*args),
+    )
+    nested = LLMStage(
+        input_columns=["value"],
+        conversation_template=[{"role": "user", "content": "{value}"}],
+        output_columns=["reply"],
+    )
+    stage = PipelineStage(
+        input_columns=["value"], pipeline=Pipeline([nested]), output_columns=["reply"]
+    )
+
+    fingerprint = stage.get_fingerprint()
+    assert stage.get_fingerprint() == fingerprint
+    assert len(hashed) == 2
+
+    # Editing a nested stage changes both fingerprints
+    nested.conversation_template = [{"role": "user", "content": "Say {value}"}]
+    assert stage.get_fingerprint() != fingerprint
+    assert len(hashed) == 4
+    fingerprint = stage.get_fingerprint()
+
+    stage.filter_colname = "keep"
+    assert stage.get_fingerprint() != fingerprint
+    assert len(hashed) == 5
+
+
+@pytest.mark.asyncio
+async def test_stages_wrapping_one_pipeline_keep_their_own_cached_columns():
+    inner = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["a"], output_columns=["b"], function=lambda a: a * 2
+            ),
+            FunctionalStage(
+                input_columns=["b"], output_columns=["c"], function=lambda b: b + 2
+            ),
+        ]
+    )
+    cache = InMemoryCache()
+    data = pd.DataFrame({"a": [1, 2]})
+
+    first = await PipelineStage(["a"], inner, ["b"]).process(data, None, cache)
+    second = await PipelineStage(["a"], inner, ["c"]).process(data, None, cache)
+
+    assert first["b"].tolist() == [2, 4]
+    assert second["c"].tolist() == [4, 6]
@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from pipeline_forge.llm.openai_provider import OpenAIProvider
+from pipeline_forge.llm.pooled_provider import (
+    NoHealthyBackendError,
+    PooledProvider,
+    is_transient_error,
+)
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.llm.simulated_provider import (
+    SimulatedProvider,
+    SimulatedProviderError,
+    SimulatedRateLimitError,
+)
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.mark.asyncio
+async def test_least_in_flight_spreads_concurrent_requests():
+    """Test that concurrent requests are spread evenly over equal backends."""
+    backends = [
+        SimulatedProvider(latency="constant", latency_mean=0.01) for _ in range(3)
+    ]
+    pool = PooledProvider(backends, routing="least_in_flight")
+
+    await asyncio.gather(*[pool.generate(MESSAGES) for _ in range(30)])
+
+    assert [backend.calls for backend in backends] == [10, 10, 10]
+    assert all(backend.max_in_flight == 10 for backend in backends)
+
+
+@pytest.mark.asyncio
+async def test_weighted_routing_follows_weights():
+    """Test that weighted routing sends traffic in proportion to the weights."""
+    backends = [SimulatedProvider(), SimulatedProvider()]
+    pool = PooledProvider(backends, weights=[9, 1], routing="weighted", seed=0)
+
+    for _ in range(200):
+        await pool.generate(MESSAGES)
+
+    assert backends[0].calls > 5 * backends[1].calls
+
+
+@pytest.mark.asyncio
+async def test_latency_routing_prefers_fast_backend():
+    """Test that latency-aware routing converges on the faster backend."""
+    slow = SimulatedProvider(latency="constant", latency_mean=0.02)
+    fast = SimulatedProvider(latency="constant", latency_mean=0.001)
+    pool = PooledProvider([slow, fast], routing="latency")
+
+    for _ in range(10):
+        await pool.generate(MESSAGES)
+
+    assert slow.calls == 1
+    assert fast.calls == 9
+
+
+@pytest.mark.asyncio
+async def test_failover_and_circuit_breaker():
+    """Test that failures fail over and eventually open the failing backend's circuit."""
+    broken = SimulatedProvider(error_rate=1.0)
+    healthy = SimulatedProvider(default_response="ok")
+    pool = PooledProvider(
+        [broken, healthy],
+        routing="latency",
+        failure_threshold=2,
+        recovery_timeout=0.05,
+    )
+
+    # The broken backend is tried first (no latency yet), then fails over
+    assert await pool.generate(MESSAGES) == "ok"
+    assert await pool.generate(MESSAGES) == "ok"
+    assert pool.get_stats()[0]["state"] == "open"
+
+    for _ in range(5):
+        assert await pool.generate(MESSAGES) == "ok"
+    assert broken.calls == 2
+
+    # After the recovery timeout, one trial request is let through and fails again
+    time.sleep(0.06)
+    assert pool.get_stats()[0]["state"] == "half_open"
+    assert await pool.generate(MESSAGES) == "ok"
+    assert broken.calls == 3
+    assert pool.get_stats()[0]["state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_all_backends_failing_raises():
+    pool = PooledProvider([SimulatedProvider(error_rate=1.0) for _ in range(2)])
+    with pytest.raises(NoHealthyBackendError):
+        await pool.generate(MESSAGES)
+
+
+def test_provider_id_is_stable_for_equivalent_backends():
+    """Test that backends differing only by credentials share a cache identity."""
+    single = OpenAIProvider(api_key="key-a", model="gpt-4o-mini", temperature=0.0)
+    pool = PooledProvider(
+        [
+            OpenAIProvider(api_key="key-a", model="gpt-4o-mini", temperature=0.0),
+            OpenAIProvider(
+                api_key="key-b",
+                base_url="http://localhost:1/v1",
+                model="gpt-4o-mini",
+                temperature=0.0,
+            ),
+        ]
+    )
+    assert pool.get_provider_id() == single.get_provider_id()
+
+    mixed = PooledProvider([MockProvider("a"), MockProvider("b")])
+    reordered = PooledProvider([MockProvider("b"), MockProvider("a")])
+    assert mixed.get_provider_id() == reordered.get_provider_id()
+    assert mixed.get_provider_id() != MockProvider("a").get_provider_id()
+
+
+@pytest.mark.asyncio
+async def test_streaming_fails_over_and_stops_early():
+    """Test that streams fail over before the first chunk and close the backend early."""
+    broken = SimulatedProvider(error_rate=1.0)
+    healthy = SimulatedProvider(default_response="one two three four")
+    pool = PooledProvider([broken, healthy], routing="latency", failure_threshold=1)
+
+    stream = pool.stream(MESSAGES)
+    received = []
+    async for chunk in stream:
+        received.append(chunk.text)
+        if len(received) == 2:
+            break
+    await stream.aclose()
+
+    assert received == ["one ", "two "]
+    assert broken.calls == 1
+    assert healthy.chunks_sent == 2
+    assert [stats["state"] for stats in pool.get_stats()] == ["open", "closed"]
+    assert [stats["in_flight"] for stats in pool.get_stats()] == [0, 0]
+
+
+class RejectingProvider(MockProvider):
+    """Raises a non-retriable 400 error on every request."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def generate_response(self, messages, response_format=None):
+        self.calls += 1
+        request = httpx.Request("POST", "http://localhost/v1/chat/completions")
+        raise openai.BadRequestError(
+            "bad request", response=httpx.Response(400, request=request), body=None
+        )
+
+
+@pytest.mark.asyncio
+async def test_non_transient_errors_neither_fail_over_nor_open_circuits():
+    """Test that a bad request is raised as is, without trying other backends."""
+    rejecting = RejectingProvider()
+    healthy = MockProvider("ok")
+    pool = PooledProvider([rejecting, healthy], routing="latency", failure_threshold=1)
+
+    with pytest.raises(openai.BadRequestError):
+        await pool.generate(MESSAGES)
+    assert rejecting.calls == 1
+    assert pool.get_stats()[0]["state"] == "closed"
+    assert pool.get_stats()[0]["failures"] == 0
+
+
+def test_is_transient_error():
+    request = httpx.Request("POST", "http://localhost/v1/chat/completions")
+
+    def status_error(status):
+        return openai.APIStatusError(
+            "error", response=httpx.Response(status, request=request), body=None
+        )
+
+    assert is_transient_error(status_error(429))
+    assert is_transient_error(status_error(503))
+    assert is_transient_error(openai.APITimeoutError(request=request))
+    assert is_transient_error(asyncio.TimeoutError())
+    assert is_transient_error(SimulatedProviderError())
+    assert is_transient_error(SimulatedRateLimitError())
+    assert not is_transient_error(status_error(400))
+    assert not is_transient_error(status_error(401))
+    assert not is_transient_error(ValueError("bad input"))
@@ -0,0 +1,139 @@
+import io
+import logging
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.progress import (
+    LogRenderer,
+    ProgressReporter,
+    TerminalRenderer,
+)
+from pipeline_forge.stages.functional_stage import FilterStage, FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.stages.pipeline_stage import PipelineStage
+
+
+def make_pipeline() -> Pipeline:
+    inner = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["reply"],
+                output_columns=["shout"],
+                function=lambda reply: reply.upper(),
+            )
+        ]
+    )
+    return Pipeline(
+        [
+            FilterStage(
+                input_columns=["text"],
+                output_columns=["keep"],
+                function=lambda text: text != "skip",
+            ),
+            LLMStage(
+                input_columns=["text"],
+                conversation_template=[{"role": "user", "content": "{text}"}],
+                output_columns=["reply"],
+                filter_colname="keep",
+                filter_fallback_value="",
+            ),
+            PipelineStage(
+                input_columns=["reply"], pipeline=inner, output_columns=["shout"]
+            ),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_progress_counts_rows_per_stage():
+    """Test that every stage, including nested ones, reports its counters."""
+    snapshots = []
+    progress = ProgressReporter([snapshots.append], interval=0)
+    data = pd.DataFrame({"text": ["a", "b", "a", "skip"]})
+    cache = InMemoryCache()
+
+    await make_pipeline().run(
+        data, llm_provider=MockProvider("hi"), cache=cache, progress=progress
+    )
+
+    final = snapshots[-1]
+    assert final.final
+    stages = {stage.name: stage for stage in final.stages}
+    assert list(stages) == [
+        "FilterStage(keep)",
+        "LLMStage(reply)",
+        "PipelineStage(shout)",
+        "PipelineStage(shout)/FunctionalStage(shout)",
+    ]
+    llm = stages["LLMStage(reply)"]
+    assert (llm.total, llm.filtered, llm.completed) == (4, 1, 3)
+    assert llm.tokens > 0
+    assert stages["FilterStage(keep)"].cached == 1
+    # The nested stage sees the three "hi" replies and the filtered row's ""
+    nested = stages["PipelineStage(shout)/FunctionalStage(shout)"]
+    assert (nested.completed, nested.cached) == (4, 2)
+    assert all(stage.eta == 0.0 for stage in final.stages)
+    # Snapshots are copies taken while the run progressed
+    assert any(
+        s.name == "LLMStage(reply)" and s.completed < 3
+        for snapshot in snapshots[:-1]
+        for s in snapshot.stages
+    )
+
+
+@pytest.mark.asyncio
+async def test_progress_renderers(caplog):
+    """Test that the terminal and log renderers draw one line per stage."""
+    stream = io.StringIO()
+    progress = ProgressReporter(
+        [TerminalRenderer(stream), LogRenderer()], interval=3600
+    )
+    data = pd.DataFrame({"text": ["a", "b"]})
+
+    with caplog.at_level(logging.INFO, logger="pipeline_forge.progress"):
+        await make_pipeline().run(
+            data, llm_provider=MockProvider("hi"), progress=progress
+        )
+
+    assert (
+        "LLMStage(reply): 2/2 rows (0 cached, 0 failed, 0 filtered)"
+        in stream.getvalue()
+    )
+    assert "\x1b[" in stream.getvalue()
+    assert any("ETA 0s" in record.message for record in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_progress_is_throttled_across_batches():
+    """Test that a stage run once per batch only forces a snapshot at its end."""
+    snapshots = []
+    progress = ProgressReporter([snapshots.append], interval=3600)
+    pipeline = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["text"],
+                output_columns=["upper"],
+                function=lambda text: text.upper(),
+            ),
+            FunctionalStage(
+                input_columns=["upper"],
+                output_columns=["length"],
+                function=len,
+            ),
+        ]
+    )
+    data = pd.DataFrame({"text": [f"row {i}" for i in range(20)]})
+
+    await pipeline.run_dataflow(data, progress=progress, batch_size=1)
+
+    # The first row's, one per stage's last batch and the final one on close
+    assert len(snapshots) == 4
+    assert snapshots[-1].final
+    assert all(
+        (stage.total, stage.completed, stage.eta) == (20, 20, 0.0)
+        for stage in snapshots[-1].stages
+    )
@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.sampling import ProgressiveRunner, hash_sample
+from pipeline_forge.stages.functional_stage import FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+def make_data(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "text": [f"item {i}" for i in range(rows)],
+            "group": ["a" if i % 4 else "b" for i in range(rows)],
+        }
+    )
+
+
+def test_hash_sample_is_nested_and_stratified():
+    """Test that samples are deterministic, nested and keep stratum proportions."""
+    data = make_data(1000)
+
+    small = hash_sample(data, 40, key_columns=["text"])
+    large = hash_sample(data, 200, key_columns=["text"])
+    assert small.index.equals(hash_sample(data, 40, key_columns=["text"]).index)
+    assert set(small.index) <= set(large.index)
+    assert not set(small.index) <= set(hash_sample(data, 200, seed=1).index)
+
+    stratified = hash_sample(data, 100, key_columns=["text"], stratify_by="group")
+    assert len(stratified) == 100
+    assert (stratified["group"] == "b").sum() == 25
+
+
+@pytest.mark.asyncio
+async def test_progressive_runner_reuses_cache_and_projects_cost():
+    """Test that each step only pays for new rows and the projection scales them."""
+    llm_stage = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "{text}"}],
+        output_columns=["label"],
+    )
+    pipeline = Pipeline(
+        [
+            llm_stage,
+            FunctionalStage(
+                input_columns=["label"],
+                output_columns=["label_length"],
+                function=lambda label: len(label),
+            ),
+        ]
+    )
+    runner = ProgressiveRunner(
+        pipeline,
+        llm_provider=MockProvider(default_response="positive"),
+        sizes=[10, 50, 200],
+        key_columns=["text"],
+        watch_columns=["label"],
+        prompt_price=1.0,
+        completion_price=2.0,
+    )
+
+    reports = await runner.run(make_data(1000))
+
+    assert [r.rows for r in reports] == [10, 50, 200]
+    assert [r.new_rows for r in reports] == [10, 40, 150]
+    assert llm_stage.get_usage()["requests"] == 200
+    assert llm_stage.get_usage()["cache_hits"] == 60
+    # Each step projects the full run from the requests made for its new rows
+    for report in reports:
+        assert report.usage.completion_tokens == 2 * report.new_rows
+        assert report.projected_usage.completion_tokens == 2 * 1000
+    assert reports[2].projected_cost == pytest.approx(
+        (reports[2].projected_usage.prompt_tokens + 2 * 2000) / 1e6
+    )
+    assert reports[2].distributions["label"] == {"positive": 1.0}
+    assert reports[2].drift["label"] == 0.0
+    assert len(runner.result) == 200
+
+
+@pytest.mark.asyncio
+async def test_progressive_runner_stops_once_stable():
+    """Test that growth stops once the watched distribution stops moving."""
+    pipeline = Pipeline(
+        [
+            FunctionalStage(
+                input_columns=["group"],
+                output_columns=["is_b"],
+                function=lambda group: group == "b",
+            )
+        ]
+    )
+    runner = ProgressiveRunner(
+        pipeline,
+        sizes=[100, 400, 1000],
+        stratify_by="group",
+        watch_columns=["is_b"],
+        stable_drift=0.01,
+    )
+
+    reports = await runner.run(make_data(2000))
+
+    assert [r.rows for r in reports] == [100, 400]
+    assert reports[1].drift["is_b"] == pytest.approx(0.0)
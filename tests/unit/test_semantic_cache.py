@@ -0,0 +1,149 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.embedding import EmbeddingProvider
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.semantic_cache import ExactIndex, SemanticCache, normalize_text
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+class BagOfWordsEmbedder(EmbeddingProvider):
+    """Embeds texts as hashed word counts, so shared words mean similar vectors."""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def embed(self, texts):
+        self.requests += 1
+        matrix = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.split():
+                matrix[i, zlib.crc32(word.encode()) % 64] += 1
+        return matrix
+
+
+class CountingProvider(MockProvider):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def _respond(self, messages):
+        self.requests.append(messages[-1]["content"])
+        return f"answer to {messages[-1]['content']}"
+
+
+def test_normalize_text_and_exact_index():
+    assert normalize_text("  Great\n PHONE! ") == "great phone"
+    assert normalize_text(3) == 3
+
+    index = ExactIndex()
+    vectors = np.eye(4, dtype=np.float32)
+    for i in range(100):
+        index.add(vectors[[i % 4]], [f"key {i}"])
+    similarities, keys = index.search(np.array([[0, 1, 0, 0]], dtype=np.float32))
+    assert len(index) == 100
+    assert similarities[0] == 1.0
+    assert keys == ["key 1"]
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_rows_reuse_cached_responses():
+    """Test that normalized and similar inputs hit the cache of earlier rows."""
+    semantic_cache = SemanticCache(BagOfWordsEmbedder(), threshold=0.8)
+    stage = LLMStage(
+        input_columns=["review"],
+        conversation_template=[{"role": "user", "content": "{review}"}],
+        output_columns=["label"],
+        semantic_cache=semantic_cache,
+    )
+    provider = CountingProvider()
+    cache = InMemoryCache()
+
+    await stage.process(
+        pd.DataFrame({"review": ["great phone", "broke in a day"]}),
+        llm_provider=provider,
+        cache=cache,
+    )
+    assert len(provider.requests) == 2
+
+    result = await stage.process(
+        pd.DataFrame(
+            {
+                "review": [
+                    "Great  Phone!",
+                    "great phone indeed",
+                    "totally different text",
+                    "broke in a day",
+                ]
+            }
+        ),
+        llm_provider=provider,
+        cache=cache,
+    )
+
+    assert provider.requests[2:] == ["totally different text"]
+    assert result["label"].tolist() == [
+        "answer to great phone",
+        "answer to great phone",
+        "answer to totally different text",
+        "answer to broke in a day",
+    ]
+    stats = semantic_cache.get_stats()
+    assert stats["lookups"] == 5
+    assert stats["normalized_hits"] == 1
+    assert stats["embedding_hits"] == 1
+    assert stats["added_hit_rate"] == pytest.approx(2 / 5)
+    # The near-duplicate answered by similarity is indexed as well
+    assert stats["indexed"] == 4
+    assert stage.get_usage()["semantic_hits"] == 2
+    assert stage.get_usage()["cache_hits"] == 3
+
+
+@pytest.mark.asyncio
+async def test_semantic_hits_are_kept_apart_and_exact_hits_seed_the_index():
+    """Test that a warm cache seeds the index and similar hits are reused later
+    without embedding, but never under the row's exact key."""
+    make_stage = lambda semantic_cache=None: LLMStage(
+        input_columns=["review"],
+        conversation_template=[{"role": "user", "content": "{review}"}],
+        output_columns=["label"],
+        semantic_cache=semantic_cache,
+    )
+    provider = CountingProvider()
+    cache = InMemoryCache()
+    # Filled without a semantic cache, e.g. by an earlier process
+    await make_stage().process(
+        pd.DataFrame({"review": ["great phone"]}), llm_provider=provider, cache=cache
+    )
+
+    embedder = BagOfWordsEmbedder()
+    semantic_cache = SemanticCache(embedder, threshold=0.8)
+    stage = make_stage(semantic_cache)
+    data = pd.DataFrame({"review": ["great phone", "great phone indeed"]})
+    result = await stage.process(data, llm_provider=provider, cache=cache)
+
+    assert provider.requests == ["great phone"]
+    assert result["label"].tolist() == ["answer to great phone"] * 2
+    assert embedder.requests == 1
+    assert semantic_cache.get_stats()["embedding_hits"] == 1
+
+    # The exact row and the answer it lends are each read once
+    namespace = cache.namespace(stage.get_fingerprint())
+    assert namespace.get_stats()["hits"] == 2
+    similar_row = data.iloc[1]
+    assert not cache.contains(stage._get_llm_cache_key(similar_row, provider))
+
+    # The similar row is answered again without an embedding request
+    await stage.process(data, llm_provider=provider, cache=cache)
+    assert embedder.requests == 1
+    assert semantic_cache.get_stats()["lookups"] == 2
+    assert semantic_cache.get_stats()["embedding_hits"] == 2
+    assert stage.get_usage()["cache_hits"] == 4
+
+    # Without the semantic cache, only the exact row is answered from the cache
+    await make_stage().process(data, llm_provider=provider, cache=cache)
+    assert provider.requests == ["great phone", "great phone indeed"]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.llm.simulated_provider import (
+    SimulatedProvider,
+    SimulatedProviderError,
+    SimulatedRateLimitError,
+)
+from pipeline_forge.stages.llm_stage import LLMStage
+
+
+@pytest.mark.asyncio
+async def test_simulated_provider_runs_requests_concurrently():
+    """Test that simulated latency lets concurrent LLM rows overlap."""
+    provider = SimulatedProvider(latency="constant", latency_mean=0.02)
+    stage = LLMStage(
+        input_columns=["text"],
+        conversation_template=[{"role": "user", "content": "{text}"}],
+        output_columns=["response"],
+    )
+
+    result = await stage.process(
+        pd.DataFrame({"text": [str(i) for i in range(20)]}), llm_provider=provider
+    )
+
+    assert result["response"].tolist() == ["Mock response"] * 20
+    assert provider.calls == 20
+    assert provider.max_in_flight == 20
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("latency", ["constant", "uniform", "exponential", "lognormal"])
+async def test_simulated_provider_is_reproducible(latency):
+    """Test that a fixed seed yields the same latencies and failures."""
+
+    def draws(seed):
+        provider = SimulatedProvider(latency=latency, latency_mean=0.5, seed=seed)
+        return [provider._sample_latency() for _ in range(5)]
+
+    assert draws(1) == draws(1)
+    assert all(value >= 0 for value in draws(2))
+
+
+@pytest.mark.asyncio
+async def test_simulated_provider_errors_and_rate_limits():
+    """Test that configured error rates surface as exceptions."""
+    messages = [{"role": "user", "content": "hi"}]
+
+    with pytest.raises(SimulatedRateLimitError):
+        await SimulatedProvider(rate_limit_rate=1.0).generate(messages)
+    with pytest.raises(SimulatedProviderError):
+        await SimulatedProvider(error_rate=1.0).generate(messages)
+
+    provider = SimulatedProvider(error_rate=0.5, seed=3)
+    outcomes = await asyncio.gather(
+        *[provider.generate(messages) for _ in range(200)], return_exceptions=True
+    )
+    failures = sum(isinstance(outcome, Exception) for outcome in outcomes)
+    assert failures == provider.errors
+    assert 60 < failures < 140
+    assert provider.in_flight == 0
+
+
+def test_unknown_latency_distribution():
+    with pytest.raises(ValueError):
+        SimulatedProvider(latency="pareto")
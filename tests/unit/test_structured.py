@@ -0,0 +1,66 @@
+import re
+
+import pytest
+
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.structured import (
+    SchemaValidationError,
+    check_schema,
+    parse_json_response,
+    schema_for_columns,
+    validate,
+)
+
+
+def test_parse_json_response_accepts_code_fences():
+    """Test that a fenced JSON response is parsed and validated."""
+    schema = schema_for_columns(["label", "score"])
+    text = '```json\n{"label": "spam", "score": 0.9}\n```'
+    assert parse_json_response(text, schema) == {"label": "spam", "score": 0.9}
+
+
+@pytest.mark.parametrize(
+    "value, schema, message",
+    [
+        ({"a": 1}, {"type": "object", "required": ["b"]}, "missing required key 'b'"),
+        (
+            {"a": 1, "b": 2},
+            {"properties": {"a": {}}, "additionalProperties": False},
+            "unexpected keys ['b']",
+        ),
+        ({"a": True}, {"properties": {"a": {"type": "integer"}}}, "$.a: expected"),
+        ({"a": "x"}, {"properties": {"a": {"enum": ["y", "z"]}}}, "is not one of"),
+        ([1, "2"], {"items": {"type": "number"}}, "$[1]: expected number"),
+    ],
+)
+def test_validate_reports_first_mismatch(value, schema, message):
+    """Test that schema mismatches raise with a path to the offending value."""
+    with pytest.raises(SchemaValidationError, match=re.escape(message)):
+        validate(value, schema)
+
+
+def test_parse_json_response_rejects_invalid_json():
+    """Test that non-JSON text raises SchemaValidationError."""
+    with pytest.raises(SchemaValidationError, match="invalid JSON"):
+        parse_json_response("label: spam", schema_for_columns(["label"]))
+
+
+def test_parse_json_response_rejects_empty_content():
+    """Test that a response without content is a parse failure."""
+    with pytest.raises(SchemaValidationError, match="empty response"):
+        parse_json_response(None, schema_for_columns(["label"]))
+
+
+def test_unsupported_schema_types_are_rejected_up_front():
+    """Test that unknown types raise a clear ValueError when the stage is built."""
+    schema = {"type": "object", "properties": {"score": {"type": "float"}}}
+    with pytest.raises(ValueError, match=re.escape("$.score: unsupported schema")):
+        check_schema(schema)
+    with pytest.raises(ValueError, match="unsupported schema type 'float'"):
+        LLMStage(
+            input_columns=["text"],
+            conversation_template=[{"role": "user", "content": "{text}"}],
+            output_columns=["score"],
+            output_schema=schema,
+        )
+    check_schema({"type": ["integer", "null"], "items": {"type": "string"}})
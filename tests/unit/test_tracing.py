@@ -0,0 +1,121 @@
+import json
+
+import pandas as pd
+import pytest
+
+from pipeline_forge.cache import InMemoryCache
+from pipeline_forge.llm.provider import MockProvider
+from pipeline_forge.pipeline import Pipeline
+from pipeline_forge.stages.functional_stage import FunctionalStage
+from pipeline_forge.stages.llm_stage import LLMStage
+from pipeline_forge.tracing import (
+    InMemoryExporter,
+    JSONLinesExporter,
+    OTLPJSONExporter,
+    Tracer,
+    get_tracer,
+    trace,
+)
+
+
+def make_pipeline():
+    return Pipeline(
+        stages=[
+            LLMStage(
+                input_columns=["question"],
+                conversation_template=[{"role": "user", "content": "{question}"}],
+                output_columns=["answer"],
+            ),
+            FunctionalStage(
+                input_columns=["answer"],
+                output_columns=["is_long"],
+                function=lambda answer: len(answer) > 5,
+            ),
+            FunctionalStage(
+                input_columns=["answer"],
+                output_columns=["upper"],
+                function=lambda answer: answer.upper(),
+                filter_colname="is_long",
+            ),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_tracer_records_stage_row_cache_and_generate_spans():
+    """Test that a traced run produces spans for every instrumented operation."""
+    data = pd.DataFrame({"question": ["a", "b", "a"]})
+    tracer = Tracer()
+
+    await make_pipeline().run(
+        data,
+        llm_provider=MockProvider(map_responses={"a": "short", "b": "much longer"}),
+        cache=InMemoryCache(),
+        tracer=tracer,
+    )
+
+    summary = tracer.summary()
+    assert summary["pipeline:run"]["count"] == 1
+    assert summary["stage:LLMStage(answer)"]["count"] == 1
+    assert summary["row:LLMStage(answer)"]["count"] == 3
+    assert summary["generate:MockProvider"]["count"] == 2
+    assert summary["cache_get:LLMStage(answer)"]["count"] == 3
+    assert summary["cache_set:LLMStage(answer)"]["count"] == 2
+    assert summary["merge:FunctionalStage(upper)"]["count"] == 1
+    for stats in summary.values():
+        assert stats["p50"] <= stats["p95"] <= stats["p99"] <= stats["max"]
+        assert stats["max_in_flight"] >= 1
+
+    # The tracer is only active for the duration of the run
+    assert get_tracer() is None
+
+
+@pytest.mark.asyncio
+async def test_exporters_write_jsonl_and_otlp(tmp_path):
+    """Test that file exporters produce parseable output linked by parent spans."""
+    jsonl_path = tmp_path / "trace.jsonl"
+    otlp_path = tmp_path / "trace.otlp.json"
+    memory = InMemoryExporter(keep_events=True)
+    tracer = Tracer(
+        exporters=[memory, JSONLinesExporter(jsonl_path), OTLPJSONExporter(otlp_path)]
+    )
+
+    await make_pipeline().run(
+        pd.DataFrame({"question": ["a", "b"]}),
+        llm_provider=MockProvider(),
+        tracer=tracer,
+    )
+    tracer.close()
+
+    lines = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert len(lines) == len(memory.events)
+    root = next(line for line in lines if line["kind"] == "pipeline")
+    assert root["parent_id"] is None
+    stage_ids = {line["span_id"] for line in lines if line["kind"] == "stage"}
+    assert all(
+        line["parent_id"] in stage_ids for line in lines if line["kind"] == "row"
+    )
+
+    document = json.loads(otlp_path.read_text())
+    spans = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == len(lines)
+    assert all(len(span["spanId"]) == 16 for span in spans)
+    assert all(
+        int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"]) for span in spans
+    )
+
+
+def test_trace_is_noop_without_tracer():
+    """Test that spans opened without an active tracer are discarded."""
+    with trace("row", "anything") as span:
+        span["hit"] = True
+        assert "hit" not in span
+
+
+def test_span_records_errors():
+    """Test that exceptions inside a span are counted as errors and re-raised."""
+    tracer = Tracer()
+    with pytest.raises(RuntimeError):
+        with tracer.span("generate", "Broken"):
+            raise RuntimeError("boom")
+    assert tracer.summary()["generate:Broken"]["errors"] == 1